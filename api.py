@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import tornado.httpserver
+import tornado.ioloop
+import tornado.netutil
+import tornado.process
+import tornado.web
+import gazetteer
+import metrics
+import model_reload
+import result_cache
+import search_core
+import timeindex
+
+# -----------------------------------------------------------------
+# HTTP SEARCH API
+# -----------------------------------------------------------------
+# The same search as the Streamlit app (search_core.py), as a JSON
+# service for other clients and load tests:
+#
+#   GET /search?q=live+music&lat=41.31&lon=-72.92&miles=10&limit=20
+#              &when=weekend&category=Music&category=Arts&source=Meetup
+#       (near=06510 instead of lat/lon: ZIPs, cities and known venues from
+#        gazetteer.py, no remote geocoder; when=custom takes from= / to=
+#        as YYYY-MM-DD)
+#   GET /event/<event_id>
+#   GET /similar/<event_id>?k=10&when=weekend&lat=41.31&lon=-72.92&miles=10
+#       (from the precomputed neighbor table, neighbors.py; when and
+#        lat/lon/near + miles narrow it like a search)
+#   GET /health
+#
+# The artifacts are opened once, before forking --processes workers that
+# all accept on the same port. They are memory-mapped, so every worker
+# reads the same pages. Each worker runs an async Tornado loop; searches
+# go to a small thread pool so a slow one doesn't hold up the loop.
+# Each worker also swaps in new model versions by itself as model.py
+# publishes them (model_reload.py); /health shows which one it serves.
+#
+#   python api.py --port 8000 --processes 4
+
+DEFAULT_PORT = 8000
+
+# Search threads per worker process (NumPy lets go of the GIL in the big loops)
+SEARCH_THREADS = 4
+
+MAX_LIMIT = 50
+MAX_MILES = 50
+MAX_SIMILAR = 50
+
+
+class ServedModel:
+    """One loaded model version: its search core and the gazetteer built from its events."""
+
+    def __init__(self, models):
+        self.core = search_core.SearchCore(models)
+        self.gazetteer = gazetteer.build_gazetteer(models.events_df)
+        # Build the event id -> row index up front (before forking, for the first version)
+        self.core.row_for_event_id('')
+
+    @property
+    def version(self):
+        return self.core.version
+
+
+class SearchService:
+    """Everything one worker process serves from: the model (hot reloaded), result cache, threads."""
+
+    def __init__(self, model_dir='model', threads=SEARCH_THREADS, poll_seconds=model_reload.POLL_SECONDS):
+        self.reloader = model_reload.ModelReloader(model_dir, prepare=ServedModel, poll_seconds=poll_seconds)
+        self.cache = result_cache.ResultCache(max_entries=512, ttl_seconds=900)
+        self.threads = threads
+        self.executor = None
+
+    def served(self):
+        # Read once per request: the whole request sees one version even if a reload lands meanwhile
+        return self.reloader.current
+
+    def start(self):
+        # Threads only after fork_processes (they don't survive a fork)
+        self.executor = ThreadPoolExecutor(self.threads, thread_name_prefix='search')
+        self.reloader.start()
+
+    async def run(self, fn, *args):
+        return await tornado.ioloop.IOLoop.current().run_in_executor(self.executor, fn, *args)
+
+    def search(self, served, query, user_lat_lon, distance_miles, limit, time_window, facet_filters):
+        core = served.core
+        if core.version == self.reloader.version:
+            # Drops results from the version before, once the swap has happened
+            self.cache.ensure_version(core.version)
+        key = result_cache.make_key(query, user_lat_lon, distance_miles, limit, core.version,
+                                    time_window, facet_filters)
+        metrics.start_trace('api_search')
+        result = self.cache.get(key)
+        if result is None:
+            metrics.count('cache_miss')
+            result = core.search(query, user_lat_lon, distance_miles, limit, time_window, facet_filters)
+            self.cache.put(key, result)
+        else:
+            metrics.count('cache_hit')
+        metrics.end_trace()
+        return {
+            'version': core.version,
+            'count': len(result.ids),
+            'events': core.event_records(result.ids, result.scores, result.distances),
+            'facets': result.facet_counts,
+        }
+
+    def similar(self, served, row, k, time_window=None, user_lat_lon=None, distance_miles=None):
+        candidate_mask = None
+        if time_window is not None or user_lat_lon:
+            candidate_mask = served.core.filter_mask(time_window or timeindex.window_bounds('any'),
+                                                     user_lat_lon, distance_miles)
+        ids, scores = served.core.similar(row, k, candidate_mask)
+        return {
+            'version': served.version,
+            'event': served.core.event_records([row])[0],
+            'similar': served.core.event_records(ids, scores),
+        }
+
+
+# -----------------------------------------------------------------
+# HANDLERS
+# -----------------------------------------------------------------
+
+class JSONHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def write_json(self, payload, status=200):
+        self.set_status(status)
+        self.set_header('Content-Type', 'application/json; charset=utf-8')
+        self.finish(json.dumps(payload))
+
+    def write_error(self, status_code, **kwargs):
+        error = kwargs.get('exc_info', (None, None, None))[1]
+        message = error.log_message if isinstance(error, tornado.web.HTTPError) and error.log_message else self._reason
+        self.write_json({'error': message}, status_code)
+
+    def float_argument(self, name, default=None, low=None, high=None):
+        value = self.get_argument(name, None)
+        if value is None or value == '':
+            return default
+        try:
+            value = float(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, f"{name} must be a number")
+        # float() takes "nan" and "inf", which would slip past the range check
+        if not math.isfinite(value):
+            raise tornado.web.HTTPError(400, f"{name} must be a finite number")
+        if (low is not None and value < low) or (high is not None and value > high):
+            raise tornado.web.HTTPError(400, f"{name} must be between {low} and {high}")
+        return value
+
+    def row_or_404(self, served, event_id):
+        row = served.core.row_for_event_id(event_id)
+        if row is None:
+            raise tornado.web.HTTPError(404, f"no event {event_id}")
+        return row
+
+    def location_argument(self, served):
+        """lat/lon, or a place the gazetteer knows (near=); None = anywhere."""
+        lat, lon = self.float_argument('lat', None, -90, 90), self.float_argument('lon', None, -180, 180)
+        near = self.get_argument('near', '').strip()
+        if lat is not None and lon is not None:
+            return result_cache.location_bucket((lat, lon))
+        if near:
+            place = served.gazetteer.lookup(near)
+            if not place:
+                raise tornado.web.HTTPError(400, f"unknown place {near!r}; send lat and lon instead")
+            return result_cache.location_bucket((place[0], place[1]))
+        return None
+
+    def time_window_argument(self, default='any'):
+        """timeindex.window_bounds for when= (and from= / to= with when=custom)."""
+        when = self.get_argument('when', default)
+        if when not in timeindex.WINDOWS:
+            raise tornado.web.HTTPError(400, f"when must be one of {', '.join(timeindex.WINDOWS)}")
+        custom_range = None
+        if when == 'custom':
+            try:
+                custom_range = (np.datetime64(self.get_argument('from'), 'D'),
+                                np.datetime64(self.get_argument('to'), 'D'))
+            except (ValueError, tornado.web.MissingArgumentError):
+                raise tornado.web.HTTPError(400, "when=custom needs from= and to= as YYYY-MM-DD")
+        return timeindex.window_bounds(when, custom_range=custom_range)
+
+
+class SearchHandler(JSONHandler):
+    async def get(self):
+        query = self.get_argument('q', '')
+        distance_miles = self.float_argument('miles', 10, 0, MAX_MILES)
+        limit = int(self.float_argument('limit', 10, 1, MAX_LIMIT))
+
+        served = self.service.served()
+        user_lat_lon = self.location_argument(served)
+        time_window = self.time_window_argument()
+
+        facet_filters = (('category', tuple(sorted(self.get_arguments('category')))),
+                         ('source_site', tuple(sorted(self.get_arguments('source')))))
+
+        started = time.perf_counter()
+        payload = await self.service.run(self.service.search, served, query, user_lat_lon, distance_miles, limit,
+                                         time_window, facet_filters)
+        payload['took_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        self.write_json(payload)
+
+
+class EventHandler(JSONHandler):
+    async def get(self, event_id):
+        served = self.service.served()
+        row = self.row_or_404(served, event_id)
+        self.write_json({'version': served.version, 'event': served.core.event_records([row])[0]})
+
+
+class SimilarHandler(JSONHandler):
+    async def get(self, event_id):
+        served = self.service.served()
+        row = self.row_or_404(served, event_id)
+        k = int(self.float_argument('k', 10, 1, MAX_SIMILAR))
+        distance_miles = self.float_argument('miles', 10, 0, MAX_MILES)
+        user_lat_lon = self.location_argument(served)
+        time_window = self.time_window_argument() if self.get_argument('when', None) else None
+        self.write_json(await self.service.run(self.service.similar, served, row, k, time_window,
+                                               user_lat_lon, distance_miles))
+
+
+class HealthHandler(JSONHandler):
+    async def get(self):
+        served = self.service.served()
+        reloader = self.service.reloader
+        self.write_json({'status': 'ok', 'version': served.version, 'pid': os.getpid(),
+                         'events': served.core.models.n_events, 'reloads': reloader.reloads,
+                         'reload_error': reloader.last_error})
+
+
+async def serve(service, sockets):
+    service.start()
+    server = tornado.httpserver.HTTPServer(make_app(service))
+    server.add_sockets(sockets)
+    await asyncio.Event().wait()
+
+
+def make_app(service):
+    args = {'service': service}
+    return tornado.web.Application([
+        (r'/search', SearchHandler, args),
+        (r'/event/([^/]+)', EventHandler, args),
+        (r'/similar/([^/]+)', SimilarHandler, args),
+        (r'/health', HealthHandler, args),
+    ])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve event search as a JSON API.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--model-dir', default='model')
+    parser.add_argument('--processes', type=int, default=1, help="worker processes (0 = one per CPU)")
+    parser.add_argument('--threads', type=int, default=SEARCH_THREADS, help="search threads per process")
+    parser.add_argument('--poll-seconds', type=float, default=model_reload.POLL_SECONDS,
+                        help="how often each worker checks for a new model version")
+    args = parser.parse_args()
+
+    # Open the artifacts and bind the port once, then fork: the workers
+    # share the mapped files and the listening socket
+    service = SearchService(args.model_dir, args.threads, args.poll_seconds)
+    sockets = tornado.netutil.bind_sockets(args.port, args.address)
+    print(f"--- Serving {service.served().core.models.n_events} events (version {service.served().version}) "
+          f"on http://{args.address}:{args.port} ---")
+    if args.processes != 1:
+        tornado.process.fork_processes(args.processes)
+    asyncio.run(serve(service, sockets))
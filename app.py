@@ -1,34 +1,39 @@
 import streamlit as st
 import pandas as pd
-import pickle
-import requests
-from sklearn.metrics.pairwise import cosine_similarity
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
-from streamlit_geolocation import streamlit_geolocation
-from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, auth, firestore
+from datetime import date, timedelta
 import os
-import json
+from urllib.parse import urlparse
+import result_cache
+import metrics
+import bookmarks
+import dedup
+import gazetteer
+import geocode_cache
+import timeindex
+import search_core
+import model_reload
 
-import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore
-import json
-import os
+# firebase_admin, geopy and streamlit_geolocation are imported where they
+# are first used, and scikit-learn not at all (see query_vectorizer.py),
+# so the first page renders without paying for them.
 
 # -----------------------------------------------------------------
 # 1. FIREBASE INITIALIZATION
 # -----------------------------------------------------------------
-if not firebase_admin._apps:
+@st.cache_resource
+def init_firebase():
+    # Runs once per server process, the first time auth or Firestore is needed
+    import firebase_admin
+    from firebase_admin import credentials
+    if firebase_admin._apps:
+        return
     try:
         # CASE 1: STREAMLIT CLOUD (Read from Secrets)
         if "firebase" in st.secrets:
             # st.secrets["firebase"] returns a weird Streamlit object, 
             # so we convert it to a standard Python dict
             key_dict = dict(st.secrets["firebase"])
-            
+        
             # Fix specific private_key formatting issues that often happen in TOML
             # (Streamlit secrets sometimes escape the \n characters incorrectly)
             if "private_key" in key_dict:
@@ -36,13 +41,13 @@ if not firebase_admin._apps:
 
             cred = credentials.Certificate(key_dict)
             firebase_admin.initialize_app(cred)
-        
+    
         # CASE 2: LOCAL MACHINE (Read from File)
         else:
             # This looks for the file in the same folder as app.py
             current_dir = os.path.dirname(os.path.abspath(__file__))
             key_path = os.path.join(current_dir, 'firebase_key.json')
-            
+        
             cred = credentials.Certificate(key_path)
             firebase_admin.initialize_app(cred)
 
@@ -54,8 +59,17 @@ if not firebase_admin._apps:
         print(f"Error details: {e}")
         st.stop()
 
-# Get a reference to the Firestore database
-db = firestore.client()
+def get_db():
+    # Firestore client, created on first use
+    init_firebase()
+    from firebase_admin import firestore
+    return firestore.client()
+
+def get_auth():
+    init_firebase()
+    from firebase_admin import auth
+    return auth
+
 # -----------------------------------------------------------------
 # 2. PAGE CONFIGURATION
 # -----------------------------------------------------------------
@@ -78,6 +92,18 @@ st.markdown("""
 if 'user' not in st.session_state:
     st.session_state.user = None
 
+# The last search's result (see "Search for Events" below), kept across reruns
+if 'search' not in st.session_state:
+    st.session_state.search = None
+
+# Row of the card whose "Similar events" list is open (None = none)
+if 'similar_to' not in st.session_state:
+    st.session_state.similar_to = None
+
+# Page of the "My saved events" list
+if 'bookmarks_page' not in st.session_state:
+    st.session_state.bookmarks_page = 0
+
 def login_user(email, password):
     try:
         # This verifies the user with Firebase Authentication
@@ -86,7 +112,7 @@ def login_user(email, password):
         # For a simple prototype, we verify by checking if the user EXISTS.
         # In a real production app, we'd use the Firebase REST API for client-side login.
         
-        user = auth.get_user_by_email(email)
+        user = get_auth().get_user_by_email(email)
         st.session_state.user = {'uid': user.uid, 'email': user.email}
         st.success(f"Welcome back, {user.email}!")
         st.rerun() # Reload the app to show the logged-in view
@@ -95,7 +121,7 @@ def login_user(email, password):
 
 def signup_user(email, password):
     try:
-        user = auth.create_user(email=email, password=password)
+        user = get_auth().create_user(email=email, password=password)
         st.session_state.user = {'uid': user.uid, 'email': user.email}
         st.success("Account created! You are now logged in.")
         st.rerun()
@@ -109,37 +135,103 @@ def logout_user():
 # -----------------------------------------------------------------
 # 4. MODEL LOADING (Existing Code)
 # -----------------------------------------------------------------
-@st.cache_data
-def load_models():
-    # ... (Your existing load_models logic here) ...
-    # (I will keep this concise, use the same logic as before)
+@st.cache_resource
+def get_model_reloader():
+    # Memory-mapped artifacts from model.py (see artifacts.py), wrapped in a
+    # search_core.SearchCore. cache_resource hands every session the same
+    # objects without hashing or copying them, so the arrays stay shared
+    # with the OS page cache. After incremental builds this is a base
+    # segment plus deltas, searched together (segments.py).
+    # The reloader watches model/artifacts/LATEST and swaps in new builds
+    # in the background (model_reload.py), no restart needed.
     try:
-        with open('model/vectorizer.pkl', 'rb') as f: vectorizer = pickle.load(f)
-        with open('model/tfidf_matrix.pkl', 'rb') as f: tfidf_matrix = pickle.load(f)
-        events_df = pd.read_pickle('model/events_data.pkl')
-        return vectorizer, tfidf_matrix, events_df
-    except: return None, None, None
+        with metrics.span('load_models'):
+            reloader = model_reload.ModelReloader('model', prepare=search_core.SearchCore)
+    except Exception as e:
+        print(f"Failed to load models: {e}")
+        return None
+    return reloader.start()
 
-vectorizer, tfidf_matrix, events_df = load_models()
+# One version for this whole script run, even if a newer one is swapped in meanwhile
+model_reloader = get_model_reloader()
+core = model_reloader.current if model_reloader else None
+models = core.models if core else None
+vectorizer = models.vectorizer if models else None
+events_df = models.events_df if models else None
 
 # -----------------------------------------------------------------
 # 5. HELPER FUNCTIONS (Existing Code)
 # -----------------------------------------------------------------
-def get_recommendations(query, top_n=50):
-    query_vector = vectorizer.transform([query])
-    cosine_similarities = cosine_similarity(query_vector, tfidf_matrix).flatten()
-    top_indices = cosine_similarities.argsort()[-top_n:][::-1]
-    return events_df.iloc[top_indices]
+# Cards shown per page; "Load more" adds another page from the stored result
+RESULTS_PAGE_SIZE = 5
+
+def load_more_results():
+    # Button callback: runs before the rerun, so the next page shows right away
+    st.session_state.search['shown'] += RESULTS_PAGE_SIZE
+
+# Events listed under a card by "Similar events"
+SIMILAR_COUNT = 5
+
+def also_on(row):
+    # Links to the same event on other sites, merged into this row by dedup.py ("" if none)
+    urls, _ = dedup.split_sources(row)
+    links = [f"[{(urlparse(url).hostname or url).removeprefix('www.')}]({url})" for url in urls[1:]]
+    return "Also on: " + ", ".join(links) if links else ""
+
+def toggle_similar(row):
+    # Button callback: a second click on the same card closes the list again
+    st.session_state.similar_to = None if st.session_state.similar_to == row else row
+
+@st.cache_resource
+def get_result_cache():
+    # One cache for the whole server process, shared by every session
+    return result_cache.ResultCache(max_entries=512, ttl_seconds=900)
+
+@st.cache_resource
+def get_bookmark_store():
+    # Shared by every session; saves are batched to Firestore in the background.
+    # GOUT_BOOKMARKS=memory keeps them in memory instead (local runs, no credentials)
+    if os.environ.get("GOUT_BOOKMARKS") == "memory":
+        return bookmarks.BookmarkStore(bookmarks.InMemoryFirestore())
+    return bookmarks.BookmarkStore(get_db())
+
+def change_bookmarks_page(step):
+    st.session_state.bookmarks_page = max(0, st.session_state.bookmarks_page + step)
+
+@st.cache_resource(max_entries=1)
+def get_gazetteer(version):
+    # ZIPs, cities, venues and addresses we already know coordinates for (see gazetteer.py)
+    return gazetteer.build_gazetteer(events_df)
+
+@st.cache_resource
+def get_geocode_cache():
+    # Remote geocoder answers, kept on disk across restarts
+    return geocode_cache.GeocodeCache()
 
 @st.cache_data
 def geocode_user_address(address):
-    # ... (Your existing geocode logic) ...
-    try:
-        geolocator = Nominatim(user_agent="gout-app-v4", timeout=10)
-        loc = geolocator.geocode(address)
-        if loc: return (loc.latitude, loc.longitude)
-    except: pass
-    return None
+    # Local gazetteer first: answers ZIPs, cities and known venues without a network call
+    place = get_gazetteer(models.version).lookup(address)
+    if place:
+        return (place[0], place[1])
+
+    # Then Nominatim; its answers (found or not) are kept on disk, so each address is asked once
+    cache = get_geocode_cache()
+    found, lat_lon = cache.lookup(address)
+    if found is None:
+        from geopy.geocoders import Nominatim
+        try:
+            geolocator = Nominatim(user_agent="gout-app-v4", timeout=10)
+            loc = geolocator.geocode(address)
+            lat_lon = (loc.latitude, loc.longitude) if loc else None
+            cache.store(address, lat_lon)
+        except: pass
+    if lat_lon:
+        return lat_lon
+
+    # Nobody knows it as typed: maybe a typo of a city we know ("new haevn")
+    place = get_gazetteer(models.version).lookup(address, fuzzy=True)
+    return (place[0], place[1]) if place else None
 
 # -----------------------------------------------------------------
 # 6. MAIN APP UI
@@ -169,6 +261,35 @@ with col_auth:
             if st.button("Create Account"):
                 signup_user(email, password)
 
+# --- MY SAVED EVENTS ---
+if st.session_state.user and events_df is not None:
+    bookmark_store = get_bookmark_store()
+    uid = st.session_state.user['uid']
+    n_saved = bookmark_store.count(uid)
+    with st.expander(f"❤️ My saved events ({n_saved})"):
+        page_size = 10
+        page = min(st.session_state.bookmarks_page, max(0, (n_saved - 1) // page_size))
+        for saved in bookmark_store.list_page(uid, page, page_size):
+            # Show the current listing if we still have it, else what was saved
+            # (the core's id index skips events tombstoned by incremental builds)
+            position = core.row_for_event_id(saved.get('event_id'))
+            event = events_df.iloc[position].to_dict() if position is not None else saved
+            st.markdown(f"**[{event['title']}]({event['source_url']})**  \n"
+                        f"📅 {event['datetime']} · 📍 {event['location_name']}")
+            other_sites = also_on(event) if position is not None else ""
+            if position is None:
+                st.caption("No longer listed")
+            elif other_sites:
+                st.caption(other_sites)
+        if n_saved == 0:
+            st.caption("Nothing saved yet. Use ❤️ Save on a search result.")
+        elif n_saved > page_size:
+            c_prev, c_page, c_next = st.columns([1, 2, 1])
+            c_prev.button("← Newer", on_click=change_bookmarks_page, args=(-1,), disabled=page == 0)
+            c_page.caption(f"Page {page + 1} of {(n_saved - 1) // page_size + 1}")
+            c_next.button("Older →", on_click=change_bookmarks_page, args=(1,),
+                          disabled=(page + 1) * page_size >= n_saved)
+
 st.markdown("---")
 
 # --- APP CONTENT (Only runs if we have models) ---
@@ -181,6 +302,7 @@ if vectorizer:
     c1, c2, c3 = st.columns([1, 1.5, 1.5], gap="small")
     with c1:
         st.write("Current Location")
+        from streamlit_geolocation import streamlit_geolocation
         location = streamlit_geolocation()
     with c2:
         st.write("Or Enter Address")
@@ -190,25 +312,46 @@ if vectorizer:
         st.write("Filters")
         distance_miles = st.slider("Distance (miles)", 1, 50, 10)
         result_limit = st.slider("Number of results", 5, 50, 10, step=5)
+        when = st.selectbox("When", list(timeindex.WINDOWS), format_func=timeindex.WINDOWS.get)
+        date_range = None
+        if when == 'custom':
+            picked = st.date_input("Dates", value=(date.today(), date.today() + timedelta(days=7)))
+            # Only a finished (start, end) pick counts; one click gives a single date
+            if isinstance(picked, tuple) and len(picked) == 2:
+                date_range = picked
+
+    # --- Category / source filters, with counts from the last search ---
+    last_counts = st.session_state.search['facets'] if st.session_state.search else {}
+    c_cat, c_site = st.columns(2, gap="small")
+    facet_filters = []
+    for column, field, label in ((c_cat, 'category', "Category"), (c_site, 'source_site', "Source")):
+        counts = last_counts.get(field)
+        with column:
+            selected = st.multiselect(
+                label, models.facet_labels(field), placeholder="All",
+                format_func=lambda name, counts=counts: name if counts is None else f"{name} ({counts.get(name, 0)})")
+        facet_filters.append((field, tuple(sorted(selected))))
+    facet_filters = tuple(facet_filters)
 
     st.markdown("---")
+    # Everything that decides which events match; a stored result is only shown for these inputs
+    search_inputs = (user_query, user_address, distance_miles, result_limit, when, date_range, facet_filters)
+
     if st.button("Search for Events", type="primary", use_container_width=True):
-        
-        # (Your existing search logic goes here...)
-        
-        recs = get_recommendations(user_query)
+        metrics.start_trace('search')
         
         # --- Geocoding & Filtering Logic ---
-        final_recommendations = recs # Default fallback
         user_lat_lon = None
         user_location_found = False
+        location_note = None
 
         # Priority 1: Check typed address
         if user_address: 
-            user_lat_lon = geocode_user_address(user_address)
+            with metrics.span('geocode'):
+                user_lat_lon = geocode_user_address(user_address)
             if user_lat_lon:
                 user_location_found = True
-                st.success(f"Using address: {user_address}")
+                location_note = f"Using address: {user_address}"
             else:
                 st.error("Address not found.")
 
@@ -216,66 +359,145 @@ if vectorizer:
         elif location and 'latitude' in location:
             user_lat_lon = (location['latitude'], location['longitude'])
             user_location_found = True
-            st.success("Using current location.")
+            location_note = "Using current location."
         
-        # Filter by distance if location found
-        if user_location_found and user_lat_lon:
-            distances = []
-            for index, row in recs.iterrows():
-                if pd.notna(row['latitude']) and pd.notna(row['longitude']):
-                    dist = geodesic(user_lat_lon, (row['latitude'], row['longitude'])).miles
-                    distances.append(dist)
-                else:
-                    distances.append(float('inf'))
-            
-            recs['distance_miles'] = distances
-            final_recommendations = recs[recs['distance_miles'] <= distance_miles].sort_values('distance_miles')
+        # Snap to the cache grid so everyone in the same spot shares cached results
+        user_lat_lon = result_cache.location_bucket(user_lat_lon if user_location_found else None)
         
-        # Limit results
-        final_recommendations = final_recommendations.head(result_limit)
+        # "This weekend" etc. as concrete start/end times ("now" moves in 15 minute steps)
+        time_window = timeindex.window_bounds(when, custom_range=date_range)
+
+        # Reuse a cached result if someone already ran this search on this model
+        results = get_result_cache()
+        model_version = models.version
+        results.ensure_version(model_version)
+        cache_key = result_cache.make_key(user_query, user_lat_lon, distance_miles, result_limit, model_version,
+                                          time_window, facet_filters)
+        cached = results.get(cache_key)
+        if cached is None:
+            metrics.count('cache_miss')
+            cached = core.search(user_query, user_lat_lon, distance_miles, result_limit,
+                                 time_window, facet_filters)
+            results.put(cache_key, cached)
+        else:
+            metrics.count('cache_hit')
+
+        # Keep the result for this session: clicking Save, Load more or logging in
+        # reruns the script without the button pressed, and should not search again
+        st.session_state.search = {
+            'inputs': search_inputs,
+            'version': models.version,
+            'ids': cached.ids,
+            'scores': cached.scores,
+            'distances': cached.distances,
+            'facets': cached.facet_counts,
+            'location_note': location_note,
+            'shown': RESULTS_PAGE_SIZE,
+            # Kept so "Similar events" only suggests what this search would allow too
+            'time_window': time_window,
+            'user_lat_lon': user_lat_lon,
+            'distance_miles': distance_miles,
+        }
+        st.session_state.similar_to = None
+
+    # --- Results (from this run's search or the one stored in the session) ---
+    search_state = st.session_state.search
+    if search_state is not None and (search_state['inputs'] != search_inputs
+                                     or search_state['version'] != models.version):
+        # The inputs (or the model, see model_reload.py) changed since that search;
+        # its row ids don't apply any more, wait for the button again
+        search_state = None
+
+    if search_state is not None:
+        if search_state['location_note']:
+            st.success(search_state['location_note'])
+
+        result_ids = search_state['ids']
+        final_recommendations = events_df.iloc[result_ids[:search_state['shown']]]
+        if search_state['distances'] is not None:
+            final_recommendations = final_recommendations.assign(
+                distance_miles=search_state['distances'][:search_state['shown']])
 
         st.header(f"Top Results")
+        if len(result_ids) == 0:
+            st.info("No events matched your search. Try different keywords, a larger distance or other dates.")
         
-        for index, row in final_recommendations.iterrows():
-            # Create a card-like layout
-            with st.container(border=True):
-                c_info, c_action = st.columns([3, 1])
+        with metrics.span('render'):
+            for index, row in final_recommendations.iterrows():
+                # Create a card-like layout
+                with st.container(border=True):
+                    c_info, c_action = st.columns([3, 1])
                 
-                with c_info:
-                    st.subheader(row['title'])
+                    with c_info:
+                        st.subheader(row['title'])
                     
-                    # --- DISPLAY CATEGORY ---
-                    if 'category' in row and pd.notna(row['category']):
-                        st.caption(f"🏷️ {row['category']}")
+                        # --- DISPLAY CATEGORY ---
+                        if 'category' in row and pd.notna(row['category']):
+                            st.caption(f"🏷️ {row['category']}")
                     
-                    # --- DATE/TIME FIX ---
-                    try:
-                        dt_object = datetime.fromisoformat(row['datetime'])
-                        friendly_date = dt_object.strftime("%A, %B %d, %Y at %I:%M %p")
-                        st.write(f"📅 **{friendly_date}**")
-                    except:
-                        st.write(f"📅 {row['datetime']}")
+                        # --- DATE/TIME (parsed once at build time, see timeindex.py) ---
+                        friendly_date = timeindex.format_start(models.start_times[index])
+                        if friendly_date:
+                            st.write(f"📅 **{friendly_date}**")
+                        else:
+                            st.write(f"📅 {row['datetime']}")
                         
-                    st.write(f"📍 {row['location_name']}")
-                    if 'distance_miles' in row and row['distance_miles'] != float('inf'):
-                         st.write(f"📏 {row['distance_miles']:.2f} miles away")
+                        st.write(f"📍 {row['location_name']}")
+                        if 'distance_miles' in row and row['distance_miles'] != float('inf'):
+                             st.write(f"📏 {row['distance_miles']:.2f} miles away")
+
+                        st.write(row['description'][:150] + "...")
 
-                    st.write(row['description'][:150] + "...")
+                        other_sites = also_on(row)
+                        if other_sites:
+                            st.caption(other_sites)
                 
-                with c_action:
-                    st.link_button("View Tickets", row['source_url'])
+                    with c_action:
+                        st.link_button("View Tickets", row['source_url'])
                     
-                    # --- NEW: BOOKMARK BUTTON ---
-                    if st.session_state.user:
-                        # Unique key for each button based on event title
-                        if st.button("❤️ Save", key=f"save_{index}"):
-                            # Save to Firestore
-                            # Convert row to dict and ensure basic types for JSON serialization
-                            event_data = row.to_dict()
-                            # Remove complex objects if any (though pandas types usually handle ok)
-                            
-                            doc_ref = db.collection('users').document(st.session_state.user['uid']).collection('bookmarks').document()
-                            doc_ref.set(event_data)
-                            st.toast("Event saved!")
-                    else:
-                        st.caption("Login to save")
\ No newline at end of file
+                        # --- NEW: BOOKMARK BUTTON ---
+                        if st.session_state.user:
+                            bookmark_store = get_bookmark_store()
+                            uid = st.session_state.user['uid']
+                            if bookmark_store.is_saved(uid, row):
+                                st.caption("✅ Saved")
+                            # Unique key for each button based on event title
+                            elif st.button("❤️ Save", key=f"save_{index}"):
+                                # Queued and written to Firestore in the background (see bookmarks.py)
+                                bookmark_store.save(uid, row)
+                                st.toast("Event saved!")
+                        else:
+                            st.caption("Login to save")
+
+                        st.button("🔁 Similar events", key=f"similar_{index}", on_click=toggle_similar, args=(index,))
+
+                    # --- "More like this": precomputed neighbors (neighbors.py), same dates and distance ---
+                    if st.session_state.similar_to == index:
+                        with metrics.span('similar'):
+                            similar_mask = core.filter_mask(search_state['time_window'], search_state['user_lat_lon'],
+                                                            search_state['distance_miles'])
+                            similar_ids, _ = core.similar(index, SIMILAR_COUNT, similar_mask)
+                        if len(similar_ids) == 0:
+                            st.caption("No similar events for these dates and distance.")
+                        for similar_row in similar_ids:
+                            similar = events_df.iloc[similar_row]
+                            when_text = timeindex.format_start(models.start_times[similar_row]) or similar['datetime']
+                            other_sites = also_on(similar)
+                            st.markdown(f"- [{similar['title']}]({similar['source_url']}) · "
+                                        f"{when_text} · {similar['location_name']}"
+                                        + (f" · {other_sites}" if other_sites else ""))
+
+        # --- Load more: next page of cards from the stored result, no new search ---
+        if search_state['shown'] < len(result_ids):
+            remaining = len(result_ids) - search_state['shown']
+            st.button(f"Load more ({remaining} more)", on_click=load_more_results, use_container_width=True)
+
+        metrics.count('rows_rendered', len(final_recommendations))
+        trace = metrics.end_trace()
+
+        # --- Debug panel (only with GOUT_METRICS=1) ---
+        if trace:
+            with st.expander("⏱️ Search timings"):
+                st.dataframe(pd.DataFrame(trace['spans']), hide_index=True)
+                st.json({'total_ms': trace['total_ms'], 'counters': trace['counters'],
+                         'values': trace['values'], 'result_cache': get_result_cache().stats()})
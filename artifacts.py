@@ -0,0 +1,469 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import scipy.sparse as sp
+import dense
+import facets
+import geo
+import inverted_index
+import neighbors
+import query_vectorizer
+import search
+import timeindex
+
+# -----------------------------------------------------------------
+# MODEL ARTIFACTS (PICKLE-FREE, MEMORY-MAPPED)
+# -----------------------------------------------------------------
+# model.py writes every build into its own folder:
+#
+#   model/artifacts/<version>/
+#       meta.json               format, row/term counts, vectorizer settings
+#       vocab.npy, idf.npy      the vocabulary (in column order) and IDF weights
+#       stop_words.npy          the stop words the vectorizer dropped
+#       tfidf_*.npy             CSR arrays (data, indices, indptr)
+#       tfidf_csc_*.npy         the same matrix column by column (for search.py)
+#       geo_*.npy, inv_*.npy    the spatial index and the inverted index
+#       time_*.npy              start times, sorted, for date windows (timeindex.py)
+#       facet_<field>_*.npy     category / source site bitsets (facets.py)
+#       dense_*.npy             LSA embeddings + IVF lists, only with --dense (dense.py)
+#       neighbors_*.npy         each event's most similar events (neighbors.py)
+#       events.arrow            the events table (uncompressed Arrow IPC)
+#       manifest.json           build time, row count, size + SHA-256 of every file
+#   model/artifacts/LATEST      name of the newest complete version (the
+#                               "current" pointer, replaced atomically)
+#
+# A version made by `model.py --incremental` is a delta segment: only the
+# new or changed events, vectorized with the vocabulary of the base
+# version it names, plus tombstones (row positions) for events it
+# replaces or removes in earlier segments. Its meta.json lists every
+# segment that makes up the index; segments.py loads and searches them
+# together.
+#
+# Everything is opened with mmap, so loading costs almost nothing and
+# several Streamlit processes share the same pages from the OS cache
+# instead of each holding its own unpickled copy.
+#
+# The vectorizer comes back as a query_vectorizer.QueryVectorizer, so
+# serving never imports scikit-learn; rebuild_vectorizer() still gives
+# the real TfidfVectorizer when one is needed.
+#
+# Older model folders with only vectorizer.pkl / tfidf_matrix.pkl /
+# events_data.pkl still load through load_legacy_pickles().
+
+FORMAT_VERSION = 1
+ARTIFACTS_DIR = 'model/artifacts'
+LATEST_NAME = 'LATEST'
+MANIFEST_NAME = 'manifest.json'
+
+# Read size for checksums
+CHECKSUM_BLOCK = 1 << 20
+
+# TfidfVectorizer settings needed to rebuild it from vocab + idf
+VECTORIZER_PARAMS = (
+    'input', 'encoding', 'decode_error', 'strip_accents', 'lowercase', 'analyzer',
+    'stop_words', 'token_pattern', 'ngram_range', 'max_df', 'min_df', 'max_features',
+    'binary', 'norm', 'use_idf', 'smooth_idf', 'sublinear_tf',
+)
+
+
+class ModelArtifacts:
+    def __init__(self, vectorizer, tfidf_matrix, tfidf_csc, events_df, event_lats, event_lons,
+                 geo_index=None, text_index=None, version=None, time_index=None, facet_indexes=None,
+                 dense_index=None, neighbor_table=None):
+        self.vectorizer = vectorizer
+        self.tfidf_matrix = tfidf_matrix
+        self.tfidf_csc = tfidf_csc
+        self.events_df = events_df
+        self.event_lats = event_lats
+        self.event_lons = event_lons
+        self.geo_index = geo_index
+        self.text_index = text_index
+        self.version = version
+        # Versions written before time_*.npy existed parse the datetime column once here
+        self.time_index = time_index or timeindex.TimeIndex.from_events(events_df)
+        self.start_times = self.time_index.start_times
+        self.facets = facet_indexes if facet_indexes is not None else facets.build_facets(events_df)
+        self.dense = dense_index
+        self.neighbor_table = neighbor_table    # (ids, scores) or None
+
+    @property
+    def n_events(self):
+        return len(self.events_df)
+
+    def top_k(self, query_vector, k, candidate_mask=None, engine='sparse'):
+        """(row ids, scores) of the best k events; see search.top_k."""
+        if engine == 'inverted' and self.text_index is not None:
+            return self.text_index.top_k(query_vector, k, candidate_mask, exact_matrix=self.tfidf_matrix)
+        return search.top_k(query_vector, self.tfidf_csc, k, candidate_mask)
+
+    def query_radius(self, user_lat_lon, radius_miles):
+        """(row ids, distances) of every event within the radius."""
+        if self.geo_index is not None:
+            return self.geo_index.query_radius(user_lat_lon, radius_miles)
+        # No spatial index (old pickles): one vectorized pass over the whole table
+        distances, in_radius = geo.within_radius(user_lat_lon, self.event_lats, self.event_lons, radius_miles)
+        return np.flatnonzero(in_radius), distances[in_radius]
+
+    def query_window(self, start=None, end=None, include_undated=False):
+        """Row ids of events starting in [start, end), earliest first."""
+        return self.time_index.query(start, end, include_undated)
+
+    def matching_ids(self, query_vector, candidate_mask=None):
+        """Every (allowed) event sharing a word with the query, ids ascending."""
+        terms, _ = search.query_terms(query_vector)
+        return search.matching_events(terms, self.tfidf_csc, candidate_mask)
+
+    # --- dense (LSA) retrieval, when the version was built with --dense ---
+
+    @property
+    def has_dense(self):
+        return self.dense is not None
+
+    def dense_top_k(self, query_vector, k, candidate_mask=None, exact=False):
+        """(row ids, cosine scores) of the k closest events by LSA embedding; see dense.py."""
+        return self.dense.top_k(query_vector, k, candidate_mask, exact=exact)
+
+    def dense_scores(self, query_vector, ids):
+        return self.dense.scores(self.dense.embed_query(query_vector), ids)
+
+    def dense_matches(self, query_vector, candidate_mask=None):
+        """(row ids, cosines) of every event a dense search over candidate_mask picks from."""
+        return self.dense.matches(query_vector, candidate_mask)
+
+    # --- "more like this" neighbors, when the version has a table ---
+
+    def neighbors(self, row):
+        """(row ids, scores) of row's precomputed most similar events, best first, or None."""
+        if self.neighbor_table is None:
+            return None
+        return neighbors.lookup(*self.neighbor_table, row)
+
+    # --- facets ---
+
+    def facet_labels(self, field):
+        index = self.facets.get(field)
+        return [] if index is None else [str(label) for label in index.labels]
+
+    def facet_mask(self, field, selected):
+        return self.facets[field].mask(selected)
+
+    def facet_counts(self, field, ids):
+        index = self.facets.get(field)
+        return {} if index is None else index.counts(ids)
+
+
+def _write_text_atomic(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def vocabulary_array(vocabulary):
+    """{term: column} -> array of terms in column order."""
+    terms = [None] * len(vocabulary)
+    for term, column in vocabulary.items():
+        terms[column] = term
+    return np.array(terms, dtype=str)
+
+
+# -----------------------------------------------------------------
+# WRITING
+# -----------------------------------------------------------------
+
+def write_artifacts(vectorizer, tfidf_matrix, events_df, geo_index, text_index, artifacts_dir=ARTIFACTS_DIR,
+                    base_segments=None, vocabulary_version=None, tombstones=None, time_index=None,
+                    facet_indexes=None, dense_index=None, neighbor_table=None):
+    """Save one build as a new version folder and point LATEST at it.
+
+    For a delta segment pass vectorizer=None, the earlier segments it sits
+    on (base_segments), the version whose vocabulary it uses, and
+    tombstones as {segment version: row positions}. The time and facet
+    indexes are built from events_df when not given; the dense index is
+    only written when given (its LSA components go with the vocabulary,
+    so a delta saves its embeddings but not the components). The neighbor
+    table, (ids, scores) from neighbors.build_neighbors, likewise.
+    """
+    os.makedirs(artifacts_dir, exist_ok=True)
+    version = time.strftime('%Y%m%d-%H%M%S')
+    while os.path.exists(os.path.join(artifacts_dir, version)):
+        version += 'a'
+
+    # Build in a hidden folder and rename at the end, so readers never see half a version
+    tmp_dir = os.path.join(artifacts_dir, f".{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    def save(name, array):
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+    csr = sp.csr_matrix(tfidf_matrix)
+    csr.sort_indices()
+    csc = csr.tocsc()
+    csc.sort_indices()
+    for prefix, matrix in (('tfidf', csr), ('tfidf_csc', csc)):
+        save(f"{prefix}_data", matrix.data)
+        save(f"{prefix}_indices", matrix.indices)
+        save(f"{prefix}_indptr", matrix.indptr)
+
+    if vectorizer is not None:
+        save('vocab', vocabulary_array(vectorizer.vocabulary_))
+        save('idf', vectorizer.idf_)
+        save('stop_words', np.array(sorted(vectorizer.get_stop_words() or []), dtype=str))
+    for segment, positions in (tombstones or {}).items():
+        save(f"tombstones_{segment}", np.asarray(positions, dtype=np.int64))
+    for name, array in geo_index.to_arrays().items():
+        save(f"geo_{name}", array)
+    for name, array in text_index.to_arrays().items():
+        save(f"inv_{name}", array)
+    time_index = time_index or timeindex.TimeIndex.from_events(events_df)
+    for name, array in time_index.to_arrays().items():
+        save(f"time_{name}", array)
+    facet_indexes = facet_indexes if facet_indexes is not None else facets.build_facets(events_df)
+    for field, index in facet_indexes.items():
+        for name, array in index.to_arrays().items():
+            save(f"facet_{field}_{name}", array)
+    if dense_index is not None:
+        for name, array in dense_index.to_arrays().items():
+            save(f"dense_{name}", array)
+        if vectorizer is not None:
+            save('dense_components', dense_index.components)
+    if neighbor_table is not None:
+        save('neighbors_ids', neighbor_table[0])
+        save('neighbors_scores', neighbor_table[1])
+
+    table = pa.Table.from_pandas(events_df.reset_index(drop=True), preserve_index=False)
+    with pa.OSFile(os.path.join(tmp_dir, 'events.arrow'), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    meta = {
+        'format': FORMAT_VERSION,
+        'version': version,
+        'n_events': int(csr.shape[0]),
+        'n_terms': int(csr.shape[1]),
+        'geo_cell_degrees': geo_index.cell_degrees,
+        'segments': list(base_segments or []) + [version],
+        'facets': sorted(facet_indexes),
+    }
+    if dense_index is not None:
+        meta['dense'] = {'dims': int(dense_index.components.shape[1]), 'lists': int(len(dense_index.centroids))}
+    if neighbor_table is not None:
+        meta['neighbors'] = {'k': int(neighbor_table[0].shape[1])}
+    if vectorizer is not None:
+        params = vectorizer.get_params()
+        meta['vectorizer'] = {name: params[name] for name in VECTORIZER_PARAMS}
+    else:
+        meta['vocabulary_version'] = vocabulary_version
+        meta['tombstones'] = sorted(tombstones or {})
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    write_manifest(tmp_dir, meta)
+
+    version_dir = os.path.join(artifacts_dir, version)
+    os.replace(tmp_dir, version_dir)
+    _write_text_atomic(os.path.join(artifacts_dir, LATEST_NAME), version)
+    return version_dir
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHECKSUM_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_manifest(version_dir, meta):
+    """manifest.json for a finished version folder: what a server checks before swapping it in."""
+    files = {}
+    for name in sorted(os.listdir(version_dir)):
+        path = os.path.join(version_dir, name)
+        if name != MANIFEST_NAME and os.path.isfile(path):
+            files[name] = {'bytes': os.path.getsize(path), 'sha256': file_checksum(path)}
+    manifest = {
+        'version': meta['version'],
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'n_events': meta['n_events'],
+        'segments': meta['segments'],
+        'files': files,
+    }
+    with open(os.path.join(version_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def verify_manifest(version_dir):
+    """Check every file against manifest.json; raises ValueError on a mismatch.
+
+    Returns the manifest, or None for versions written before manifests.
+    """
+    path = os.path.join(version_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    for name, expected in manifest['files'].items():
+        file_path = os.path.join(version_dir, name)
+        if not os.path.exists(file_path):
+            raise ValueError(f"{version_dir}: {name} is missing")
+        if os.path.getsize(file_path) != expected['bytes'] or file_checksum(file_path) != expected['sha256']:
+            raise ValueError(f"{version_dir}: {name} does not match its checksum")
+    return manifest
+
+
+# -----------------------------------------------------------------
+# LOADING
+# -----------------------------------------------------------------
+
+def rebuild_vectorizer(vectorizer_params, vocab, idf):
+    """A fitted TfidfVectorizer from saved settings, vocabulary and IDF."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    params = dict(vectorizer_params)
+    if isinstance(params.get('ngram_range'), list):
+        params['ngram_range'] = tuple(params['ngram_range'])
+    vectorizer = TfidfVectorizer(**params)
+    vectorizer.vocabulary_ = {str(term): column for column, term in enumerate(vocab)}
+    vectorizer.idf_ = np.asarray(idf)
+    return vectorizer
+
+
+def load_stop_words(version_dir, vectorizer_params):
+    path = os.path.join(version_dir, 'stop_words.npy')
+    if os.path.exists(path):
+        return [str(word) for word in np.load(path)]
+    # Versions written before stop_words.npy existed
+    stop_words = vectorizer_params.get('stop_words')
+    if stop_words == 'english':
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+        return ENGLISH_STOP_WORDS
+    return stop_words
+
+
+def load_events_table(path):
+    """The events table, memory-mapped; columns stay Arrow-backed (no copy)."""
+    source = pa.memory_map(path, 'r')
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def read_meta(version_dir):
+    with open(os.path.join(version_dir, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta['format'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {meta['format']} in {version_dir}")
+    return meta
+
+
+def load_vectorizer(version_dir, meta=None):
+    """The QueryVectorizer saved in a (base) version folder."""
+    meta = meta or read_meta(version_dir)
+    return query_vectorizer.QueryVectorizer.from_params(
+        meta['vectorizer'],
+        np.load(os.path.join(version_dir, 'vocab.npy'), mmap_mode='r'),
+        np.load(os.path.join(version_dir, 'idf.npy'), mmap_mode='r'),
+        load_stop_words(version_dir, meta['vectorizer']),
+    )
+
+
+def load_artifacts(version_dir):
+    """Everything in a version folder; a delta comes back with all its segments."""
+    meta = read_meta(version_dir)
+    if len(meta.get('segments', [])) > 1:
+        import segments
+        return segments.load_segment_set(os.path.dirname(version_dir), meta)
+    return load_segment(version_dir, meta, load_vectorizer(version_dir, meta))
+
+
+def load_dense_components(version_dir):
+    """The LSA components saved with a (base) version's vocabulary, or None."""
+    path = os.path.join(version_dir, 'dense_components.npy')
+    return np.load(path, mmap_mode='r') if os.path.exists(path) else None
+
+
+def load_segment(version_dir, meta, vectorizer, dense_components=None):
+    """One version folder on its own (row ids local to it).
+
+    A delta's dense index uses dense_components from its base version.
+    """
+    def load(name):
+        return np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r')
+
+    shape = (meta['n_events'], meta['n_terms'])
+    tfidf_matrix = sp.csr_matrix((load('tfidf_data'), load('tfidf_indices'), load('tfidf_indptr')), shape=shape)
+    tfidf_csc = sp.csc_matrix((load('tfidf_csc_data'), load('tfidf_csc_indices'), load('tfidf_csc_indptr')), shape=shape)
+
+    geo_index = geo.GeoGridIndex.from_arrays(
+        {name: load(f"geo_{name}") for name in geo.GeoGridIndex.ARRAY_NAMES}, meta['geo_cell_degrees']
+    )
+    text_index = inverted_index.InvertedIndex.from_arrays(
+        {name: load(f"inv_{name}") for name in inverted_index.InvertedIndex.ARRAY_NAMES},
+        vectorizer.vocabulary_, meta['n_events'],
+    )
+    events_df = load_events_table(os.path.join(version_dir, 'events.arrow'))
+    time_index = None
+    if os.path.exists(os.path.join(version_dir, 'time_order.npy')):
+        time_index = timeindex.TimeIndex.from_arrays({name: load(f"time_{name}") for name in timeindex.TimeIndex.ARRAY_NAMES})
+    facet_indexes = None
+    if 'facets' in meta:
+        facet_indexes = {
+            field: facets.FacetIndex.from_arrays({name: load(f"facet_{field}_{name}") for name in facets.FacetIndex.ARRAY_NAMES})
+            for field in meta['facets']
+        }
+    dense_index = None
+    if 'dense' in meta:
+        components = load_dense_components(version_dir)
+        dense_index = dense.DenseIndex.from_arrays(
+            {name: load(f"dense_{name}") for name in dense.DenseIndex.ARRAY_NAMES},
+            components if components is not None else dense_components,
+        )
+    neighbor_table = None
+    if 'neighbors' in meta:
+        neighbor_table = (load('neighbors_ids'), load('neighbors_scores'))
+
+    return ModelArtifacts(vectorizer, tfidf_matrix, tfidf_csc, events_df,
+                          geo_index.lats, geo_index.lons, geo_index, text_index, meta['version'], time_index,
+                          facet_indexes, dense_index, neighbor_table)
+
+
+def load_legacy_pickles(model_dir='model'):
+    """The old pickle files written by model.py before artifacts existed."""
+    with open(os.path.join(model_dir, 'vectorizer.pkl'), 'rb') as f: vectorizer = pickle.load(f)
+    with open(os.path.join(model_dir, 'tfidf_matrix.pkl'), 'rb') as f: tfidf_matrix = pickle.load(f)
+    events_df = pd.read_pickle(os.path.join(model_dir, 'events_data.pkl'))
+    event_lats, event_lons = geo.coordinate_arrays(events_df)
+
+    geo_index = None
+    if os.path.exists(os.path.join(model_dir, 'geo_index.pkl')):
+        with open(os.path.join(model_dir, 'geo_index.pkl'), 'rb') as f: geo_index = pickle.load(f)
+    text_index = None
+    if os.path.exists(os.path.join(model_dir, 'inverted_index.pkl')):
+        with open(os.path.join(model_dir, 'inverted_index.pkl'), 'rb') as f: text_index = pickle.load(f)
+
+    return ModelArtifacts(vectorizer, tfidf_matrix, tfidf_matrix.tocsc(), events_df,
+                          event_lats, event_lons, geo_index, text_index, 'legacy')
+
+
+def latest_version(model_dir='model'):
+    """Name of the newest artifact version, or None if there is none yet."""
+    latest_path = os.path.join(model_dir, 'artifacts', LATEST_NAME)
+    if not os.path.exists(latest_path):
+        return None
+    with open(latest_path, encoding='utf-8') as f:
+        return f.read().strip() or None
+
+
+def load_latest(model_dir='model'):
+    """Newest artifact version if there is one, otherwise the legacy pickles."""
+    version = latest_version(model_dir)
+    if version:
+        return load_artifacts(os.path.join(model_dir, 'artifacts', version))
+    return load_legacy_pickles(model_dir)
@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from benchmarks import synthetic_events
+from benchmarks.bench_cold_start import build_artifacts
+
+# -----------------------------------------------------------------
+# HTTP API LOAD TEST
+# -----------------------------------------------------------------
+# Starts api.py on a synthetic model (or points at one already running
+# with --url) and keeps --concurrency requests in flight for --duration
+# seconds, a mix of:
+#
+#   search     text + location + date window, like the app sends
+#   browse     no text, location only
+#   event      /event/<id>
+#   similar    /similar/<id>
+#
+# Reports requests/sec and p50/p95/p99/max latency per kind, per
+# server process count:
+#
+#   python -m benchmarks.bench_api --rows 100000 --processes 1 4 --concurrency 32 --duration 20
+#
+# The synthetic events are dated from 2026-01-01; the server runs with
+# GOUT_NOW pinned to that date so date windows aren't empty.
+
+SYNTHETIC_NOW = '2026-01-01T09:00'
+
+# Share of each request kind in the mix
+MIX = {'search': 0.6, 'browse': 0.2, 'event': 0.1, 'similar': 0.1}
+
+
+def start_server(model_dir, port, processes):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, GOUT_NOW=SYNTHETIC_NOW)
+    server = subprocess.Popen([sys.executable, 'api.py', '--model-dir', model_dir, '--port', str(port),
+                               '--processes', str(processes)],
+                              cwd=repo_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              start_new_session=True)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/health', timeout=1):
+                return server, url
+        except OSError:
+            time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError("api.py did not come up")
+
+
+def stop_server(server):
+    # The forked workers are in the server's process group; stop them all
+    os.killpg(server.pid, signal.SIGTERM)
+    server.wait()
+
+
+def make_requests(url, n_requests, seed=3):
+    """(kind, url) pairs in the MIX proportions."""
+    rng = np.random.default_rng(seed)
+    queries = synthetic_events.random_queries(n_requests, seed)
+    locations = synthetic_events.random_locations(n_requests, seed)
+    with urllib.request.urlopen(f"{url}/search?limit=50") as response:
+        event_ids = [event['event_id'] for event in json.load(response)['events']] or ['missing']
+    windows = ['any', 'week', 'month']
+    kinds = rng.choice(list(MIX), size=n_requests, p=list(MIX.values()))
+    requests = []
+    for i, kind in enumerate(kinds):
+        lat, lon = locations[i]
+        if kind == 'search':
+            params = {'q': queries[i], 'lat': f"{lat:.4f}", 'lon': f"{lon:.4f}", 'miles': 25,
+                      'when': windows[i % len(windows)], 'limit': 20}
+            requests.append((kind, f"{url}/search?{urllib.parse.urlencode(params)}"))
+        elif kind == 'browse':
+            params = {'lat': f"{lat:.4f}", 'lon': f"{lon:.4f}", 'miles': 10, 'limit': 20}
+            requests.append((kind, f"{url}/search?{urllib.parse.urlencode(params)}"))
+        elif kind == 'event':
+            requests.append((kind, f"{url}/event/{event_ids[i % len(event_ids)]}"))
+        else:
+            requests.append((kind, f"{url}/similar/{event_ids[i % len(event_ids)]}?k=10"))
+    return requests
+
+
+async def load(requests, concurrency, duration):
+    """{kind: [latency seconds, ...]} and the error count, for duration seconds."""
+    client = AsyncHTTPClient(max_clients=concurrency)
+    latencies = {kind: [] for kind in MIX}
+    errors = 0
+    position = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors, position
+        while time.perf_counter() < deadline:
+            kind, request_url = requests[position % len(requests)]
+            position += 1
+            start = time.perf_counter()
+            try:
+                await client.fetch(request_url, request_timeout=30)
+            except (HTTPClientError, OSError):
+                errors += 1
+                continue
+            latencies[kind].append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    client.close()
+    return latencies, errors
+
+
+def summarize(latencies, duration):
+    ms = np.array(latencies) * 1000
+    if len(ms) == 0:
+        return {'requests': 0}
+    return {
+        'requests': len(ms),
+        'rps': round(len(ms) / duration, 1),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p95_ms': round(float(np.percentile(ms, 95)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2),
+        'max_ms': round(float(ms.max()), 2),
+    }
+
+
+def run_load(url, args):
+    requests = make_requests(url, 5000)
+    # A short warm-up so first-touch page faults aren't in the numbers
+    asyncio.run(load(requests, args.concurrency, min(2, args.duration)))
+    started = time.perf_counter()
+    latencies, errors = asyncio.run(load(requests, args.concurrency, args.duration))
+    elapsed = time.perf_counter() - started
+    result = {'all': summarize([t for times in latencies.values() for t in times], elapsed), 'errors': errors}
+    for kind, times in latencies.items():
+        result[kind] = summarize(times, elapsed)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the HTTP search API.")
+    parser.add_argument('--url', default=None, help="an api.py already running (skips the synthetic model)")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    report = {'rows': args.rows, 'concurrency': args.concurrency, 'duration': args.duration,
+              'cpu_count': os.cpu_count(), 'runs': {}}
+    if args.url:
+        report['runs']['external'] = run_load(args.url, args)
+    else:
+        model_dir = build_artifacts(args.rows, tempfile.mkdtemp(prefix='gout-api-'))
+        for processes in args.processes:
+            server, url = start_server(model_dir, args.port, processes)
+            try:
+                report['runs'][f"processes={processes}"] = run_load(url, args)
+            finally:
+                stop_server(server)
+
+    for name, result in report['runs'].items():
+        print(f"--- {name} ({result['errors']} errors) ---")
+        for kind in ['all'] + list(MIX):
+            stats = result[kind]
+            if stats['requests']:
+                print(f"{kind:>8}: {stats['rps']:>7.1f} req/s  p50 {stats['p50_ms']:.1f} ms  "
+                      f"p95 {stats['p95_ms']:.1f} ms  p99 {stats['p99_ms']:.1f} ms  max {stats['max_ms']:.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved API load report to {args.output}")
@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from benchmarks import synthetic_events
+
+# -----------------------------------------------------------------
+# TF-IDF BUILD BENCHMARK
+# -----------------------------------------------------------------
+# Builds the TF-IDF matrix for a synthetic corpus stored as a .jsonl
+# part file, each variant in a fresh Python process:
+#
+#   sklearn      what model.py does by default: read every description,
+#                TfidfVectorizer.fit_transform
+#   workers=N    tfidf_build.build_tfidf streaming the file in chunks
+#                through N processes
+#
+# Peak memory is the builder process's own VmHWM (the pool workers are
+# separate processes, reported as the largest of them).
+#
+#   python -m benchmarks.bench_build --rows 200000 --workers 1 2 4 --chunk-size 5000
+
+CHILD_SCRIPT = r'''
+import json, resource, sys, time
+
+def peak_rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+def read_events(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+variant, path, workers, chunk_size = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+start = time.perf_counter()
+if variant == 'sklearn':
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    texts = [event['description'] for event in read_events(path)]
+    matrix = TfidfVectorizer(stop_words='english').fit_transform(texts)
+else:
+    import tfidf_build
+    chunks = tfidf_build.DescriptionChunks(lambda: read_events(path), chunk_size)
+    vectorizer, matrix = tfidf_build.build_tfidf(chunks, workers=workers)
+    tfidf_build.cleanup(matrix)
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'peak_rss_mb': peak_rss_mb(),
+    'worker_peak_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    'nnz': int(matrix.nnz),
+}))
+'''
+
+
+def run_child(variant, path, workers=1, chunk_size=0):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output([sys.executable, '-c', CHILD_SCRIPT, variant, path, str(workers), str(chunk_size)],
+                                     cwd=repo_root, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def write_corpus(n_rows, path):
+    events_df = synthetic_events.generate_events(n_rows)
+    with open(path, 'w', encoding='utf-8') as f:
+        for description in events_df['description']:
+            f.write(json.dumps({'description': description}) + "\n")
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the in-memory and chunked multi-process TF-IDF builds.")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    path = write_corpus(args.rows, os.path.join(tempfile.mkdtemp(prefix='gout-build-'), 'events.jsonl'))
+    report = {'rows': args.rows, 'chunk_size': args.chunk_size, 'cpu_count': os.cpu_count(), 'variants': {}}
+    variants = [('sklearn', 1)] + [(f"workers={n}", n) for n in args.workers]
+    for name, workers in variants:
+        result = run_child('sklearn' if name == 'sklearn' else 'chunked', path, workers, args.chunk_size)
+        report['variants'][name] = result
+        print(f"{name:>10}: {result['seconds']:.2f} s, peak RSS {result['peak_rss_mb']:.0f} MB "
+              f"(largest worker {result['worker_peak_rss_mb']:.0f} MB), nnz {result['nnz']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved build report to {args.output}")
@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+import artifacts
+import geo
+import inverted_index
+from benchmarks import synthetic_events
+
+# -----------------------------------------------------------------
+# COLD START BENCHMARK
+# -----------------------------------------------------------------
+# Times what a fresh app process does before it can answer the first
+# search: import the serving modules, open the artifacts and vectorize
+# one query. Each run is a new Python process, so nothing is warm
+# except the OS file cache. Compares:
+#
+#   query_vectorizer  what app.py does now (no scikit-learn)
+#   sklearn           the same, plus the imports app.py used to do at the
+#                     top (sklearn, geopy, firebase_admin) and a real
+#                     TfidfVectorizer for the query
+#
+#   python -m benchmarks.bench_cold_start --rows 10000 --runs 5
+
+# Runs inside the child process; prints one JSON line
+CHILD_SCRIPT = r'''
+import json, sys, time
+start = time.perf_counter()
+
+def peak_rss_mb():
+    # VmHWM, not ru_maxrss: Linux carries ru_maxrss over from the parent
+    # process across fork+exec, which would hide the difference
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+import numpy, pandas
+import artifacts, geo, search, result_cache, metrics
+variant, model_dir = sys.argv[1], sys.argv[2]
+if variant == 'sklearn':
+    import importlib
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    for name in ('geopy.geocoders', 'firebase_admin', 'streamlit_geolocation'):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+imported = time.perf_counter()
+models = artifacts.load_latest(model_dir)
+vectorizer = models.vectorizer
+if variant == 'sklearn':
+    import os
+    version_dir = os.path.join(model_dir, 'artifacts', models.version)
+    with open(os.path.join(version_dir, 'meta.json')) as f:
+        meta = json.load(f)
+    vectorizer = artifacts.rebuild_vectorizer(meta['vectorizer'], numpy.load(os.path.join(version_dir, 'vocab.npy')),
+                                              numpy.load(os.path.join(version_dir, 'idf.npy')))
+search.top_k(vectorizer.transform(['live music tonight']), models.tfidf_csc, 50)
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_query_ms': (done - start) * 1000,
+    'peak_rss_mb': peak_rss_mb(),
+    'sklearn_loaded': 'sklearn' in sys.modules,
+}))
+'''
+
+
+def run_child(variant, model_dir):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output([sys.executable, '-c', CHILD_SCRIPT, variant, model_dir],
+                                     cwd=repo_root, text=True, stderr=subprocess.DEVNULL)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def build_artifacts(n_rows, workdir):
+    events_df = synthetic_events.generate_events(n_rows)
+    vectorizer = TfidfVectorizer(stop_words='english')
+    tfidf_matrix = vectorizer.fit_transform(events_df['description'])
+    geo_index = geo.GeoGridIndex(events_df['latitude'], events_df['longitude'])
+    text_index = inverted_index.InvertedIndex(tfidf_matrix, vectorizer.vocabulary_)
+    artifacts.write_artifacts(vectorizer, tfidf_matrix, events_df, geo_index, text_index,
+                              os.path.join(workdir, 'artifacts'))
+    return workdir
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time a fresh app process up to its first search.")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    model_dir = build_artifacts(args.rows, tempfile.mkdtemp(prefix='gout-cold-'))
+    report = {'rows': args.rows, 'runs': args.runs, 'variants': {}}
+    for variant in ('query_vectorizer', 'sklearn'):
+        results = [run_child(variant, model_dir) for _ in range(args.runs)]
+        summary = {key: round(float(np.median([r[key] for r in results])), 2)
+                   for key in ('import_ms', 'first_query_ms', 'peak_rss_mb')}
+        summary['sklearn_loaded'] = results[0]['sklearn_loaded']
+        report['variants'][variant] = summary
+        print(f"{variant:>16}: imports {summary['import_ms']:.0f} ms, first query after "
+              f"{summary['first_query_ms']:.0f} ms, peak RSS {summary['peak_rss_mb']:.0f} MB, "
+              f"sklearn loaded: {summary['sklearn_loaded']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved cold start report to {args.output}")
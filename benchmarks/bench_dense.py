@@ -0,0 +1,127 @@
+import argparse
+import json
+import time
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+import dense
+import search
+from benchmarks import synthetic_events
+from benchmarks.bench_pipeline import summarize
+
+# -----------------------------------------------------------------
+# DENSE RETRIEVAL BENCHMARK (RECALL@K AND LATENCY)
+# -----------------------------------------------------------------
+# Builds TF-IDF + the LSA/IVF index (dense.py) for a synthetic corpus
+# and, for a set of random queries, compares:
+#
+#   exact_float32   every event scored with float32 embeddings: the
+#                   ground truth for recall
+#   exact_int8      every event scored with the stored int8 codes
+#                   (what quantization alone costs)
+#   ivf probes=P    the served path: only the P closest lists
+#
+# plus per-query latency of sparse, dense (default probes) and hybrid.
+#
+#   python -m benchmarks.bench_dense --rows 200000 --queries 300 --k 10
+
+def exact_float32_top_k(vectors, index, query_vector, k):
+    query_embedding = index.embed_query(query_vector)
+    if not query_embedding.any():
+        return np.empty(0, dtype=np.int64)
+    scores = np.concatenate([vectors[s:s + dense.BLOCK_ROWS] @ query_embedding
+                             for s in range(0, len(vectors), dense.BLOCK_ROWS)])
+    return search.select_top_k(np.arange(len(scores)), scores, k)[0]
+
+
+def recall(found, truth):
+    return len(np.intersect1d(found, truth)) / len(truth) if len(truth) else 1.0
+
+
+def timed(fn, inputs):
+    results, seconds = [], []
+    for x in inputs:
+        start = time.perf_counter()
+        results.append(fn(x))
+        seconds.append(time.perf_counter() - start)
+    return results, summarize(seconds)
+
+
+class _Models:
+    """Just enough of ModelArtifacts for dense.hybrid_top_k."""
+
+    def __init__(self, tfidf_csc, index):
+        self.tfidf_csc = tfidf_csc
+        self.dense = index
+        self.n_events = tfidf_csc.shape[0]
+
+    def top_k(self, query_vector, k, candidate_mask=None, engine='sparse'):
+        return search.top_k(query_vector, self.tfidf_csc, k, candidate_mask)
+
+    def dense_top_k(self, query_vector, k, candidate_mask=None, exact=False):
+        return self.dense.top_k(query_vector, k, candidate_mask, exact=exact)
+
+    def dense_scores(self, query_vector, ids):
+        return self.dense.scores(self.dense.embed_query(query_vector), ids)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recall@k and latency of the LSA / IVF dense index.")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--dims', type=int, default=dense.DIMS)
+    parser.add_argument('--probes', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    events_df = synthetic_events.generate_events(args.rows)
+    vectorizer = TfidfVectorizer(stop_words='english')
+    tfidf_matrix = vectorizer.fit_transform(events_df['description'])
+    tfidf_csc = tfidf_matrix.tocsc()
+    report = {'rows': args.rows, 'queries': args.queries, 'k': args.k, 'dims': args.dims, 'build': {}}
+
+    start = time.perf_counter()
+    components = dense.fit_components(tfidf_matrix, args.dims)
+    report['build']['svd_seconds'] = round(time.perf_counter() - start, 2)
+    start = time.perf_counter()
+    index = dense.DenseIndex.build(tfidf_matrix, components)
+    report['build']['index_seconds'] = round(time.perf_counter() - start, 2)
+    report['build']['lists'] = len(index.centroids)
+    report['build']['int8_mb'] = round((index.codes.nbytes + index.scales.nbytes) / 2 ** 20, 1)
+    report['build']['float32_mb'] = round(index.codes.size * 4 / 2 ** 20, 1)
+    print(f"SVD {report['build']['svd_seconds']} s, embed + IVF {report['build']['index_seconds']} s, "
+          f"{report['build']['lists']} lists, embeddings {report['build']['int8_mb']} MB "
+          f"(float32 would be {report['build']['float32_mb']} MB)")
+
+    # Ground truth: exact search over unquantized embeddings
+    vectors = dense.normalize_rows(np.asarray(tfidf_matrix @ components, dtype=np.float32))
+    query_vectors = [vectorizer.transform([q]) for q in synthetic_events.random_queries(args.queries)]
+    truth = [exact_float32_top_k(vectors, index, qv, args.k) for qv in query_vectors]
+
+    variants = {'exact_int8': lambda qv: index.top_k(qv, args.k, exact=True)[0]}
+    for probes in args.probes:
+        variants[f"ivf probes={probes}"] = lambda qv, probes=probes: index.top_k(qv, args.k, probes=probes)[0]
+    report['variants'] = {}
+    for name, fn in variants.items():
+        found, latency = timed(fn, query_vectors)
+        latency[f'recall@{args.k}'] = round(float(np.mean([recall(f, t) for f, t in zip(found, truth)])), 4)
+        report['variants'][name] = latency
+        print(f"{name:>16}: recall@{args.k} {latency[f'recall@{args.k}']:.3f}  "
+              f"p50 {latency['p50_ms']:.3f} ms  p95 {latency['p95_ms']:.3f} ms")
+
+    models = _Models(tfidf_csc, index)
+    modes = {
+        'sparse': lambda qv: search.top_k(qv, tfidf_csc, 50),
+        'dense': lambda qv: index.top_k(qv, 50),
+        'hybrid': lambda qv: dense.hybrid_top_k(models, qv, 50),
+    }
+    report['modes'] = {}
+    for name, fn in modes.items():
+        _, latency = timed(fn, query_vectors)
+        report['modes'][name] = latency
+        print(f"{name:>16}: top 50 p50 {latency['p50_ms']:.3f} ms  p95 {latency['p95_ms']:.3f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved dense report to {args.output}")
@@ -0,0 +1,84 @@
+import argparse
+import json
+import time
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+import neighbors
+import search
+from benchmarks import synthetic_events
+from benchmarks.bench_pipeline import summarize
+
+# -----------------------------------------------------------------
+# "SIMILAR EVENTS" TABLE BENCHMARK
+# -----------------------------------------------------------------
+# Builds the neighbor table (neighbors.py) for synthetic corpora of each
+# size in --rows and reports:
+#
+#   build time     grows with N^2 (every event against every other)
+#   table size     N x K x 6 bytes
+#   exactness      the table vs scoring a sample of events one at a time
+#   lookup         one row of the table vs the on-demand search it
+#                  replaces (the description scored against every event)
+#
+#   python -m benchmarks.bench_neighbors --rows 10000 20000 40000 --workers 4
+
+def on_demand(tfidf_csc, tfidf_matrix, row, k):
+    """What "Similar events" costs without the table: the event's row as a query."""
+    candidates = np.ones(tfidf_matrix.shape[0], dtype=bool)
+    candidates[row] = False
+    return search.top_k(tfidf_matrix[row], tfidf_csc, k, candidates)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build time, exactness and lookup latency of the neighbor table.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 20000, 40000])
+    parser.add_argument('--k', type=int, default=neighbors.K)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    report = {'k': args.k, 'workers': args.workers, 'sizes': []}
+    rng = np.random.default_rng(0)
+    for n_rows in args.rows:
+        events_df = synthetic_events.generate_events(n_rows)
+        tfidf_matrix = TfidfVectorizer(stop_words='english').fit_transform(events_df['description']).tocsr()
+        tfidf_csc = tfidf_matrix.tocsc()
+
+        start = time.perf_counter()
+        ids, scores = neighbors.build_neighbors(tfidf_matrix, args.k, workers=args.workers)
+        build_seconds = time.perf_counter() - start
+
+        sample = rng.choice(n_rows, size=min(args.samples, n_rows), replace=False)
+        lookup_seconds, on_demand_seconds, worst_error = [], [], 0.0
+        for row in sample:
+            start = time.perf_counter()
+            _, table_scores = neighbors.lookup(ids, scores, row)
+            lookup_seconds.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            _, exact_scores = on_demand(tfidf_csc, tfidf_matrix, row, args.k)
+            on_demand_seconds.append(time.perf_counter() - start)
+            # Compared by score: ids can swap between events that tie
+            n = min(len(table_scores), len(exact_scores))
+            if len(table_scores) != len(exact_scores):
+                worst_error = float('inf')
+            elif n:
+                worst_error = max(worst_error, float(np.abs(table_scores[:n] - exact_scores[:n]).max()))
+
+        size = {
+            'rows': n_rows,
+            'build_seconds': round(build_seconds, 2),
+            'table_mb': round((ids.nbytes + scores.nbytes) / 2 ** 20, 2),
+            'max_score_error': worst_error,
+            'lookup': summarize(lookup_seconds),
+            'on_demand': summarize(on_demand_seconds),
+        }
+        report['sizes'].append(size)
+        print(f"{n_rows:>8} events: build {size['build_seconds']} s, table {size['table_mb']} MB, "
+              f"max score error {worst_error:.4f}, lookup p50 {size['lookup']['p50_ms']:.3f} ms "
+              f"vs on-demand p50 {size['on_demand']['p50_ms']:.3f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved neighbors report to {args.output}")
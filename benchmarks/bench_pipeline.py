@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+import artifacts
+import geo
+import inverted_index
+import search
+from benchmarks import synthetic_events
+
+# -----------------------------------------------------------------
+# SEARCH / GEO / LOAD BENCHMARK
+# -----------------------------------------------------------------
+# Builds a synthetic corpus of each requested size and times every stage
+# of the pipeline the app runs:
+#
+#   model_build, artifact_write, artifact_load        (once per size)
+#   query_vectorize, rank_*, distance_*, rows_to_dict (once per query)
+#
+# and writes p50/p95/p99 latency plus peak memory as JSON, tagged with
+# the current git commit, so two commits can be compared run against run.
+#
+#   python -m benchmarks.bench_pipeline --rows 1000 10000 100000 --output bench_output.json
+
+TOP_N = 50
+RADIUS_MILES = 10
+ROWS_SHOWN = 10
+
+# The old cosine_similarity + argsort ranking is O(N) per query; skip it for huge corpora
+BASELINE_MAX_ROWS = 200_000
+
+
+def summarize(seconds):
+    ms = np.array(seconds) * 1000
+    return {
+        'count': len(ms),
+        'mean_ms': round(float(ms.mean()), 4),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4),
+    }
+
+
+def measure_once(fn):
+    """(result, stats) for one call, with the Python-heap peak it caused."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = summarize([elapsed])
+    stats['peak_mb'] = round(peak / 2 ** 20, 2)
+    return result, stats
+
+
+def measure_each(fn, inputs):
+    """Latency stats for fn(x) over every x in inputs."""
+    times = []
+    for x in inputs:
+        start = time.perf_counter()
+        fn(x)
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+
+def build_model(events_df):
+    vectorizer = TfidfVectorizer(stop_words='english')
+    tfidf_matrix = vectorizer.fit_transform(events_df['description'])
+    geo_index = geo.GeoGridIndex(events_df['latitude'], events_df['longitude'])
+    text_index = inverted_index.InvertedIndex(tfidf_matrix, vectorizer.vocabulary_)
+    return vectorizer, tfidf_matrix, geo_index, text_index
+
+
+def bench_size(n_rows, n_queries, workdir):
+    print(f"--- {n_rows} events ---")
+    events_df = synthetic_events.generate_events(n_rows)
+    queries = synthetic_events.random_queries(n_queries)
+    locations = synthetic_events.random_locations(n_queries)
+    stages = {}
+
+    (vectorizer, tfidf_matrix, geo_index, text_index), stages['model_build'] = measure_once(
+        lambda: build_model(events_df))
+
+    artifacts_dir = os.path.join(workdir, f"rows-{n_rows}", 'artifacts')
+    _, stages['artifact_write'] = measure_once(
+        lambda: artifacts.write_artifacts(vectorizer, tfidf_matrix, events_df, geo_index, text_index, artifacts_dir))
+
+    model_dir = os.path.dirname(artifacts_dir)
+    models, stages['artifact_load'] = measure_once(lambda: artifacts.load_latest(model_dir))
+
+    query_vectors = [models.vectorizer.transform([q]) for q in queries]
+    stages['query_vectorize'] = measure_each(lambda q: models.vectorizer.transform([q]), queries)
+    stages['rank_sparse'] = measure_each(
+        lambda qv: search.top_k(qv, models.tfidf_csc, TOP_N), query_vectors)
+    stages['rank_inverted'] = measure_each(
+        lambda qv: models.text_index.top_k(qv, TOP_N, exact_matrix=models.tfidf_matrix), query_vectors)
+    if n_rows <= BASELINE_MAX_ROWS:
+        stages['rank_cosine_argsort'] = measure_each(
+            lambda qv: cosine_similarity(qv, models.tfidf_matrix).flatten().argsort()[-TOP_N:][::-1], query_vectors)
+
+    stages['distance_geo_index'] = measure_each(
+        lambda loc: models.geo_index.query_radius(loc, RADIUS_MILES), locations)
+    stages['distance_full_scan'] = measure_each(
+        lambda loc: geo.within_radius(loc, models.event_lats, models.event_lons, RADIUS_MILES), locations)
+
+    shown = [search.top_k(qv, models.tfidf_csc, ROWS_SHOWN)[0] for qv in query_vectors]
+    stages['rows_to_dict'] = measure_each(
+        lambda ids: [row.to_dict() for _, row in models.events_df.iloc[ids].iterrows()], shown)
+
+    for name, stats in stages.items():
+        print(f"{name:>22}: p50 {stats['p50_ms']:.3f} ms  p95 {stats['p95_ms']:.3f} ms  p99 {stats['p99_ms']:.3f} ms")
+    return {'rows': n_rows, 'queries': n_queries, 'stages': stages}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the search pipeline on synthetic events.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--workdir', default=None, help="where to write artifacts (default: a temp folder)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='gout-bench-')
+    results = [bench_size(n_rows, args.queries, workdir) for n_rows in args.rows]
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        # ru_maxrss is in KB on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved benchmark report to {args.output}")
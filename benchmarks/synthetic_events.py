@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------
+# SYNTHETIC EVENT GENERATOR
+# -----------------------------------------------------------------
+# Makes fake events with the same columns as data/eventbrite_events.csv
+# (plus latitude/longitude, as model.py adds them), from 1k up to 1M
+# rows, so the search / geo / load paths can be timed past the 200 real
+# events we have. Same seed -> same corpus, so runs are comparable
+# between commits.
+#
+#   python -m benchmarks.synthetic_events --rows 100000 --output /tmp/events.csv
+
+CATEGORY_WORDS = {
+    'Music': ['concert', 'band', 'live', 'music', 'jazz', 'rock', 'acoustic', 'dj', 'tour', 'songs'],
+    'Food & Drink': ['tasting', 'wine', 'beer', 'brunch', 'dinner', 'chef', 'brewery', 'cocktails', 'food', 'pairing'],
+    'Performing & Visual Arts': ['theater', 'gallery', 'comedy', 'improv', 'dance', 'ballet', 'exhibit', 'painting', 'show', 'opera'],
+    'Community & Culture': ['festival', 'market', 'library', 'volunteer', 'heritage', 'parade', 'fair', 'meetup', 'neighbors', 'culture'],
+    'Sports & Fitness': ['run', 'yoga', '5k', 'race', 'hike', 'cycling', 'fitness', 'game', 'tournament', 'workout'],
+    'Business': ['networking', 'startup', 'workshop', 'career', 'founders', 'marketing', 'leadership', 'pitch', 'summit', 'panel'],
+    'Family & Education': ['kids', 'family', 'storytime', 'science', 'class', 'learn', 'museum', 'camp', 'crafts', 'lecture'],
+    'Seasonal & Holiday': ['holiday', 'halloween', 'thanksgiving', 'christmas', 'winter', 'lights', 'santa', 'pumpkin', 'new', 'year'],
+}
+CATEGORIES = list(CATEGORY_WORDS)
+
+COMMON_WORDS = (
+    'join us for an evening of fun friends great night local community special guests tickets '
+    'free all ages welcome bring your family and enjoy amazing experience downtown venue hosted '
+    'annual event weekend celebrate together open doors early seating limited register today '
+    'featuring best area food drinks available outdoor indoor rain shine parking'
+).split()
+
+# (city, state, zip prefix, lat, lon): events are scattered around these
+CITIES = [
+    ('New Haven', 'CT', '065', 41.3083, -72.9279), ('Hartford', 'CT', '061', 41.7658, -72.6734),
+    ('Stamford', 'CT', '069', 41.0534, -73.5387), ('Boston', 'MA', '021', 42.3601, -71.0589),
+    ('Providence', 'RI', '029', 41.8240, -71.4128), ('New York', 'NY', '100', 40.7128, -74.0060),
+    ('Albany', 'NY', '122', 42.6526, -73.7562), ('Philadelphia', 'PA', '191', 39.9526, -75.1652),
+    ('Burlington', 'VT', '054', 44.4759, -73.2121), ('Portland', 'ME', '041', 43.6591, -70.2568),
+]
+STREETS = ['Main Street', 'Chapel Street', 'Elm Street', 'Church Street', 'State Street', 'Park Avenue', 'Broadway']
+
+
+def generate_events(n_rows, seed=0, online_fraction=0.05, start='2026-01-01'):
+    """A DataFrame of n_rows synthetic events (title, datetime, location_name,
+    address, description, category, source_url, source_site, latitude, longitude)."""
+    rng = np.random.default_rng(seed)
+
+    category_ids = rng.integers(0, len(CATEGORIES), n_rows)
+    city_ids = rng.integers(0, len(CITIES), n_rows)
+    venue_numbers = rng.integers(1, 400, n_rows)
+
+    # Zipf-like word popularity, like real descriptions
+    common = np.array(COMMON_WORDS)
+    common_p = 1 / np.arange(1, len(common) + 1)
+    common_p /= common_p.sum()
+
+    titles, descriptions, addresses, names = [], [], [], []
+    lengths = rng.integers(8, 40, n_rows)
+    common_draws = rng.choice(len(common), size=int(lengths.sum()), p=common_p)
+    topic_draws = rng.integers(0, 10, size=int(lengths.sum()))
+    offset = 0
+    for i in range(n_rows):
+        topic = CATEGORY_WORDS[CATEGORIES[category_ids[i]]]
+        end = offset + lengths[i]
+        words = list(common[common_draws[offset:end]])
+        # Every 4th word comes from the event's category
+        words[::4] = [topic[t] for t in topic_draws[offset:end:4]]
+        descriptions.append(" ".join(words).capitalize() + ".")
+
+        city, state, zip_prefix, _, _ = CITIES[city_ids[i]]
+        titles.append(f"{topic[topic_draws[offset + 1]].title()} {topic[topic_draws[offset + 2]]} in {city}")
+        names.append(f"{city} {topic[topic_draws[offset + 3]].title()} Hall {venue_numbers[i] % 40}")
+        addresses.append(f"{venue_numbers[i]} {STREETS[venue_numbers[i] % len(STREETS)]}, {city}, {state} "
+                         f"{zip_prefix}{venue_numbers[i] % 100:02d}")
+        offset = end
+
+    city_lat = np.array([c[3] for c in CITIES])[city_ids]
+    city_lon = np.array([c[4] for c in CITIES])[city_ids]
+    latitudes = city_lat + rng.normal(0, 0.15, n_rows)
+    longitudes = city_lon + rng.normal(0, 0.15, n_rows)
+
+    online = rng.random(n_rows) < online_fraction
+    latitudes[online] = np.nan
+    longitudes[online] = np.nan
+    addresses = np.where(online, "Online", np.array(addresses, dtype=object))
+    names = np.where(online, "Online Event", np.array(names, dtype=object))
+
+    starts = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, 180 * 24 * 4, n_rows) * 15, unit='min')
+
+    return pd.DataFrame({
+        'title': titles,
+        'datetime': starts.strftime('%Y-%m-%dT%H:%M'),
+        'location_name': names,
+        'address': addresses,
+        'description': descriptions,
+        'category': np.array(CATEGORIES)[category_ids],
+        'source_url': [f"https://example.com/e/synthetic-{seed}-{i}" for i in range(n_rows)],
+        'source_site': 'Synthetic',
+        'latitude': latitudes,
+        'longitude': longitudes,
+    })
+
+
+def random_queries(n_queries, seed=1):
+    """Search strings mixing category words and common words, like real users type."""
+    rng = np.random.default_rng(seed)
+    topic_words = [word for words in CATEGORY_WORDS.values() for word in words]
+    queries = []
+    for _ in range(n_queries):
+        n_words = rng.integers(1, 4)
+        words = list(rng.choice(topic_words, size=n_words))
+        if rng.random() < 0.3:
+            words.append(rng.choice(COMMON_WORDS))
+        queries.append(" ".join(words))
+    return queries
+
+
+def random_locations(n_locations, seed=2):
+    """User locations near the synthetic cities."""
+    rng = np.random.default_rng(seed)
+    city_ids = rng.integers(0, len(CITIES), n_locations)
+    return [(CITIES[c][3] + rng.normal(0, 0.1), CITIES[c][4] + rng.normal(0, 0.1)) for c in city_ids]
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate synthetic events.")
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='data/synthetic_events.csv')
+    args = parser.parse_args()
+    generate_events(args.rows, args.seed).to_csv(args.output, index=False)
+    print(f"Wrote {args.rows} synthetic events to {args.output}")
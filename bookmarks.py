@@ -0,0 +1,254 @@
+import atexit
+import hashlib
+import threading
+import time
+
+# -----------------------------------------------------------------
+# BOOKMARK STORE (WRITE-BEHIND, BATCHED)
+# -----------------------------------------------------------------
+# "❤️ Save" used to write the whole event row to Firestore while the page
+# waited. Now a save:
+#   - stores only the event id plus the few fields a saved-events list
+#     shows (title, date, venue, link),
+#   - uses the event id as the document id, so saving twice is one doc,
+#   - goes into a queue that a background thread flushes as Firestore
+#     batch commits (up to 500 writes each), off the render thread.
+#
+# Each user's bookmarks are read from Firestore once, kept in memory
+# (and updated by the user's own saves), and handed out a page at a time.
+#
+# Anything with Firestore's client API works as `client`: the real
+# firestore.client() (which talks to the emulator when
+# FIRESTORE_EMULATOR_HOST is set), or InMemoryFirestore below for tests.
+
+# Fields kept with each bookmark, enough to draw it if the event is gone
+BOOKMARK_FIELDS = ('title', 'datetime', 'location_name', 'source_url')
+
+# Firestore allows at most 500 writes per batch
+MAX_BATCH_WRITES = 500
+
+
+def event_id(row):
+    """Stable id for an event: a hash of its ticket link (or title + date + venue)."""
+    source_url = row.get('source_url')
+    if isinstance(source_url, str) and source_url:
+        basis = source_url
+    else:
+        basis = "|".join(str(row.get(field, '')) for field in ('title', 'datetime', 'location_name'))
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()[:20]
+
+
+def event_id_index(events_df):
+    """{event id: row position} for resolving bookmarks against the events table."""
+    index = {}
+    columns = [field for field in BOOKMARK_FIELDS if field in events_df.columns]
+    for position, row in enumerate(events_df[columns].to_dict('records')):
+        # Later rows win: after an incremental build the newest copy of an event is last
+        index[event_id(row)] = position
+    return index
+
+
+def bookmark_record(row, saved_at):
+    record = {'event_id': event_id(row), 'saved_at': saved_at}
+    for field in BOOKMARK_FIELDS:
+        value = row.get(field)
+        record[field] = None if value is None else str(value)
+    return record
+
+
+def normalize_record(record):
+    """A stored bookmark with event_id and saved_at, even if the old app wrote it.
+
+    The app used to save the whole event row under a random document id,
+    with neither field; those docs are keyed by their computed event id
+    here, so saving the same event again is still caught as a duplicate.
+    """
+    if record.get('event_id') and 'saved_at' in record:
+        return record
+    record = dict(record)
+    record['event_id'] = record.get('event_id') or event_id(record)
+    record.setdefault('saved_at', None)
+    return record
+
+
+class BookmarkStore:
+    def __init__(self, client, flush_interval=1.0, cache_ttl_seconds=300, clock=time.time):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.clock = clock
+        self.commits = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._pending = {}          # (uid, event id) -> record, in save order
+        self._cache = {}            # uid -> (loaded_at, {event id: record})
+        self._wake = threading.Event()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name='bookmark-writer', daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def _collection(self, uid):
+        return self.client.collection('users').document(uid).collection('bookmarks')
+
+    # --- writes ---
+
+    def save(self, uid, row):
+        """Queue a bookmark; False if the user already has this event saved."""
+        record = bookmark_record(row, self.clock())
+        key = (uid, record['event_id'])
+        saved = self._saved(uid)
+        with self._lock:
+            if record['event_id'] in saved or key in self._pending:
+                return False
+            self._pending[key] = record
+            saved[record['event_id']] = record
+            if len(self._pending) >= MAX_BATCH_WRITES:
+                self._wake.set()
+        return True
+
+    def flush(self):
+        """Commit everything queued so far (the worker calls this)."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                keys = list(self._pending)[:MAX_BATCH_WRITES]
+                records = [self._pending.pop(key) for key in keys]
+            batch = self.client.batch()
+            for (uid, doc_id), record in zip(keys, records):
+                batch.set(self._collection(uid).document(doc_id), record)
+            try:
+                batch.commit()
+            except Exception as e:
+                # Put them back (unless saved again meanwhile) and retry on the next tick
+                print(f"Bookmark batch of {len(keys)} failed, will retry: {e}")
+                with self._lock:
+                    for key, record in zip(keys, records):
+                        self._pending.setdefault(key, record)
+                return
+            self.commits += 1
+            self.writes += len(keys)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the worker and write whatever is still queued."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._worker.join(timeout=10)
+        self.flush()
+
+    # --- reads ---
+
+    def _saved(self, uid):
+        """{event id: record} for one user, from memory or Firestore."""
+        with self._lock:
+            cached = self._cache.get(uid)
+            if cached and self.clock() - cached[0] < self.cache_ttl_seconds:
+                return cached[1]
+        records = {}
+        for doc in self._collection(uid).stream():
+            record = normalize_record(doc.to_dict())
+            records[record['event_id']] = record
+        with self._lock:
+            # Saves still waiting in the queue are not in Firestore yet
+            for (pending_uid, doc_id), record in self._pending.items():
+                if pending_uid == uid:
+                    records[doc_id] = record
+            self._cache[uid] = (self.clock(), records)
+        return records
+
+    def is_saved(self, uid, row):
+        return event_id(row) in self._saved(uid)
+
+    def count(self, uid):
+        return len(self._saved(uid))
+
+    def list_page(self, uid, page=0, page_size=10):
+        """One page of a user's bookmarks, newest first."""
+        records = sorted(self._saved(uid).values(), key=lambda r: r.get('saved_at') or 0, reverse=True)
+        return records[page * page_size:(page + 1) * page_size]
+
+
+# -----------------------------------------------------------------
+# IN-MEMORY FIRESTORE (for tests and local runs without credentials)
+# -----------------------------------------------------------------
+# Only the calls BookmarkStore makes: collection/document chains, set,
+# stream, batch().set/commit.
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _DocumentRef:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+        self.id = path[-1]
+
+    def collection(self, name):
+        return _CollectionRef(self._db, self.path + (name,))
+
+    def set(self, data):
+        with self._db.lock:
+            self._db.docs[self.path] = dict(data)
+
+    def get(self):
+        return _Snapshot(self.id, self._db.docs.get(self.path, {}))
+
+
+class _CollectionRef:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+
+    def document(self, doc_id):
+        return _DocumentRef(self._db, self.path + (doc_id,))
+
+    def stream(self):
+        with self._db.lock:
+            docs = [(path[-1], data) for path, data in self._db.docs.items()
+                    if path[:-1] == self.path]
+        return iter([_Snapshot(doc_id, data) for doc_id, data in docs])
+
+
+class _Batch:
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+
+    def set(self, doc_ref, data):
+        self._writes.append((doc_ref.path, dict(data)))
+
+    def commit(self):
+        if len(self._writes) > MAX_BATCH_WRITES:
+            raise ValueError(f"Batch has {len(self._writes)} writes, Firestore allows {MAX_BATCH_WRITES}")
+        with self._db.lock:
+            for path, data in self._writes:
+                self._db.docs[path] = data
+        self._db.commits += 1
+
+
+class InMemoryFirestore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.docs = {}      # path tuple -> data
+        self.commits = 0
+
+    def collection(self, name):
+        return _CollectionRef(self, (name,))
+
+    def batch(self):
+        return _Batch(self)
@@ -0,0 +1,77 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import geocode_cache
+from benchmarks import synthetic_events
+
+# A full build followed by `model.py --incremental` on the very same scrape
+# must find nothing to do: no delta segment, "Nothing changed". The scrape
+# has one event listed twice, by two sites, with the address spelled two
+# ways, so it only stays a single row if both runs geocode before they
+# de-duplicate (see dedup.py).
+#
+# Runs model.py in a temporary folder; every address is put in its geocode
+# cache first, so nothing goes to Nominatim.
+#
+#   python check_incremental.py
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_model(work_dir, *flags):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    result = subprocess.run([sys.executable, os.path.join(REPO_DIR, 'model.py'), '--neighbors', '0', *flags],
+                            cwd=work_dir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stdout + result.stderr)
+        raise SystemExit(f"❌ FATAL ERROR: model.py {' '.join(flags)} failed.")
+    return result.stdout
+
+
+work_dir = tempfile.mkdtemp(prefix='gout-check-')
+os.makedirs(os.path.join(work_dir, 'data'))
+
+events_df = synthetic_events.generate_events(300)
+# The duplicate: one event on two sites, the address written two ways
+listing = {'title': "Harbor Lights Jazz Quartet", 'datetime': '2026-03-14T19:30', 'location_name': "Firehouse 12",
+           'address': "45 Crown Street, New Haven, CT 06510", 'category': 'Music',
+           'description': "The Harbor Lights Jazz Quartet plays standards and originals for one night only, "
+                          "with a late set after the interval.",
+           'source_url': 'https://example.com/e/harbor-lights', 'source_site': 'Synthetic',
+           'latitude': 41.3055, 'longitude': -72.9259}
+events_df.loc[len(events_df)] = listing
+events_df.loc[len(events_df)] = dict(listing, address="45 Crown St, New Haven CT", source_site='OtherSite',
+                                     source_url='https://example.com/other-site/harbor-lights')
+events_df.drop(columns=['latitude', 'longitude']).to_csv(os.path.join(work_dir, 'data', 'eventbrite_events.csv'),
+                                                         index=False)
+
+cache = geocode_cache.GeocodeCache(os.path.join(work_dir, 'data', 'geocode_cache.sqlite'))
+for address, lat, lon in zip(events_df['address'], events_df['latitude'], events_df['longitude']):
+    cache.store(address, (lat, lon))
+cache.close()
+
+print(f"Full build, then --incremental, on the same {len(events_df)} scraped events in {work_dir} ...")
+full_output = run_model(work_dir)
+incremental_output = run_model(work_dir, '--incremental')
+versions = [name for name in os.listdir(os.path.join(work_dir, 'model', 'artifacts')) if name[0].isdigit()]
+shutil.rmtree(work_dir, ignore_errors=True)
+
+print("----------------------------------------")
+problems = []
+if 'Merged 1 duplicate clusters' not in full_output:
+    problems.append("the full build did not merge the duplicate listing")
+if 'Nothing changed' not in incremental_output:
+    problems.append("--incremental found changes: " +
+                    next((line for line in incremental_output.splitlines() if 'new or changed' in line), '?'))
+if len(versions) != 1:
+    problems.append(f"{len(versions)} versions in model/artifacts/, expected only the full build")
+
+if problems:
+    print("❌ FAILED:")
+    for problem in problems:
+        print(f"   - {problem}")
+else:
+    print("✅ SUCCESS: the incremental run on an unchanged scrape wrote no delta.")
+print("----------------------------------------")
@@ -1,11 +1,11 @@
 import pandas as pd
-import pickle
 import os
+import artifacts
 
-print("Checking your model file: model/events_data.pkl")
-
-# Define the file path
-file_path = 'model/events_data.pkl'
+# Newest artifact version written by model.py, or the old pickle files
+version = artifacts.latest_version('model')
+file_path = f"model/artifacts/{version}" if version else 'model/events_data.pkl'
+print(f"Checking your model file: {file_path}")
 
 if not os.path.exists(file_path):
     print(f"\n❌ FATAL ERROR: '{file_path}' not found.")
@@ -13,14 +13,13 @@ if not os.path.exists(file_path):
     exit()
 
 try:
-    # Load the saved events DataFrame
-    with open(file_path, 'rb') as f:
-        events_df = pd.read_pickle(f)
+    # Load the saved events table
+    events_df = artifacts.load_latest('model').events_df
     
     print("\n--- Success! Model file loaded. ---")
     
     # Print all the column names in the file
-    print("\nColumns found in your .pkl file:")
+    print("\nColumns found in your model file:")
     print(list(events_df.columns))
     
     print("-" * 40)
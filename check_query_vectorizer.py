@@ -0,0 +1,72 @@
+import json
+import os
+import pickle
+import numpy as np
+import artifacts
+import query_vectorizer
+
+# Check that query_vectorizer.QueryVectorizer (used by app.py, no
+# scikit-learn) gives exactly the same vectors as the TfidfVectorizer it
+# was saved from: same terms, same weights, bit for bit.
+# Every title, venue and description is used as a query, plus a few
+# awkward ones.
+
+print("Comparing QueryVectorizer with TfidfVectorizer on model/ ...")
+
+version = artifacts.latest_version('model')
+if version:
+    models = artifacts.load_artifacts(os.path.join('model', 'artifacts', version))
+    fast = models.vectorizer
+    # Delta segments use the vocabulary of the base version they name
+    with open(os.path.join('model', 'artifacts', version, 'meta.json'), encoding='utf-8') as f:
+        version = json.load(f).get('vocabulary_version', version)
+    version_dir = os.path.join('model', 'artifacts', version)
+    with open(os.path.join(version_dir, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    sklearn_vectorizer = artifacts.rebuild_vectorizer(meta['vectorizer'], np.load(os.path.join(version_dir, 'vocab.npy')),
+                                                      np.load(os.path.join(version_dir, 'idf.npy')))
+    events_df = models.events_df
+elif os.path.exists('model/vectorizer.pkl'):
+    with open('model/vectorizer.pkl', 'rb') as f: sklearn_vectorizer = pickle.load(f)
+    fast = query_vectorizer.QueryVectorizer.from_vectorizer(sklearn_vectorizer)
+    events_df = artifacts.load_legacy_pickles('model').events_df
+else:
+    print("\n❌ FATAL ERROR: model files not found.")
+    print("Please run 'model.py' to create them.")
+    exit()
+
+queries = []
+for column in ('title', 'location_name', 'description'):
+    if column in events_df.columns:
+        queries += events_df[column].fillna('').astype(str).tolist()
+queries += [
+    '', '   ', 'the and of', 'LIVE Music!!', 'live live live music', 'jazz-night @ 8pm',
+    'café crème brûlée', 'Ｆｕｌｌｗｉｄｔｈ ｔｅｘｔ', 'naïve résumé', 'kids & family, storytime; science?',
+    'zzzz-not-a-word qqqq', '5k run 2026', "rock'n'roll", 'music\nnewline\ttab',
+]
+
+mismatches = 0
+for query in queries:
+    expected = sklearn_vectorizer.transform([query])
+    got = fast.transform([query])
+    same = (
+        expected.shape == got.shape
+        and np.array_equal(expected.indices, got.indices)
+        and np.array_equal(expected.data, got.data)
+    )
+    if not same:
+        mismatches += 1
+        print(f"❌ Different vector for query: {query[:60]!r}")
+
+# A batch of queries in one call too
+batch = queries[:50]
+if (sklearn_vectorizer.transform(batch) != fast.transform(batch)).nnz:
+    mismatches += 1
+    print("❌ Different vectors for a batch of queries")
+
+print("-" * 40)
+if mismatches == 0:
+    print(f"✅ SUCCESS: identical vectors for all {len(queries)} queries.")
+else:
+    print(f"❌ ERROR: {mismatches} of {len(queries)} queries differ.")
+print("-" * 40)
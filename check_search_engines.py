@@ -0,0 +1,56 @@
+import os
+import time
+import numpy as np
+import artifacts
+import inverted_index
+
+# A/B check for the two text search engines used by app.py:
+#   "sparse"   -> search.top_k over the CSC matrix
+#   "inverted" -> inverted_index.InvertedIndex (MaxScore over posting lists)
+# Every event title is used as a query; both engines must return the same
+# events in the same order (across all segments after incremental builds).
+
+print("Comparing search engines on model/ ...")
+
+if not artifacts.latest_version('model') and not os.path.exists('model/tfidf_matrix.pkl'):
+    print("\n❌ FATAL ERROR: model files not found.")
+    print("Please run 'model.py' to create them.")
+    exit()
+
+models = artifacts.load_latest('model')
+vectorizer = models.vectorizer
+events_df = models.events_df
+
+if models.version == 'legacy' and models.text_index is None:
+    print("No inverted index saved yet, building one in memory.")
+    models.text_index = inverted_index.InvertedIndex(models.tfidf_matrix, vectorizer.vocabulary_)
+
+queries = events_df['title'].fillna('').tolist()
+timings = {"sparse": [], "inverted": []}
+mismatches = 0
+
+for query in queries:
+    query_vector = vectorizer.transform([query])
+
+    start = time.perf_counter()
+    sparse_ids, _ = models.top_k(query_vector, 50, engine="sparse")
+    timings["sparse"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    inverted_ids, _ = models.top_k(query_vector, 50, engine="inverted")
+    timings["inverted"].append(time.perf_counter() - start)
+
+    if not np.array_equal(sparse_ids, inverted_ids):
+        mismatches += 1
+        print(f"❌ Different results for query: {query!r}")
+
+print("-" * 40)
+for engine, times in timings.items():
+    times_ms = np.array(times) * 1000
+    print(f"{engine:>8}: p50 {np.percentile(times_ms, 50):.3f} ms, p95 {np.percentile(times_ms, 95):.3f} ms")
+
+if mismatches == 0:
+    print(f"✅ SUCCESS: both engines agree on all {len(queries)} queries.")
+else:
+    print(f"❌ ERROR: {mismatches} of {len(queries)} queries differ.")
+print("-" * 40)
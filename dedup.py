@@ -0,0 +1,213 @@
+import re
+import numpy as np
+import pandas as pd
+import geo
+import geocode_cache
+
+# -----------------------------------------------------------------
+# CROSS-SOURCE NEAR-DUPLICATE DETECTION (MINHASH + LSH)
+# -----------------------------------------------------------------
+# The same event shows up on Eventbrite, Meetup and the library calendar
+# with slightly different wording. model.py collapses those before
+# building the index:
+#
+#   1. shingles: every 5-character window of the normalized title +
+#      description, hashed in one NumPy pass over the whole corpus
+#   2. MinHash: NUM_PERM min-hashes per event; the share of equal
+#      positions in two signatures estimates the Jaccard similarity of
+#      their shingle sets
+#   3. LSH banding: signatures cut into BANDS bands of ROWS rows; events
+#      that share any whole band land in the same bucket and become a
+#      candidate pair. This finds pairs above ~0.5 similarity in roughly
+#      linear time instead of comparing all N^2 pairs.
+#   4. a candidate pair is a duplicate when the estimated similarity is
+#      at least MIN_SIMILARITY, the start times are within MAX_HOURS and
+#      the venues are within MAX_MILES (or the same address when either
+#      side has no coordinates)
+#   5. duplicates are joined into clusters (union-find); each cluster
+#      keeps one canonical row (the longest description) plus every
+#      member's link in source_urls and site in source_sites
+#
+# Unknown datetimes don't rule a pair out; text + place still have to match.
+
+SHINGLE_CHARS = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+MIN_SIMILARITY = 0.6
+MAX_HOURS = 2
+MAX_MILES = 0.5
+
+# Buckets bigger than this are boilerplate ("Details to come") and skipped
+MAX_BUCKET = 50
+
+# Multiply-shift hashing, (a * x + b) >> 32 on 32-bit x with wrapping
+# 64-bit arithmetic: a fresh "permutation" per signature slot, no modulo
+_rng = np.random.RandomState(20240611)
+_A = _rng.randint(1, 1 << 62, size=NUM_PERM, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+_B = _rng.randint(0, 1 << 62, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_EMPTY = np.uint64(1 << 32)
+_SHINGLE_MIX = _rng.randint(1, 1 << 62, size=SHINGLE_CHARS, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+_BAND_MIX = _rng.randint(1, 1 << 62, size=ROWS, dtype=np.int64).astype(np.uint64)
+
+
+def normalize_text(text):
+    if not isinstance(text, str):
+        return ''
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+
+def shingle_hashes(texts, k=SHINGLE_CHARS):
+    """Hash of every k-character window of every text, all in one array.
+
+    Returns (hashes, windows per text). Repeated windows are left in:
+    they can't change a minimum. Texts shorter than k count as one window.
+    """
+    data = [text.encode('utf-8').ljust(k) if text else b'' for text in texts]
+    lengths = np.array([len(d) for d in data], dtype=np.int64)
+    counts = np.where(lengths > 0, lengths - k + 1, 0)
+    buffer = np.frombuffer(b''.join(data), dtype=np.uint8).astype(np.uint64)
+    if len(buffer) < k:
+        return np.empty(0, dtype=np.uint64), counts
+    windows = np.lib.stride_tricks.sliding_window_view(buffer, k)
+    hashes = (windows * _SHINGLE_MIX).sum(axis=1)       # wraps mod 2^64
+    hashes ^= hashes >> np.uint64(29)
+    # Keep the windows that start inside a text and end before its last byte
+    offsets = np.arange(len(buffer)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    valid = (offsets <= np.repeat(lengths - k, lengths))[:len(hashes)]
+    return hashes[valid], counts
+
+
+def minhash_signatures(texts):
+    """(N, NUM_PERM) uint64 signatures, and a mask of rows that had any text."""
+    hashes, counts = shingle_hashes(texts)
+    has_text = counts > 0
+    signatures = np.full((len(texts), NUM_PERM), _EMPTY, dtype=np.uint64)
+    if not has_text.any():
+        return signatures, has_text
+    values = (hashes ^ (hashes >> np.uint64(32))) & np.uint64(0xFFFFFFFF)
+    starts = np.concatenate([[0], np.cumsum(counts[has_text])[:-1]])
+    for perm in range(NUM_PERM):
+        permuted = (_A[perm] * values + _B[perm]) >> np.uint64(32)
+        signatures[has_text, perm] = np.minimum.reduceat(permuted, starts)
+    return signatures, has_text
+
+
+def candidate_pairs(signatures, has_text):
+    """(M, 2) array of row pairs, i < j, that share at least one LSH band."""
+    rows = np.flatnonzero(has_text)
+    found = []
+    for band in range(BANDS):
+        block = signatures[rows, band * ROWS:(band + 1) * ROWS]
+        keys = (block * _BAND_MIX).sum(axis=1)      # wraps mod 2^64, fine for a bucket key
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # Bucket sizes, and each sorted position's bucket size
+        new_bucket = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+        bucket_ids = np.cumsum(new_bucket) - 1
+        sizes = np.bincount(bucket_ids)[bucket_ids]
+        usable = (sizes >= 2) & (sizes <= MAX_BUCKET)
+        # Every pair inside a bucket is (position p, position p + step) for some step
+        for step in range(1, min(MAX_BUCKET, len(order))):
+            same = usable[:-step] & (bucket_ids[:-step] == bucket_ids[step:])
+            if not same.any():
+                break
+            first, second = rows[order[:-step][same]], rows[order[step:][same]]
+            found.append(np.stack([np.minimum(first, second), np.maximum(first, second)], axis=1))
+    if not found:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(found), axis=0)
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def split_sources(row):
+    """(urls, sites) lists of every listing of a collapsed event, its own link first.
+
+    Rows built before de-duplication existed only have source_url / source_site.
+    """
+    own_url, own_site = row.get('source_url'), row.get('source_site')
+    urls = [u for u in str(row.get('source_urls') or '').split("\n") if u]
+    sites = [s.strip() for s in str(row.get('source_sites') or '').split(",") if s.strip()]
+    if isinstance(own_url, str) and own_url:
+        urls = [own_url] + [u for u in urls if u != own_url]
+    if isinstance(own_site, str) and own_site:
+        sites = [own_site] + [s for s in sites if s != own_site]
+    return urls, sites
+
+
+def find_duplicates(events_df):
+    """Cluster label per row (rows sharing a label are the same event), and pair counts."""
+    texts = [normalize_text(f"{title} {description}")
+             for title, description in zip(events_df['title'], events_df['description'])]
+    signatures, has_text = minhash_signatures(texts)
+    pairs = candidate_pairs(signatures, has_text)
+
+    # Naive times are taken as they are; ones with an offset are compared in UTC
+    times = pd.to_datetime(events_df['datetime'], errors='coerce', format='mixed', utc=True)
+    times = times.dt.tz_localize(None).to_numpy(dtype='datetime64[ns]')
+    lats, lons = geo.coordinate_arrays(events_df) if 'latitude' in events_df.columns else \
+        (np.full(len(events_df), np.nan), np.full(len(events_df), np.nan))
+    addresses = [geocode_cache.normalize_address(a) for a in events_df['address']]
+
+    parent = np.arange(len(events_df))
+    matched = 0
+    max_gap = np.timedelta64(MAX_HOURS * 3600, 's')
+    # Cheap text test for every pair at once; time and place only for the survivors
+    similar = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1) >= MIN_SIMILARITY
+    for i, j in pairs[similar]:
+        if not (np.isnat(times[i]) or np.isnat(times[j])) and abs(times[i] - times[j]) > max_gap:
+            continue
+        if np.isnan(lats[i]) or np.isnan(lats[j]):
+            if addresses[i] != addresses[j]:
+                continue
+        elif geo.distances_miles((lats[i], lons[i]), lats[j:j + 1], lons[j:j + 1])[0] > MAX_MILES:
+            continue
+        matched += 1
+        root_i, root_j = _find(parent, i), _find(parent, j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    labels = np.array([_find(parent, i) for i in range(len(events_df))])
+    return labels, {'candidate_pairs': len(pairs), 'duplicate_pairs': matched}
+
+
+def collapse_duplicates(events_df):
+    """events_df with each duplicate cluster merged into one canonical row.
+
+    Adds source_urls / source_sites (newline / comma separated, every
+    member's link and site). Returns (events_df, report).
+    """
+    events_df = events_df.reset_index(drop=True)
+    labels, report = find_duplicates(events_df)
+    description_lengths = events_df['description'].fillna('').astype(str).str.len().to_numpy()
+
+    urls = events_df['source_url'].tolist()
+    sites = events_df['source_site'].tolist() if 'source_site' in events_df.columns else [None] * len(events_df)
+    keep = np.ones(len(events_df), dtype=bool)
+    source_urls = [u if isinstance(u, str) else '' for u in urls]
+    source_sites = [s if isinstance(s, str) else '' for s in sites]
+    clusters = {}
+    for row in np.flatnonzero(labels != np.arange(len(events_df))):
+        clusters.setdefault(labels[row], [labels[row]]).append(row)
+    for members in clusters.values():
+        # Canonical: the longest description, earliest row on ties
+        canonical = members[int(np.argmax(description_lengths[members]))]
+        keep[members] = False
+        keep[canonical] = True
+        member_urls = [urls[m] for m in members if isinstance(urls[m], str) and urls[m]]
+        member_sites = [sites[m] for m in members if isinstance(sites[m], str) and sites[m]]
+        source_urls[canonical] = "\n".join(dict.fromkeys(member_urls))
+        source_sites[canonical] = ", ".join(dict.fromkeys(member_sites))
+
+    merged = events_df[keep].reset_index(drop=True)
+    merged['source_urls'] = np.array(source_urls, dtype=object)[keep]
+    merged['source_sites'] = np.array(source_sites, dtype=object)[keep]
+    report['clusters_merged'] = len(clusters)
+    report['rows_removed'] = int((~keep).sum())
+    return merged, report
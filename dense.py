@@ -0,0 +1,235 @@
+import numpy as np
+import scipy.sparse as sp
+import search
+
+# -----------------------------------------------------------------
+# DENSE (LSA) RETRIEVAL WITH AN IVF INDEX
+# -----------------------------------------------------------------
+# TF-IDF only matches the words typed: "concert" never finds an event
+# that says "live music". `model.py --dense` adds a second way in:
+#
+#   components    TruncatedSVD of the TF-IDF matrix (LSA), terms x DIMS
+#                 float32. A query or event vector times this is its
+#                 embedding; words that show up in the same events end
+#                 up close together.
+#   codes/scales  every event's L2-normalized embedding, stored as int8
+#                 with one float32 scale per row (4x smaller than float32;
+#                 score = codes . query * scale)
+#   centroids     IVF: spherical k-means over the embeddings, ~sqrt(N)
+#                 lists; list_ids / list_offsets hold each list's events
+#                 (same layout as the geo grid cells)
+#
+# A query scores only the events in the PROBES lists whose centroids are
+# closest to it, so the cost is ~PROBES * N / lists instead of N. When a
+# filter (date, distance, facets) leaves few enough events, they are all
+# scored instead: exact, and cheaper than probing.
+#
+# Hybrid mode (hybrid_top_k) takes the best HYBRID_POOL events from the
+# sparse and the dense side, scores all of them both ways and ranks by
+# HYBRID_WEIGHT * sparse + (1 - HYBRID_WEIGHT) * dense.
+#
+# benchmarks/bench_dense.py reports recall@k of the IVF search against
+# exact dense search, and the latency of each mode.
+
+DIMS = 128
+PROBES = 16
+KMEANS_ITERATIONS = 10
+
+# Filters leaving at most this many events are scored exhaustively
+EXACT_MAX_CANDIDATES = 20000
+
+# Dense matches below this cosine are noise, not "similar"
+MIN_SCORE = 0.1
+
+HYBRID_WEIGHT = 0.5
+HYBRID_POOL = 200
+
+# Rows per block when projecting, assigning and exact scoring (bounds temporary memory)
+BLOCK_ROWS = 16384
+
+
+def fit_components(tfidf_matrix, dims=DIMS, seed=0):
+    """LSA projection (terms x dims, float32) fitted on the TF-IDF matrix."""
+    from sklearn.decomposition import TruncatedSVD
+    dims = max(1, min(dims, min(tfidf_matrix.shape) - 1))
+    svd = TruncatedSVD(n_components=dims, algorithm='randomized', random_state=seed)
+    svd.fit(tfidf_matrix)
+    return np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def quantize(vectors):
+    """(int8 codes, float32 scale per row) with codes * scale ~= vectors."""
+    scales = np.abs(vectors).max(axis=1) / 127
+    codes = np.rint(vectors / np.where(scales > 0, scales, 1)[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def embed_rows(tfidf_matrix, components):
+    """Normalized embeddings of every row, quantized block by block: (codes, scales)."""
+    n_rows = tfidf_matrix.shape[0]
+    codes = np.empty((n_rows, components.shape[1]), dtype=np.int8)
+    scales = np.empty(n_rows, dtype=np.float32)
+    for start in range(0, n_rows, BLOCK_ROWS):
+        block = normalize_rows(np.asarray(tfidf_matrix[start:start + BLOCK_ROWS] @ components, dtype=np.float32))
+        codes[start:start + len(block)], scales[start:start + len(block)] = quantize(block)
+    return codes, scales
+
+
+def dequantize(codes, scales):
+    return codes.astype(np.float32) * scales[:, None]
+
+
+def kmeans(codes, scales, n_lists, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical k-means centroids (n_lists x dims, normalized), trained on a sample."""
+    rng = np.random.default_rng(seed)
+    n_rows = len(codes)
+    sample = np.sort(rng.choice(n_rows, size=min(n_rows, max(50 * n_lists, 10000)), replace=False))
+    vectors = dequantize(codes[sample], scales[sample])
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)]
+    for _ in range(iterations):
+        assignment = nearest_centroids(vectors, centroids)
+        # Sum of each list's points, as one sparse (lists x points) product
+        members = sp.csr_matrix((np.ones(len(vectors), dtype=np.float32), (assignment, np.arange(len(vectors)))),
+                                shape=(n_lists, len(vectors)))
+        sums = np.asarray(members @ vectors, dtype=np.float32)
+        empty = ~sums.any(axis=1)
+        # A list that lost all its points restarts from a random point
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids.astype(np.float32)
+
+
+def nearest_centroids(vectors, centroids):
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        assignment[start:start + BLOCK_ROWS] = np.argmax(vectors[start:start + BLOCK_ROWS] @ centroids.T, axis=1)
+    return assignment
+
+
+class DenseIndex:
+    def __init__(self, codes, scales, centroids, list_ids, list_offsets, components):
+        self.codes = codes
+        self.scales = scales
+        self.centroids = centroids
+        self.list_ids = list_ids
+        self.list_offsets = list_offsets
+        self.components = components
+
+    @classmethod
+    def build(cls, tfidf_matrix, components, n_lists=None, seed=0):
+        """Embed every row with components and group the rows into IVF lists."""
+        codes, scales = embed_rows(tfidf_matrix, components)
+        n_rows = len(codes)
+        n_lists = n_lists or max(1, int(round(np.sqrt(n_rows))))
+        n_lists = min(n_lists, n_rows)
+        if n_rows == 0:
+            centroids = np.zeros((0, components.shape[1]), dtype=np.float32)
+            assignment = np.empty(0, dtype=np.int64)
+        else:
+            centroids = kmeans(codes, scales, n_lists, seed=seed)
+            assignment = np.concatenate([nearest_centroids(dequantize(codes[s:s + BLOCK_ROWS], scales[s:s + BLOCK_ROWS]),
+                                                           centroids)
+                                         for s in range(0, n_rows, BLOCK_ROWS)])
+        list_ids = np.argsort(assignment, kind='stable').astype(np.int64)
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))])
+        return cls(codes, scales, centroids, list_ids, list_offsets.astype(np.int64), components)
+
+    # Plain arrays in / out; components live with the vocabulary (base segment only)
+    ARRAY_NAMES = ('codes', 'scales', 'centroids', 'list_ids', 'list_offsets')
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, arrays, components):
+        return cls(*(arrays[name] for name in cls.ARRAY_NAMES), components)
+
+    @property
+    def n_events(self):
+        return len(self.codes)
+
+    def embed_query(self, query_vector):
+        """Normalized float32 embedding of a 1 x vocabulary query (all zeros if it has no known word)."""
+        terms, weights = search.query_terms(query_vector)
+        if len(terms) == 0:
+            return np.zeros(self.components.shape[1], dtype=np.float32)
+        vector = np.asarray(weights, dtype=np.float32) @ self.components[terms]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def scores(self, query_embedding, ids):
+        """Cosine of the query with each event in ids."""
+        ids = np.asarray(ids, dtype=np.int64)
+        scores = np.empty(len(ids), dtype=np.float32)
+        for start in range(0, len(ids), BLOCK_ROWS):
+            block = ids[start:start + BLOCK_ROWS]
+            scores[start:start + len(block)] = (self.codes[block] @ query_embedding) * self.scales[block]
+        return scores
+
+    def candidates(self, query_embedding, candidate_mask=None, probes=PROBES, exact=False):
+        """Event ids to score: every allowed one, or the allowed ones in the closest lists."""
+        allowed = None if candidate_mask is None else np.flatnonzero(candidate_mask)
+        if exact or len(self.centroids) <= probes or (allowed is not None and len(allowed) <= EXACT_MAX_CANDIDATES):
+            return np.arange(self.n_events) if allowed is None else allowed
+        closest = np.argpartition(-(self.centroids @ query_embedding), probes - 1)[:probes]
+        ids = np.concatenate([self.list_ids[self.list_offsets[l]:self.list_offsets[l + 1]] for l in closest])
+        return ids if candidate_mask is None else ids[candidate_mask[ids]]
+
+    def matches(self, query_vector, candidate_mask=None, probes=PROBES, exact=False):
+        """(row ids, cosine scores) of every event scored for the query with cosine >= MIN_SCORE.
+
+        Only the probed lists are scored (see candidates), so this is
+        what top_k picks from, not every match in the index.
+        """
+        query_embedding = self.embed_query(query_vector)
+        if not query_embedding.any():
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids = self.candidates(query_embedding, candidate_mask, probes, exact)
+        scores = self.scores(query_embedding, ids)
+        matched = scores >= MIN_SCORE
+        return ids[matched], scores[matched]
+
+    def top_k(self, query_vector, k, candidate_mask=None, probes=PROBES, exact=False):
+        """(row ids, cosine scores) of the k closest events; empty for a query with no known word."""
+        return search.select_top_k(*self.matches(query_vector, candidate_mask, probes, exact), k)
+
+
+def top_k_of_matches(matches, k, candidate_mask=None):
+    """Best k of (ids, scores) from matches(), keeping only ids allowed by candidate_mask."""
+    ids, scores = matches
+    if candidate_mask is not None:
+        allowed = candidate_mask[ids]
+        ids, scores = ids[allowed], scores[allowed]
+    return search.select_top_k(ids, scores, k)
+
+
+def hybrid_top_k(models, query_vector, k, candidate_mask=None, weight=HYBRID_WEIGHT, pool=HYBRID_POOL,
+                 engine='sparse', dense_matches=None):
+    """Top k by weight * TF-IDF cosine + (1 - weight) * LSA cosine.
+
+    models is anything with top_k / dense_top_k / dense_scores
+    (ModelArtifacts or SegmentSet). dense_matches, from an earlier
+    models.dense_matches() over these candidates or more, saves scoring
+    the dense side again.
+    """
+    sparse_ids, _ = models.top_k(query_vector, pool, candidate_mask, engine)
+    if dense_matches is not None:
+        dense_ids, _ = top_k_of_matches(dense_matches, pool, candidate_mask)
+    else:
+        dense_ids, _ = models.dense_top_k(query_vector, pool, candidate_mask)
+    ids = np.union1d(sparse_ids, dense_ids).astype(np.int64)
+    if len(ids) == 0:
+        return ids, np.empty(0, dtype=np.float64)
+    # Both scores for everything in the pool (the sparse top-k again, limited to the pool)
+    in_pool = np.zeros(models.n_events, dtype=bool)
+    in_pool[ids] = True
+    scored_ids, scored = models.top_k(query_vector, len(ids), in_pool, engine)
+    sparse = np.zeros(len(ids))
+    sparse[np.searchsorted(ids, scored_ids)] = scored
+    dense = np.maximum(models.dense_scores(query_vector, ids), 0)
+    return search.select_top_k(ids, weight * sparse + (1 - weight) * dense, k)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------
+# FACET INDEX (CATEGORY / SOURCE SITE)
+# -----------------------------------------------------------------
+# One FacetIndex per filterable column, built by model.py:
+#
+#   labels   the distinct values, sorted ("Music", "Sports & Fitness", ...)
+#   codes    per row, the position of its value in labels
+#   bits     per label, a bitset over all rows (np.packbits), so a
+#            multi-select filter is an OR of a few bitsets plus one
+#            unpack: ~N/8 bytes per selected label, no DataFrame scans
+#
+# Facet counts for a result set are one bincount over codes[ids], so
+# they cost as much as the result set is long, not the whole table.
+# At 1M events and 50 labels the bitsets are 6 MB; both arrays are
+# memory-mapped from the artifact folder like everything else.
+
+FACET_FIELDS = ('category', 'source_site')
+
+# What rows with no value are filed under
+MISSING_LABEL = "Uncategorized"
+
+
+class FacetIndex:
+    def __init__(self, values):
+        values = pd.Series(values, dtype=object).where(lambda v: v.map(lambda x: isinstance(x, str) and x != ''),
+                                                      MISSING_LABEL)
+        self.labels, codes = np.unique(values.to_numpy(dtype=str), return_inverse=True)
+        self.codes = codes.astype(np.int32)
+        self.bits = np.stack([np.packbits(self.codes == i) for i in range(len(self.labels))]) \
+            if len(self.labels) else np.zeros((0, 0), dtype=np.uint8)
+
+    # Plain arrays in / out, so the index can be saved as .npy files and memory-mapped
+    ARRAY_NAMES = ('labels', 'codes', 'bits')
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        index = cls.__new__(cls)
+        for name in cls.ARRAY_NAMES:
+            setattr(index, name, arrays[name])
+        return index
+
+    def mask(self, selected):
+        """Boolean row mask: True where the value is one of the selected labels."""
+        positions = np.searchsorted(self.labels, selected)
+        positions = [p for p, label in zip(positions, selected)
+                     if p < len(self.labels) and self.labels[p] == label]
+        if not positions:
+            return np.zeros(len(self.codes), dtype=bool)
+        combined = np.bitwise_or.reduce(self.bits[positions], axis=0)
+        return np.unpackbits(combined, count=len(self.codes)).view(bool)
+
+    def counts(self, ids):
+        """{label: number of rows among ids}, labels with no rows left out."""
+        totals = np.bincount(self.codes[ids], minlength=len(self.labels))
+        return {str(self.labels[i]): int(totals[i]) for i in np.flatnonzero(totals)}
+
+
+def build_facets(events_df, fields=FACET_FIELDS):
+    """{field: FacetIndex} for every facet column the table has."""
+    return {field: FacetIndex(events_df[field]) for field in fields if field in events_df.columns}
+
+
+def merge_counts(*counts):
+    merged = {}
+    for part in counts:
+        for label, n in part.items():
+            merged[label] = merged.get(label, 0) + n
+    return merged
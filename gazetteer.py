@@ -0,0 +1,237 @@
+import bisect
+import csv
+import difflib
+import os
+import re
+import numpy as np
+
+# -----------------------------------------------------------------
+# OFFLINE GAZETTEER
+# -----------------------------------------------------------------
+# Turns what people type in the address box ("06510", "New Haven",
+# "71 Wall St, Norwalk") into coordinates without asking Nominatim,
+# which takes up to 10 seconds. It knows:
+#   - every place in data/places.csv (ZIP and city centroids), and
+#   - every venue, street address, ZIP and city of the geocoded events,
+#     so anything an event is at is also a place you can search from.
+#
+# Lookup is an exact dict hit, then a prefix match over the sorted keys
+# ("new hav" -> "new haven"). Only a miss goes to the remote geocoder
+# (app.py caches that answer in geocode_cache.py's SQLite file). A
+# close-spelling match on city names ("new haevn") is a last resort for
+# when the remote geocoder finds nothing either: before it, it would turn
+# real places we don't list ("Stanford") into ones we do ("Stamford").
+#
+# data/places.csv (kind,name,state,latitude,longitude) can be extended
+# with the Census ZCTA gazetteer for full ZIP coverage:
+#   python gazetteer.py --census 2023_Gaz_zcta_national.txt
+# or refreshed from the current events:
+#   python gazetteer.py --from-events model/events_data.pkl
+
+PLACES_PATH = 'data/places.csv'
+PLACE_COLUMNS = ['kind', 'name', 'state', 'latitude', 'longitude']
+
+# Which match wins when several places share a prefix
+KIND_RANK = {'zip': 0, 'city': 1, 'venue': 2, 'address': 3}
+
+# Shorter prefixes match too much to be useful
+MIN_PREFIX_CHARS = 3
+# Prefix matches looked at per query
+MAX_PREFIX_CANDIDATES = 200
+
+STREET_WORDS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'boulevard': 'blvd', 'drive': 'dr',
+    'lane': 'ln', 'place': 'pl', 'court': 'ct', 'square': 'sq', 'parkway': 'pkwy',
+    'highway': 'hwy', 'turnpike': 'tpke', 'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+}
+ZIP_RE = re.compile(r'\b(\d{5})(?:-\d{4})?\b')
+CITY_STATE_RE = re.compile(r'([^,]+),\s*([A-Za-z]{2})\s*(?:\d{5}(?:-\d{4})?)?\s*$')
+
+
+def place_key(text):
+    """'71 Wall Street,  Norwalk, CT' -> '71 wall st norwalk ct'"""
+    if not isinstance(text, str):
+        return ""
+    words = re.sub(r"[^\w\s]", " ", text.lower()).split()
+    return " ".join(STREET_WORDS.get(word, word) for word in words)
+
+
+def parse_city_state_zip(address):
+    """('Norwalk', 'CT', '06850') from '71 Wall Street, Norwalk, CT 06850' (parts may be None)."""
+    if not isinstance(address, str):
+        return None, None, None
+    zip_match = ZIP_RE.search(address)
+    city_match = CITY_STATE_RE.search(address)
+    city, state = (city_match.group(1).strip(), city_match.group(2).upper()) if city_match else (None, None)
+    return city, state, zip_match.group(1) if zip_match else None
+
+
+class Gazetteer:
+    def __init__(self):
+        self._places = {}   # key -> [rank, -weight, lat, lon, label]
+        self._keys = []
+        self._city_keys = []
+
+    def add(self, kind, name, lat, lon, weight=1, label=None):
+        key = place_key(name)
+        if not key or lat is None or lon is None or np.isnan(lat) or np.isnan(lon):
+            return
+        entry = [KIND_RANK[kind], -weight, float(lat), float(lon), label or name]
+        current = self._places.get(key)
+        if current is None or entry[:2] < current[:2]:
+            self._places[key] = entry
+        self._keys = None
+
+    def _sorted_keys(self):
+        if self._keys is None:
+            self._keys = sorted(self._places)
+            self._city_keys = [k for k in self._keys if self._places[k][0] <= KIND_RANK['city']]
+        return self._keys
+
+    def __len__(self):
+        return len(self._places)
+
+    def lookup(self, text, fuzzy=False):
+        """(lat, lon, matched place) for what the user typed, or None.
+
+        fuzzy=True also tries close spellings of city names.
+        """
+        key = place_key(text)
+        if not key:
+            return None
+        keys = self._sorted_keys()
+
+        entry = self._places.get(key)
+        if entry is None:
+            # A typed ZIP anywhere in the text ("New Haven 06510")
+            zip_match = ZIP_RE.search(key)
+            if zip_match and zip_match.group(1) in self._places:
+                entry = self._places[zip_match.group(1)]
+        if entry is None and len(key) >= MIN_PREFIX_CHARS:
+            start = bisect.bisect_left(keys, key)
+            candidates = []
+            for candidate in keys[start:start + MAX_PREFIX_CANDIDATES]:
+                if not candidate.startswith(key):
+                    break
+                candidates.append(self._places[candidate])
+            if candidates:
+                entry = min(candidates, key=lambda e: (e[0], e[1]))
+        if entry is None and fuzzy:
+            close = difflib.get_close_matches(key, self._city_keys, n=1, cutoff=0.85)
+            if close:
+                entry = self._places[close[0]]
+        if entry is None:
+            return None
+        return entry[2], entry[3], entry[4]
+
+    # --- sources ---
+
+    def add_places_file(self, path=PLACES_PATH):
+        if not os.path.exists(path):
+            return
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                lat, lon = float(row['latitude']), float(row['longitude'])
+                label = f"{row['name']}, {row['state']}" if row.get('state') else row['name']
+                self.add(row['kind'], row['name'], lat, lon, label=label)
+                if row['kind'] == 'city' and row.get('state'):
+                    self.add('city', label, lat, lon, label=label)
+
+    def add_events(self, events_df):
+        """Venues, addresses, ZIPs and cities of every geocoded event."""
+        for place in event_places(events_df):
+            self.add(*place)
+
+
+def event_places(events_df):
+    """(kind, name, lat, lon, weight, label) rows taken from geocoded events.
+
+    ZIPs and cities get the mean position of their events.
+    """
+    located = events_df[events_df['latitude'].notna() & events_df['longitude'].notna()]
+    places = []
+    zips, cities = {}, {}
+    for address, venue, lat, lon in zip(located['address'], located['location_name'],
+                                        located['latitude'].astype(float), located['longitude'].astype(float)):
+        places.append(('address', address, lat, lon, 1, address))
+        if isinstance(venue, str) and venue.lower() != 'online event':
+            places.append(('venue', venue, lat, lon, 1, venue))
+        city, state, zip_code = parse_city_state_zip(address)
+        if zip_code:
+            zips.setdefault(zip_code, []).append((lat, lon))
+        if city and state:
+            cities.setdefault((city, state), []).append((lat, lon))
+    for zip_code, points in zips.items():
+        lat, lon = np.mean(points, axis=0)
+        places.append(('zip', zip_code, lat, lon, len(points), zip_code))
+    for (city, state), points in cities.items():
+        lat, lon = np.mean(points, axis=0)
+        label = f"{city}, {state}"
+        places.append(('city', city, lat, lon, len(points), label))
+        places.append(('city', label, lat, lon, len(points), label))
+    return places
+
+
+def build_gazetteer(events_df=None, places_path=PLACES_PATH):
+    gazetteer = Gazetteer()
+    gazetteer.add_places_file(places_path)
+    if events_df is not None and 'latitude' in events_df.columns:
+        gazetteer.add_events(events_df)
+    return gazetteer
+
+
+# -----------------------------------------------------------------
+# MAINTAINING data/places.csv
+# -----------------------------------------------------------------
+
+def read_places(path=PLACES_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def write_places(rows, path=PLACES_PATH):
+    # One row per (kind, name, state); later rows replace earlier ones
+    merged = {(row['kind'], row['name'], row.get('state', '')): row for row in rows}
+    ordered = sorted(merged.values(), key=lambda r: (KIND_RANK[r['kind']], r['name']))
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=PLACE_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(ordered)
+    print(f"Wrote {len(ordered)} places to {path}")
+
+
+def census_zcta_rows(path):
+    """ZIP centroids from the Census Gazetteer ZCTA file (tab separated)."""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f, delimiter='\t')
+        reader.fieldnames = [name.strip() for name in reader.fieldnames]
+        for row in reader:
+            yield {'kind': 'zip', 'name': row['GEOID'], 'state': '',
+                   'latitude': row['INTPTLAT'].strip(), 'longitude': row['INTPTLONG'].strip()}
+
+
+if __name__ == '__main__':
+    import argparse
+    import pandas as pd
+    parser = argparse.ArgumentParser(description="Update the bundled place table used by the gazetteer.")
+    parser.add_argument('--census', help="Census Gazetteer ZCTA file to import ZIP centroids from")
+    parser.add_argument('--from-events', help="events pickle/CSV with latitude/longitude to take ZIPs and cities from")
+    parser.add_argument('--output', default=PLACES_PATH)
+    args = parser.parse_args()
+
+    rows = read_places(args.output)
+    if args.census:
+        rows += list(census_zcta_rows(args.census))
+    if args.from_events:
+        if args.from_events.endswith('.csv'):
+            events_df = pd.read_csv(args.from_events)
+        else:
+            events_df = pd.read_pickle(args.from_events)
+        for kind, name, lat, lon, _, label in event_places(events_df):
+            if kind == 'zip' or (kind == 'city' and ',' not in name):
+                state = label.rsplit(', ', 1)[1] if kind == 'city' else ''
+                rows.append({'kind': kind, 'name': name, 'state': state,
+                             'latitude': f"{lat:.6f}", 'longitude': f"{lon:.6f}"})
+    write_places(rows, args.output)
@@ -0,0 +1,144 @@
+import sqlite3
+import time
+import threading
+
+# -----------------------------------------------------------------
+# PERSISTENT GEOCODING CACHE
+# -----------------------------------------------------------------
+# Geocoding through Nominatim costs ~1 second per address (rate limit),
+# and many events share the same venue. This cache remembers every
+# address we have ever looked up in a small SQLite file, including the
+# ones Nominatim could NOT find, so a rebuild only sends brand new
+# addresses to the geocoder.
+#
+# The geocoder is passed in as a plain function (address -> object with
+# .latitude/.longitude, or None), so a local stub can stand in for
+# Nominatim when testing.
+
+DEFAULT_PATH = 'data/geocode_cache.sqlite'
+
+# "Not found" answers are retried after this long (addresses do get added to OSM)
+NEGATIVE_TTL_SECONDS = 30 * 24 * 3600
+
+# Addresses we never send to the geocoder
+SKIP_ADDRESSES = {"", "online", "address not specified"}
+
+
+def normalize_address(address):
+    """'20 Harbor Point Road ,  Stamford, CT ' -> '20 harbor point road, stamford, ct'"""
+    if not isinstance(address, str):
+        return ""
+    parts = [" ".join(part.split()) for part in address.lower().split(",")]
+    return ", ".join(part for part in parts if part).strip(" .")
+
+
+class GeocodeCache:
+    def __init__(self, path=DEFAULT_PATH, negative_ttl_seconds=NEGATIVE_TTL_SECONDS, clock=time.time):
+        self.path = path
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS geocodes (
+                   address_key  TEXT PRIMARY KEY,
+                   address      TEXT,
+                   latitude     REAL,
+                   longitude    REAL,
+                   found        INTEGER NOT NULL,
+                   created_at   REAL NOT NULL,
+                   last_used_at REAL NOT NULL,
+                   hit_count    INTEGER NOT NULL DEFAULT 0
+               )"""
+        )
+        self._conn.commit()
+
+    def lookup(self, address):
+        """Cached answer for an address.
+
+        Returns (found, (lat, lon) or None). found is None when we have no
+        usable answer yet (never seen, or an expired negative result).
+        """
+        key = normalize_address(address)
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latitude, longitude, found, created_at FROM geocodes WHERE address_key = ?", (key,)
+            ).fetchone()
+            if row is None or (not row[2] and now - row[3] > self.negative_ttl_seconds):
+                self.misses += 1
+                return None, None
+            self._conn.execute(
+                "UPDATE geocodes SET last_used_at = ?, hit_count = hit_count + 1 WHERE address_key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            if row[2]:
+                return True, (row[0], row[1])
+            return False, None
+
+    def store(self, address, lat_lon):
+        """Remember a geocoder answer; lat_lon=None records a negative result."""
+        key = normalize_address(address)
+        now = self.clock()
+        lat, lon = lat_lon if lat_lon else (None, None)
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO geocodes
+                   (address_key, address, latitude, longitude, found, created_at, last_used_at, hit_count)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, 0)""",
+                (key, address, lat, lon, int(lat_lon is not None), now, now),
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def resolve_address(address, geocode, cache):
+    """(lat, lon) or None for one address: from the cache, else `geocode` (then stored).
+
+    Also returns whether the geocoder was asked. Errors are not cached.
+    """
+    if normalize_address(address) in SKIP_ADDRESSES:
+        return None, False
+    found, lat_lon = cache.lookup(address)
+    if found is not None:
+        return lat_lon, False
+    try:
+        location = geocode(address)
+    except Exception as e:
+        print(f"Error geocoding address '{address}': {e}")
+        return None, True
+    lat_lon = (location.latitude, location.longitude) if location else None
+    cache.store(address, lat_lon)
+    return lat_lon, True
+
+
+def geocode_addresses(addresses, geocode, cache):
+    """Latitude and longitude lists for a column of addresses.
+
+    Every distinct address is resolved once: from the cache if we have
+    it, otherwise through `geocode` (and then stored). Errors are not
+    cached, so those addresses are retried on the next build.
+    """
+    resolved = {}
+    new_lookups = 0
+    for address in addresses:
+        key = normalize_address(address)
+        if key in resolved:
+            continue
+        resolved[key], asked = resolve_address(address, geocode, cache)
+        new_lookups += asked
+
+    latitudes, longitudes = [], []
+    for address in addresses:
+        lat_lon = resolved[normalize_address(address)]
+        latitudes.append(lat_lon[0] if lat_lon else None)
+        longitudes.append(lat_lon[1] if lat_lon else None)
+
+    print(f"Geocoding: {len(resolved)} unique addresses, {new_lookups} sent to the geocoder, "
+          f"{cache.hits} cache hits.")
+    return latitudes, longitudes
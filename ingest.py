@@ -0,0 +1,356 @@
+import argparse
+import json
+import os
+import queue
+import re
+import threading
+import time
+import pandas as pd
+import bookmarks
+import geocode_cache
+from scrapes import event_sink
+
+# -----------------------------------------------------------------
+# MULTI-SOURCE INGEST PIPELINE
+# -----------------------------------------------------------------
+# Every scraper writes its own shape of record (Eventbrite already
+# matches the model, NHFPL has date/time/location/details_url, Meetup
+# is raw GraphQL). This turns all of them into the one event schema
+# model.py builds from (EVENT_COLUMNS) as a stream of generator stages:
+#
+#   fetch -> parse -> normalize      per source, each source in its own thread
+#   -> merge -> dedupe -> geocode -> sink
+#
+# Dedupe runs before geocode so a duplicate never costs a Nominatim call.
+# Only one event per source is in flight in each stage, plus a bounded
+# queue between the source threads and the rest, so nothing holds a
+# whole source in memory.
+#
+# Output goes to data/parts/events/<source>.jsonl (see event_sink.py),
+# which model.py reads before the Eventbrite-only parts:
+#
+#   python ingest.py                      every source
+#   python ingest.py --sources nhfpl      just one
+#   python ingest.py --no-geocode         leave geocoding to model.py
+#
+# A new source is one Source subclass added to SOURCES.
+
+EVENT_COLUMNS = ['event_id', 'title', 'datetime', 'location_name', 'address', 'description',
+                 'category', 'source_url', 'source_site', 'latitude', 'longitude']
+
+OUTPUT_SOURCE = 'events'
+
+# Events written per part-file "page" (one checkpoint each)
+SINK_PAGE_SIZE = 200
+
+# Events waiting between the source threads and dedupe/geocode
+QUEUE_SIZE = 1000
+
+
+def parse_datetime(text):
+    """'Monday, December 1, 2025 10:00am' / '2025-11-27T08:00' -> '2025-12-01T10:00' (None if unreadable).
+
+    Same minute-precision ISO format as the Eventbrite rows, which
+    app.py reads with datetime.fromisoformat.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None
+    try:
+        value = pd.to_datetime(text.strip(), format='mixed')
+    except (ValueError, OverflowError):
+        return None
+    if value.tzinfo is not None:
+        value = value.tz_localize(None)
+    return value.strftime('%Y-%m-%dT%H:%M')
+
+
+def clean_text(value):
+    if not isinstance(value, str):
+        return ''
+    return re.sub(r'\s+', ' ', value).strip()
+
+
+def read_jsonl_or_csv(source, csv_path, parts_dir=event_sink.PARTS_DIR):
+    """Raw records a scraper left behind: its part files, or its older CSV."""
+    if event_sink.has_parts(source, parts_dir):
+        yield from event_sink.iter_part_events(source, parts_dir)
+    elif os.path.exists(csv_path):
+        for row in pd.read_csv(csv_path, dtype=str, keep_default_na=False).to_dict('records'):
+            yield row
+
+
+# -----------------------------------------------------------------
+# SOURCES (ONE ADAPTER EACH)
+# -----------------------------------------------------------------
+
+class Source:
+    """fetch() yields raw items, parse() turns one into source records,
+    normalize() maps a record onto EVENT_COLUMNS (None to drop it)."""
+
+    name = None
+    site = None
+
+    def __init__(self, parts_dir=event_sink.PARTS_DIR):
+        self.parts_dir = parts_dir
+
+    def fetch(self):
+        raise NotImplementedError
+
+    def parse(self, raw):
+        yield raw
+
+    def normalize(self, record):
+        raise NotImplementedError
+
+
+class EventbriteSource(Source):
+    name = 'eventbrite'
+    site = 'Eventbrite'
+
+    def fetch(self):
+        return read_jsonl_or_csv('eventbrite', 'data/eventbrite_events.csv', self.parts_dir)
+
+    def normalize(self, record):
+        # scrapes/eventbrite_scraper.py already writes the model's columns
+        return {
+            'title': clean_text(record.get('title')),
+            'datetime': parse_datetime(record.get('datetime')),
+            'location_name': clean_text(record.get('location_name')),
+            'address': clean_text(record.get('address')),
+            'description': clean_text(record.get('description')),
+            'category': clean_text(record.get('category')) or 'Uncategorized',
+            'source_url': record.get('source_url'),
+        }
+
+
+class NHFPLSource(Source):
+    name = 'nhfpl'
+    site = 'NHFPL'
+    # The calendar cards don't carry an address; every event is at the main library
+    LIBRARY_ADDRESS = '133 Elm Street, New Haven, CT 06510'
+
+    def fetch(self):
+        return read_jsonl_or_csv('nhfpl', 'data/nhfpl_events.csv', self.parts_dir)
+
+    def normalize(self, record):
+        # time is "10:00am - 11:00am" or "All Day"; the start is what we keep
+        start = clean_text(record.get('time')).split(' - ')[0]
+        if start.lower() == 'all day':
+            start = ''
+        title = clean_text(record.get('title'))
+        return {
+            'title': title,
+            'datetime': parse_datetime(f"{clean_text(record.get('date'))} {start}"),
+            'location_name': clean_text(record.get('location')) or 'New Haven Free Public Library',
+            'address': self.LIBRARY_ADDRESS,
+            # No description on the cards; the title is what there is to search
+            'description': clean_text(record.get('description')) or title,
+            'category': 'Community & Culture',
+            'source_url': record.get('details_url'),
+        }
+
+
+class MeetupSource(Source):
+    name = 'meetup'
+    site = 'Meetup'
+
+    def __init__(self, parts_dir=event_sink.PARTS_DIR, path='meetup_debug.json'):
+        super().__init__(parts_dir)
+        self.path = path
+
+    def fetch(self):
+        # scrapes/meetup_scraper.py saves the raw GraphQL response here
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                yield json.load(f)
+
+    def parse(self, raw):
+        # Event nodes can sit anywhere in a GraphQL answer; location search
+        # results (what the scraper asks for today) contain none
+        stack = [raw]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                if node.get('__typename') == 'Event':
+                    yield node
+                    continue
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(reversed(node))
+
+    def normalize(self, record):
+        venue = record.get('venue') or {}
+        address = ', '.join(part for part in (clean_text(venue.get('address')), clean_text(venue.get('city')),
+                                              clean_text(venue.get('state'))) if part)
+        online = record.get('eventType') == 'ONLINE' or not venue
+        group = record.get('group') or {}
+        return {
+            'title': clean_text(record.get('title')),
+            'datetime': parse_datetime(record.get('dateTime')),
+            'location_name': 'Online Event' if online else clean_text(venue.get('name')),
+            'address': 'Online' if online else address,
+            'description': clean_text(record.get('description')) or clean_text(group.get('name')),
+            'category': clean_text((record.get('topicCategory') or {}).get('name')) or 'Uncategorized',
+            'source_url': record.get('eventUrl'),
+        }
+
+
+SOURCES = {source.name: source for source in (EventbriteSource, NHFPLSource, MeetupSource)}
+
+
+# -----------------------------------------------------------------
+# STAGES
+# -----------------------------------------------------------------
+
+class IngestStats:
+    def __init__(self):
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def report(self):
+        return {**self.counts, 'seconds': round(time.monotonic() - self.started, 2)}
+
+
+def fetch(source):
+    yield from source.fetch()
+
+
+def parse(source, raw_items):
+    for raw in raw_items:
+        yield from source.parse(raw)
+
+
+def normalize(source, records, stats):
+    for record in records:
+        try:
+            event = source.normalize(record)
+        except Exception as e:
+            print(f"Warning: could not normalize a {source.name} record: {e}")
+            event = None
+        if not event or not event['title']:
+            stats.count(f'{source.name}_dropped')
+            continue
+        event['source_site'] = source.site
+        event['latitude'] = event['longitude'] = None
+        event['event_id'] = bookmarks.event_id(event)
+        stats.count(f'{source.name}_events')
+        yield {column: event.get(column) for column in EVENT_COLUMNS}
+
+
+def source_events(source, stats):
+    return normalize(source, parse(source, fetch(source)), stats)
+
+
+_DONE = object()
+
+
+def merge(streams, stats, queue_size=QUEUE_SIZE):
+    """Run each stream in its own thread and yield their events as they come."""
+    events = queue.Queue(maxsize=queue_size)
+
+    def drain(name, stream):
+        try:
+            for event in stream:
+                events.put(event)
+        except Exception as e:
+            print(f"Source {name} failed: {e}")
+            stats.count(f'{name}_failed')
+        finally:
+            events.put(_DONE)
+
+    threads = [threading.Thread(target=drain, args=(name, stream), name=f'ingest-{name}', daemon=True)
+               for name, stream in streams.items()]
+    for thread in threads:
+        thread.start()
+    running = len(threads)
+    while running:
+        event = events.get()
+        if event is _DONE:
+            running -= 1
+        else:
+            yield event
+
+
+def dedupe(events, stats):
+    # Same event listed twice (or by two sources): the first one wins
+    seen = set()
+    for event in events:
+        if event['event_id'] in seen:
+            stats.count('duplicates')
+            continue
+        seen.add(event['event_id'])
+        yield event
+
+
+def geocode(events, geocode_fn, cache, stats):
+    for event in events:
+        lat_lon, asked = geocode_cache.resolve_address(event['address'], geocode_fn, cache)
+        stats.count('geocoder_calls', asked)
+        if lat_lon:
+            event['latitude'], event['longitude'] = lat_lon
+        yield event
+
+
+def sink(events, output, page_size=SINK_PAGE_SIZE):
+    """Write events to data/parts/<output>/<source>.jsonl a page at a time."""
+    buffers, pages = {}, {}
+    for event in events:
+        region = event['source_site'].lower()
+        buffer = buffers.setdefault(region, [])
+        buffer.append(event)
+        if len(buffer) >= page_size:
+            pages[region] = pages.get(region, 0) + 1
+            output.write_page(region, pages[region], buffer)
+            buffers[region] = []
+    for region, buffer in buffers.items():
+        if buffer:
+            pages[region] = pages.get(region, 0) + 1
+            output.write_page(region, pages[region], buffer)
+    for region, last_page in pages.items():
+        output.mark_complete(region, last_page)
+    return output.events_written
+
+
+def nominatim_geocoder():
+    from geopy.geocoders import Nominatim
+    from geopy.extra.rate_limiter import RateLimiter
+    geolocator = Nominatim(user_agent="gout-app-v1", timeout=10)
+    return RateLimiter(geolocator.geocode, min_delay_seconds=1)
+
+
+def run(sources, parts_dir=event_sink.PARTS_DIR, geocode_fn=None, cache_path=geocode_cache.DEFAULT_PATH):
+    """Ingest the given Source objects into data/parts/events/; returns IngestStats."""
+    stats = IngestStats()
+    events = merge({source.name: source_events(source, stats) for source in sources}, stats)
+    events = dedupe(events, stats)
+    cache = None
+    if geocode_fn is not None:
+        cache = geocode_cache.GeocodeCache(cache_path)
+        events = geocode(events, geocode_fn, cache, stats)
+    # A fresh snapshot every run; model.py --incremental works out what changed
+    output = event_sink.EventSink(OUTPUT_SOURCE, parts_dir, fresh=True)
+    try:
+        stats.count('written', sink(events, output))
+    finally:
+        output.close()
+        if cache is not None:
+            cache.close()
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Normalize every scraped source into one events feed.")
+    parser.add_argument('--sources', nargs='+', default=list(SOURCES), choices=list(SOURCES))
+    parser.add_argument('--parts-dir', default=event_sink.PARTS_DIR)
+    parser.add_argument('--no-geocode', action='store_true', help="skip geocoding (model.py does it on build)")
+    args = parser.parse_args()
+
+    stats = run([SOURCES[name](args.parts_dir) for name in args.sources], args.parts_dir,
+                None if args.no_geocode else nominatim_geocoder())
+    print(f"Ingest stats: {stats.report()}")
+    print(f"--- Events saved to {os.path.join(args.parts_dir, OUTPUT_SOURCE)} ---")
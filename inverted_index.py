@@ -0,0 +1,128 @@
+import numpy as np
+import search
+
+# -----------------------------------------------------------------
+# INVERTED INDEX WITH MAXSCORE
+# -----------------------------------------------------------------
+# For every word in the vocabulary we keep a "posting list": the sorted
+# ids of the events that contain it, plus the TF-IDF weight of the word
+# in each event, quantized to one byte. We also keep the largest weight
+# of every word, which tells us the most a word can ever add to a score.
+#
+# Search uses MaxScore (term-at-a-time): words are processed from the
+# most to the least valuable. Once the k-th best score so far is higher
+# than everything the remaining words could add up to, those words can
+# no longer bring in new events, so we only binary-search them for the
+# events we already have and skip the rest of their postings.
+#
+# The one-byte weights are slightly off, so every score is within
+# `error` of the float score. We keep every event that could still be
+# in the top k given that error, then re-score that small pool exactly
+# from the TF-IDF matrix. The final ranking is the same as search.top_k.
+
+QUANT_LEVELS = 255
+
+
+class InvertedIndex:
+    def __init__(self, tfidf_matrix, vocabulary):
+        csc = tfidf_matrix.tocsc()
+        csc.sort_indices()
+        self.n_events = csc.shape[0]
+        self.vocabulary = dict(vocabulary)
+
+        # postings of term t live in [term_ptr[t], term_ptr[t + 1])
+        self.term_ptr = csc.indptr.astype(np.int64)
+        self.event_ids = csc.indices.astype(np.int32)
+
+        # Per-term max weight ("max score") and one-byte weights scaled to it
+        weights = csc.data.astype(np.float64)
+        lengths = np.diff(self.term_ptr)
+        max_weights = np.zeros(csc.shape[1], dtype=np.float64)
+        nonempty = lengths > 0
+        max_weights[nonempty] = np.maximum.reduceat(weights, self.term_ptr[:-1][nonempty])
+        self.max_weights = max_weights.astype(np.float32)
+
+        self.scales = (self.max_weights / QUANT_LEVELS).astype(np.float32)
+        term_of_posting = np.repeat(np.arange(csc.shape[1]), lengths)
+        scale_per_posting = self.scales[term_of_posting].astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            codes = np.where(scale_per_posting > 0, np.rint(weights / scale_per_posting), 0)
+        self.codes = np.clip(codes, 0, QUANT_LEVELS).astype(np.uint8)
+
+    # Plain arrays in / out, so the index can be saved as .npy files and memory-mapped
+    ARRAY_NAMES = ('term_ptr', 'event_ids', 'codes', 'scales', 'max_weights')
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, arrays, vocabulary, n_events):
+        index = cls.__new__(cls)
+        index.n_events = n_events
+        index.vocabulary = vocabulary
+        for name in cls.ARRAY_NAMES:
+            setattr(index, name, arrays[name])
+        return index
+
+    def postings(self, term_id):
+        """(event ids, approximate weights) for one term id."""
+        start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+        return self.event_ids[start:end], self.codes[start:end] * np.float64(self.scales[term_id])
+
+    def top_k(self, query_vector, k, candidate_mask=None, exact_matrix=None):
+        """Top k (ids, scores) for a query vector, best first.
+
+        Same contract as search.top_k. If exact_matrix (the CSR TF-IDF
+        matrix) is given, the final pool is re-scored exactly so the
+        result matches search.top_k; otherwise quantized scores are used.
+        """
+        terms, weights = search.query_terms(query_vector)
+        if k <= 0 or len(terms) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        weights = weights.astype(np.float64)
+
+        # Most valuable words first
+        bounds = weights * self.max_weights[terms]
+        order = np.argsort(-bounds, kind='stable')
+        terms, weights, bounds = terms[order], weights[order], bounds[order]
+
+        # remaining[i] = the most words i, i+1, ... can add to any score
+        remaining = np.append(np.cumsum(bounds[::-1])[::-1], 0.0)
+        # Worst-case difference between a quantized score and the exact one
+        error = float(np.sum(weights * self.scales[terms])) / 2
+
+        cand_ids = np.empty(0, dtype=np.int64)
+        cand_scores = np.empty(0, dtype=np.float64)
+        threshold = -np.inf
+
+        for i, term in enumerate(terms):
+            ids, term_weights = self.postings(term)
+            if candidate_mask is not None:
+                allowed = candidate_mask[ids]
+                ids, term_weights = ids[allowed], term_weights[allowed]
+            contributions = term_weights * weights[i]
+
+            if remaining[i] >= threshold:
+                # Essential word: events seen for the first time here can still win
+                all_ids = np.concatenate([cand_ids, ids.astype(np.int64)])
+                all_scores = np.concatenate([cand_scores, contributions])
+                cand_ids, inverse = np.unique(all_ids, return_inverse=True)
+                cand_scores = np.bincount(inverse, weights=all_scores, minlength=len(cand_ids))
+            elif len(cand_ids) and len(ids):
+                # Non-essential word: only look up the events we already have
+                pos = np.minimum(np.searchsorted(ids, cand_ids), len(ids) - 1)
+                hit = ids[pos] == cand_ids
+                cand_scores[hit] += contributions[pos[hit]]
+
+            # Partial scores only grow, so the k-th best one is a safe lower bound
+            if len(cand_scores) >= k:
+                kth = np.partition(cand_scores, len(cand_scores) - k)[len(cand_scores) - k]
+                threshold = kth - 2 * error
+                keep = cand_scores + remaining[i + 1] >= threshold
+                cand_ids, cand_scores = cand_ids[keep], cand_scores[keep]
+
+        matched = cand_scores > 0
+        cand_ids, cand_scores = cand_ids[matched], cand_scores[matched]
+        if exact_matrix is not None and len(cand_ids):
+            cand_scores = np.asarray(exact_matrix[cand_ids] @ query_vector.T.toarray()).ravel()
+        return search.select_top_k(cand_ids, cand_scores, k)
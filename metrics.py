@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+import time
+
+# -----------------------------------------------------------------
+# SEARCH PIPELINE TIMING
+# -----------------------------------------------------------------
+# Lightweight timing spans and counters for the search pipeline:
+#
+#   with metrics.span('rank'):
+#       ...
+#   metrics.count('cache_hit')
+#   metrics.observe('candidates', len(ids))
+#
+# Everything that happens between start_trace() and end_trace() on the
+# same thread (one Streamlit session) is collected into one trace, which
+# the app can show in a debug panel. Every finished trace is also:
+#   - logged as one JSON line (logger "gout.metrics"), and
+#   - added to process-wide histograms, written in Prometheus text format
+#     to GOUT_METRICS_FILE if that is set (e.g. for node_exporter's
+#     textfile collector).
+#
+# Off unless GOUT_METRICS=1. When off, span() hands back one shared
+# do-nothing object and the other calls return right away.
+
+ENABLED = os.environ.get('GOUT_METRICS', '') not in ('', '0')
+PROMETHEUS_FILE = os.environ.get('GOUT_METRICS_FILE')
+
+# Histogram buckets for stage durations, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger('gout.metrics')
+if ENABLED and not logger.handlers:
+    # One bare JSON object per line on stderr
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.record(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=ENABLED, prometheus_file=PROMETHEUS_FILE):
+        self.enabled = enabled
+        self.prometheus_file = prometheus_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.durations = {}      # stage -> [bucket counts..., +Inf count], sum
+        self.counters = {}       # name -> total
+        self.observations = {}   # name -> [count, sum]
+
+    # --- recording ---
+
+    def span(self, stage):
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, stage)
+
+    def record(self, stage, seconds):
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace['spans'].append({'stage': stage, 'ms': round(seconds * 1000, 3)})
+        with self._lock:
+            buckets, total = self.durations.get(stage, ([0] * (len(BUCKETS) + 1), 0.0))
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            buckets[-1] += 1
+            self.durations[stage] = (buckets, total + seconds)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace['counters'][name] = trace['counters'].get(name, 0) + value
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """A size or other number (not a duration), e.g. candidate-set size."""
+        if not self.enabled:
+            return
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace['values'][name] = value
+        with self._lock:
+            count, total = self.observations.get(name, (0, 0))
+            self.observations[name] = (count + 1, total + value)
+
+    # --- traces (one per search) ---
+
+    def start_trace(self, name):
+        if not self.enabled:
+            return
+        self._local.trace = {'trace': name, 'started_at': time.time(), 'spans': [], 'counters': {}, 'values': {}}
+
+    def end_trace(self):
+        """Finish the current trace: log it, refresh the Prometheus file, return it."""
+        trace = getattr(self._local, 'trace', None)
+        if not self.enabled or trace is None:
+            return None
+        self._local.trace = None
+        trace['total_ms'] = round(sum(span['ms'] for span in trace['spans']), 3)
+        logger.info(json.dumps(trace))
+        if self.prometheus_file:
+            self.write_prometheus(self.prometheus_file)
+        return trace
+
+    # --- export ---
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            lines.append('# HELP gout_stage_duration_seconds Time spent in each search pipeline stage.')
+            lines.append('# TYPE gout_stage_duration_seconds histogram')
+            for stage, (buckets, total) in sorted(self.durations.items()):
+                for bound, n in zip(BUCKETS, buckets):
+                    lines.append(f'gout_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {n}')
+                lines.append(f'gout_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {buckets[-1]}')
+                lines.append(f'gout_stage_duration_seconds_sum{{stage="{stage}"}} {total:.6f}')
+                lines.append(f'gout_stage_duration_seconds_count{{stage="{stage}"}} {buckets[-1]}')
+            for name, total in sorted(self.counters.items()):
+                lines.append(f'# TYPE gout_{name}_total counter')
+                lines.append(f'gout_{name}_total {total}')
+            for name, (count, total) in sorted(self.observations.items()):
+                lines.append(f'# TYPE gout_{name} summary')
+                lines.append(f'gout_{name}_sum {total}')
+                lines.append(f'gout_{name}_count {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        # Write then rename, so a scraper never reads a half-written file
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+# One registry for the whole process, used through the functions below
+registry = Metrics()
+
+
+def enabled():
+    return registry.enabled
+
+
+def span(stage):
+    return registry.span(stage)
+
+
+def count(name, value=1):
+    registry.count(name, value)
+
+
+def observe(name, value):
+    registry.observe(name, value)
+
+
+def start_trace(name):
+    registry.start_trace(name)
+
+
+def end_trace():
+    return registry.end_trace()
@@ -1,17 +1,53 @@
+import argparse
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-import pickle  # We use pickle to save our model files
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
-import time
-
-print("Starting model training...")
+import geocode_cache
+import geo
+import inverted_index
+import artifacts
+import segments
+import ingest
+import dedup
+import timeindex
+import facets
+import dense
+import tfidf_build
+import neighbors
+from scrapes import event_sink
+
+# python model.py                 full rebuild (refits the vocabulary and IDF)
+# python model.py --incremental   only add/replace/remove what changed, as a delta segment
+# python model.py --compact       merge the base and all deltas into a new base
+# python model.py --workers 8     full rebuild with TF-IDF built in 8 processes, chunk by chunk
+# python model.py --dense         also build LSA embeddings + IVF index (dense / hybrid search)
+# python model.py --neighbors 0   skip the "Similar events" table (its build time grows with N^2)
+parser = argparse.ArgumentParser(description="Build the search model from the scraped events.")
+parser.add_argument('--incremental', action='store_true', help="write a delta segment for changed events only")
+parser.add_argument('--compact', action='store_true', help="merge all segments into a new base")
+parser.add_argument('--append-only', action='store_true',
+                    help="with --incremental: events missing from the scrape are kept, not removed")
+parser.add_argument('--workers', type=int, default=1,
+                    help="processes for the TF-IDF build (0 = one per core); 1 keeps the in-memory build")
+parser.add_argument('--chunk-size', type=int, default=tfidf_build.DEFAULT_CHUNK_SIZE,
+                    help="descriptions per chunk in the multi-process build (bounds its memory)")
+parser.add_argument('--dense', action='store_true',
+                    help="also build LSA embeddings and an IVF index (GOUT_SEARCH_MODE=dense or hybrid)")
+parser.add_argument('--dense-dims', type=int, default=dense.DIMS, help="LSA dimensions for --dense")
+parser.add_argument('--neighbors', type=int, default=neighbors.K,
+                    help="similar events precomputed per event (0 = none; the app then scores them per click)")
+args = parser.parse_args()
+
+if args.compact:
+    if not artifacts.latest_version('model'):
+        print("Nothing to compact: no artifacts in model/artifacts/ yet.")
+    else:
+        segments.compact('model')
+    exit()
 
-# --- Step 1: Load and Prepare Data ---
-# Load the CSV file you just created
-try:
-    df = pd.read_csv('data/eventbrite_events.csv')
+def geocode_events(df):
     # --- NEW STEP: Geocoding Addresses ---
     print("Starting geocoding... (This may take a moment)")
 
@@ -21,38 +57,35 @@ try:
     # Use a rate limiter to avoid getting blocked (1 request per second)
     geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1)
 
-    # Create empty lists to store our new coordinates
-    latitudes = []
-    longitudes = []
-
-    # Loop through each address in our DataFrame
-    for address in df['address']:
-        if address == "Online" or not address:
-            latitudes.append(None)
-            longitudes.append(None)
-            continue
-
-        try:
-            # Try to find the location
-            location = geocode(address)
-            if location:
-                latitudes.append(location.latitude)
-                longitudes.append(location.longitude)
-            else:
-                latitudes.append(None)
-                longitudes.append(None)
-        except Exception as e:
-            print(f"Error geocoding address '{address}': {e}")
-            latitudes.append(None)
-            longitudes.append(None)
-
-        time.sleep(1) # Be respectful to the API
+    # Every address we've looked up before (found or not) comes from the
+    # on-disk cache; only new addresses go to Nominatim, once each.
+    cache = geocode_cache.GeocodeCache('data/geocode_cache.sqlite')
+    latitudes, longitudes = geocode_cache.geocode_addresses(df['address'], geocode, cache)
+    cache.close()
 
     # Add the new lists as columns to our DataFrame
     df['latitude'] = latitudes
     df['longitude'] = longitudes
     print("Geocoding complete.")
     # --- END OF NEW STEP ---
+    return df
+
+print("Starting model training...")
+
+# --- Step 1: Load and Prepare Data ---
+# ingest.py writes every source, already in our columns, to
+# data/parts/events/. Without it, the Eventbrite scraper streams into
+# data/parts/eventbrite/*.jsonl; read those one record at a time if they
+# exist, otherwise fall back to the old CSV.
+try:
+    if event_sink.has_parts(ingest.OUTPUT_SOURCE):
+        print("Reading ingested events from data/parts/events/ ...")
+        df = pd.DataFrame.from_records(event_sink.iter_part_events(ingest.OUTPUT_SOURCE))
+    elif event_sink.has_parts('eventbrite'):
+        print("Reading streamed events from data/parts/eventbrite/ ...")
+        df = pd.DataFrame.from_records(event_sink.iter_part_events('eventbrite'))
+    else:
+        df = pd.read_csv('data/eventbrite_events.csv')
 except FileNotFoundError:
     print("Error: 'data/eventbrite_events.csv' not found.")
     print("Please make sure your eventbrite_scraper.py ran successfully.")
@@ -62,37 +95,126 @@ except FileNotFoundError:
 # or the model will crash.
 df['description'] = df['description'].fillna('')
 
+def collapse_duplicates(df):
+    # The same event listed by several sites becomes one row that keeps
+    # every link (see dedup.py)
+    print("Looking for near-duplicate events...")
+    df, report = dedup.collapse_duplicates(df)
+    print(f"Merged {report['clusters_merged']} duplicate clusters ({report['rows_removed']} rows removed; "
+          f"{report['candidate_pairs']} candidate pairs checked).")
+    # source_urls is part of the content hash
+    return segments.add_event_keys(df.drop(columns=['content_hash']))
+
+# Stable ids + content hashes, so later incremental runs can tell what changed
+df = segments.add_event_keys(df)
+
+# --- Incremental mode: only the events that changed since the last build ---
+if args.incremental and artifacts.latest_version('model'):
+    models = artifacts.load_latest('model')
+    # Geocoded and de-duplicated exactly like a full build, so an unchanged
+    # scrape collapses to the same rows (and content hashes) as last time.
+    # Addresses seen before come from the geocode cache, no Nominatim calls.
+    df = collapse_duplicates(geocode_events(df))
+    new_events, tombstones = segments.diff_events(models, df, full_snapshot=not args.append_only)
+    n_removed = sum(len(rows) for rows in tombstones.values())
+    print(f"{len(new_events)} new or changed events, {n_removed} rows retired.")
+    if len(new_events) == 0 and n_removed == 0:
+        print("--- Nothing changed; model left as it is. ---")
+        exit()
+    # Only the changed events are vectorized
+    version_dir = segments.write_delta(models, new_events, tombstones)
+    print(f"--- Delta segment saved to {version_dir}! ---")
+    if segments.compact_needed(artifacts.load_latest('model')):
+        print("Deltas have grown large; compacting...")
+        segments.compact('model')
+    exit()
+elif args.incremental:
+    print("No existing artifacts to add to; doing a full build instead.")
+
+df = geocode_events(df)
+df = collapse_duplicates(df)
+
 # --- Step 2: Build the TF-IDF Model ---
 # Initialize the TF-IDF Vectorizer
 # stop_words='english' tells it to ignore common words (e.g., 'the', 'is', 'a')
 print("Building TF-IDF vectorizer...")
-vectorizer = TfidfVectorizer(stop_words='english')
+if args.workers != 1:
+    # Big corpora: count and vectorize chunks of descriptions in a process
+    # pool; the matrix is assembled on disk (see tfidf_build.py)
+    chunks = tfidf_build.frame_chunks(df, args.chunk_size)
+    vectorizer, tfidf_matrix = tfidf_build.build_tfidf(chunks, workers=args.workers or None)
+else:
+    vectorizer = TfidfVectorizer(stop_words='english')
 
-# 'fit_transform' learns the vocabulary and converts descriptions to a matrix
-tfidf_matrix = vectorizer.fit_transform(df['description'])
+    # 'fit_transform' learns the vocabulary and converts descriptions to a matrix
+    tfidf_matrix = vectorizer.fit_transform(df['description'])
 
 print("Model built successfully.")
 print(f"Matrix shape: {tfidf_matrix.shape}") # (events, unique_words)
 
-# --- Step 3: Save the Model Files ---
-# We save the vectorizer and the matrix so our app can use them
-# without having to re-train every time.
-print("Saving model files to /model directory...")
-
-# Let's create a new folder for our models
-import os
-os.makedirs('model', exist_ok=True) # Creates 'model' folder if it doesn't exist
+# --- Step 2b: Build the Spatial Index ---
+# A lat/lon grid over the geocoded events, so the app can find every
+# event within the distance slider without scanning the whole table.
+print("Building spatial index...")
+geo_index = geo.GeoGridIndex(df['latitude'], df['longitude'])
+print(f"Indexed {len(geo_index.ids)} geocoded events in {len(geo_index.cell_keys)} grid cells.")
+
+# --- Step 2c: Build the Inverted Index ---
+# Posting lists per word (event ids + one-byte weights) for MaxScore search
+print("Building inverted index...")
+text_index = inverted_index.InvertedIndex(tfidf_matrix, vectorizer.vocabulary_)
+print(f"Indexed {len(text_index.event_ids)} postings for {len(text_index.vocabulary)} words.")
+
+# --- Step 2d: Build the Start-Time Index ---
+# Start times parsed once and sorted, so the app can pick "this weekend"
+# with two binary searches and never re-parses dates per card
+print("Building start-time index...")
+time_index = timeindex.TimeIndex.from_events(df)
+print(f"Indexed {len(time_index.order)} dated events "
+      f"({len(df) - len(time_index.order)} without a readable date).")
+
+# --- Step 2e: Build the Category / Source Facets ---
+# A bitset per category and per source site, so the app's multi-select
+# filters are a few ORs and the counts next to them one bincount
+print("Building facet indexes...")
+facet_indexes = facets.build_facets(df)
+for field, index in facet_indexes.items():
+    print(f"{field}: {len(index.labels)} values")
+
+# --- Step 2f: Build the Dense (LSA) Index, if asked for ---
+# Word co-occurrence from TruncatedSVD, so "concert" can find "live music";
+# int8 embeddings searched through IVF lists (see dense.py)
+dense_index = None
+if args.dense:
+    print(f"Building {args.dense_dims}-dimension LSA embeddings and IVF index...")
+    dense_index = dense.DenseIndex.build(tfidf_matrix, dense.fit_components(tfidf_matrix, args.dense_dims))
+    print(f"Embedded {dense_index.n_events} events into {len(dense_index.centroids)} lists.")
+
+# --- Step 2g: Build the "Similar Events" Table ---
+# The top matches of every event against every other, kept as a small
+# (events x K) array, so "Similar events" is one row lookup (see neighbors.py).
+# Uses the --workers pool too.
+neighbor_table = None
+if args.neighbors > 0:
+    print(f"Finding the {args.neighbors} most similar events for each of {tfidf_matrix.shape[0]} events...")
+    neighbor_table = neighbors.build_neighbors(
+        tfidf_matrix, args.neighbors, workers=args.workers,
+        progress=lambda done, total: print(f"  {done}/{total} events", end='\r'),
+    )
+    print(f"\nNeighbor table: {neighbor_table[0].nbytes + neighbor_table[1].nbytes:,} bytes.")
 
-# Save the vectorizer
-with open('model/vectorizer.pkl', 'wb') as f:
-    pickle.dump(vectorizer, f)
-
-# Save the TF-IDF matrix
-with open('model/tfidf_matrix.pkl', 'wb') as f:
-    pickle.dump(tfidf_matrix, f)
-
-# We also need to save the data that corresponds to the matrix
-# This is a simple way to link our matrix rows back to our data
-df.to_pickle('model/events_data.pkl')
-
-print("--- Model training complete. Files saved! ---")
\ No newline at end of file
+# --- Step 3: Save the Model Files ---
+# Everything goes into a new version folder of plain .npy arrays plus an
+# Arrow events table (see artifacts.py). The app memory-maps them, so
+# startup doesn't unpickle anything and every server process shares the
+# same pages. The folder gets a manifest.json (checksums) and LATEST is
+# replaced last; running servers pick the new version up on their own
+# (model_reload.py).
+print("Saving model files to model/artifacts/ ...")
+
+version_dir = artifacts.write_artifacts(vectorizer, tfidf_matrix, df, geo_index, text_index,
+                                       time_index=time_index, facet_indexes=facet_indexes, dense_index=dense_index,
+                                       neighbor_table=neighbor_table)
+tfidf_build.cleanup(tfidf_matrix)
+
+print(f"--- Model training complete. Files saved to {version_dir}! ---")
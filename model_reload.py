@@ -0,0 +1,90 @@
+import gc
+import os
+import threading
+import time
+import artifacts
+
+# -----------------------------------------------------------------
+# HOT MODEL RELOAD
+# -----------------------------------------------------------------
+# model.py publishes every build as a new version folder and then
+# replaces model/artifacts/LATEST (see artifacts.py). A ModelReloader
+# keeps one loaded version per server process and a thread that checks
+# LATEST every few seconds. When it moves:
+#
+#   1. the new folder is checked against its manifest.json (sizes and
+#      SHA-256), so a damaged copy is never served
+#   2. it is loaded and handed to prepare() (e.g. search_core.SearchCore),
+#      all on the background thread
+#   3. `current` is pointed at the result in one assignment
+#
+# A search reads `current` once when it starts and keeps that object to
+# the end, so searches already running finish on the old version and
+# new ones get the new one; nobody waits. The old version is dropped
+# here right after the swap, and its mapped files are released as soon
+# as the last search still using it returns.
+#
+# A version that fails to load is skipped (the old one keeps serving)
+# until LATEST moves again.
+
+POLL_SECONDS = 5
+
+
+class ModelReloader:
+    def __init__(self, model_dir='model', prepare=None, poll_seconds=POLL_SECONDS, verify=True):
+        self.model_dir = model_dir
+        self.prepare = prepare or (lambda models: models)
+        self.poll_seconds = poll_seconds
+        self.verify = verify
+        self.reloads = 0
+        self.failed_version = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # The first load happens right here (no checksums: startup stays a few mmaps)
+        models = artifacts.load_latest(model_dir)
+        self.version = models.version
+        self.current = self.prepare(models)
+
+    def start(self):
+        """Start watching LATEST (call after any fork: threads don't survive one)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='model-reload', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def check(self):
+        """Load and swap in the published version if it's new; True if it swapped."""
+        version = artifacts.latest_version(self.model_dir)
+        if not version or version == self.version or version == self.failed_version:
+            return False
+        with self._lock:
+            if version == self.version:
+                return False
+            version_dir = os.path.join(self.model_dir, 'artifacts', version)
+            started = time.perf_counter()
+            try:
+                if self.verify:
+                    artifacts.verify_manifest(version_dir)
+                prepared = self.prepare(artifacts.load_artifacts(version_dir))
+            except Exception as e:
+                print(f"Model reload: keeping {self.version}, could not load {version}: {e}")
+                self.failed_version = version
+                self.last_error = str(e)
+                return False
+            old_version = self.version
+            self.current, self.version = prepared, version
+            self.reloads += 1
+            prepared = None
+            # Free whatever only the old version held (searches in flight keep their own reference)
+            gc.collect()
+            print(f"Model reload: {old_version} -> {version} in {time.perf_counter() - started:.2f} s")
+            return True
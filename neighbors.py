@@ -0,0 +1,100 @@
+import multiprocessing
+import numpy as np
+
+# -----------------------------------------------------------------
+# "MORE LIKE THIS" NEIGHBOR TABLE
+# -----------------------------------------------------------------
+# model.py precomputes, for every event, the K events whose descriptions
+# are most similar (TF-IDF cosine), so the app's "Similar events" is one
+# row lookup instead of scoring the whole table per click:
+#
+#   ids      (N, K) int32, best first, -1 where there are fewer than K
+#            events sharing any word
+#   scores   (N, K) float16 cosine similarities (0 for the -1 slots)
+#
+# Built as X @ X.T one block of rows at a time: each block's scores are a
+# dense (rows x N) array (plus those rows' TF-IDF, made dense), sized to
+# stay under BLOCK_BYTES, and only its top K per row survive
+# (argpartition), so memory never grows with N^2. At 1M events and
+# K = 10 the table is 60 MB.
+#
+# Build time does grow with N^2: every event is scored against every
+# other (see benchmarks/bench_neighbors.py). `workers` spreads the blocks
+# over a process pool; each worker gets the matrix once, not per block.
+
+K = 10
+
+# Largest dense score block held at once
+BLOCK_BYTES = 256 * 2 ** 20
+
+
+def block_rows(n_events, n_terms=0, block_bytes=BLOCK_BYTES):
+    # Each row of a block costs its scores (n_events) plus its dense TF-IDF row (n_terms)
+    return max(1, min(n_events, block_bytes // max(1, 4 * (n_events + n_terms))))
+
+
+_worker_matrix = None
+_worker_k = K
+
+
+def _init_worker(csr, k):
+    global _worker_matrix, _worker_k
+    _worker_matrix, _worker_k = csr, k
+
+
+def _block_neighbors(bounds):
+    start, stop = bounds
+    return block_neighbors(_worker_matrix, start, stop, _worker_k)
+
+
+def block_neighbors(csr, start, stop, k):
+    """(ids, scores) of the k best neighbors of rows start:stop, best first."""
+    # Sparse matrix times a dense block: much faster than sparse x sparse
+    # once events share common words, and the cost doesn't depend on how many do
+    block = np.ascontiguousarray((csr @ csr[start:stop].toarray().T).T)
+    rows = np.arange(stop - start)
+    block[rows, rows + start] = 0            # an event is not its own neighbor
+    top = np.argpartition(block, -k, axis=1)[:, -k:]
+    top_scores = np.take_along_axis(block, top, axis=1)
+    # Best first, ties to the lower id (among the k kept: which of several
+    # events tied with the k-th score makes the cut is arbitrary)
+    order = np.lexsort((top, -top_scores), axis=1)
+    top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+    found = top_scores > 0
+    return np.where(found, top, -1).astype(np.int32), np.where(found, top_scores, 0).astype(np.float16)
+
+
+def build_neighbors(tfidf_matrix, k=K, block_bytes=BLOCK_BYTES, workers=1, progress=None):
+    """(ids int32 (N, k), scores float16 (N, k)) of every row's k most similar other rows."""
+    csr = tfidf_matrix.tocsr().astype(np.float32)
+    n_events = csr.shape[0]
+    k = min(k, max(n_events - 1, 0))
+    ids = np.full((n_events, k), -1, dtype=np.int32)
+    scores = np.zeros((n_events, k), dtype=np.float16)
+    if k == 0:
+        return ids, scores
+    step = block_rows(n_events, csr.shape[1], block_bytes)
+    blocks = [(start, min(start + step, n_events)) for start in range(0, n_events, step)]
+    if workers == 1 or len(blocks) == 1:
+        results = (block_neighbors(csr, start, stop, k) for start, stop in blocks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers or None, initializer=_init_worker, initargs=(csr, k))
+        results = pool.imap(_block_neighbors, blocks)
+    try:
+        for (start, stop), (block_ids, block_scores) in zip(blocks, results):
+            ids[start:stop], scores[start:stop] = block_ids, block_scores
+            if progress:
+                progress(stop, n_events)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return ids, scores
+
+
+def lookup(ids, scores, row):
+    """(ids, scores) of one row's neighbors, the -1 padding left out."""
+    row_ids = np.asarray(ids[row])
+    found = row_ids >= 0
+    return row_ids[found].astype(np.int64), np.asarray(scores[row])[found].astype(np.float32)
@@ -0,0 +1,165 @@
+import re
+import unicodedata
+import numpy as np
+import scipy.sparse as sp
+
+# -----------------------------------------------------------------
+# QUERY VECTORIZER (NO SCIKIT-LEARN AT SERVING TIME)
+# -----------------------------------------------------------------
+# The app only ever calls vectorizer.transform([query]), but importing
+# scikit-learn to do that costs most of the app's cold start. This class
+# redoes TfidfVectorizer.transform for a fitted "word" analyzer using the
+# vocabulary, IDF weights and stop words saved with the artifacts:
+#
+#   lowercase / strip accents -> token_pattern -> drop stop words
+#   -> n-grams -> counts -> (sublinear tf) -> * idf -> l2/l1 norm
+#
+# Same steps in the same order as scikit-learn, so the vectors come out
+# bit-for-bit identical (check_query_vectorizer.py checks this).
+
+
+def strip_accents_unicode(s):
+    # Same as sklearn.feature_extraction.text.strip_accents_unicode
+    try:
+        s.encode('ASCII', errors='strict')
+        return s
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize('NFKD', s)
+        return ''.join([c for c in normalized if not unicodedata.combining(c)])
+
+
+def strip_accents_ascii(s):
+    # Same as sklearn.feature_extraction.text.strip_accents_ascii
+    return unicodedata.normalize('NFKD', s).encode('ASCII', errors='ignore').decode('ASCII')
+
+
+ACCENT_FUNCTIONS = {None: None, 'unicode': strip_accents_unicode, 'ascii': strip_accents_ascii}
+
+
+class QueryVectorizer:
+    def __init__(self, vocab, idf, stop_words=None, lowercase=True, strip_accents=None,
+                 token_pattern=r"(?u)\b\w\w+\b", ngram_range=(1, 1), binary=False,
+                 norm='l2', use_idf=True, sublinear_tf=False, analyzer='word',
+                 encoding='utf-8', decode_error='strict', dtype=np.float64):
+        if analyzer != 'word':
+            raise ValueError(f"QueryVectorizer only supports analyzer='word', not {analyzer!r}")
+        if strip_accents not in ACCENT_FUNCTIONS:
+            raise ValueError(f"Unknown strip_accents setting {strip_accents!r}")
+        if norm not in ('l2', 'l1', None):
+            raise ValueError(f"Unknown norm {norm!r}")
+
+        # vocab: terms in column order (vocab.npy); the dict is built once here
+        self.vocabulary_ = {str(term): column for column, term in enumerate(vocab)}
+        self.idf_ = np.asarray(idf)
+        self.stop_words = frozenset(stop_words) if stop_words is not None else None
+        self.lowercase = lowercase
+        self.accent_function = ACCENT_FUNCTIONS[strip_accents]
+        self.token_regex = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.binary = binary
+        self.norm = norm
+        self.use_idf = use_idf
+        self.sublinear_tf = sublinear_tf
+        self.encoding = encoding
+        self.decode_error = decode_error
+        self.dtype = dtype
+
+    @classmethod
+    def from_params(cls, vectorizer_params, vocab, idf, stop_words):
+        """From the 'vectorizer' settings in an artifact meta.json."""
+        params = vectorizer_params
+        if params.get('input', 'content') != 'content':
+            raise ValueError(f"QueryVectorizer only supports input='content', not {params['input']!r}")
+        return cls(
+            vocab, idf, stop_words,
+            lowercase=params['lowercase'], strip_accents=params['strip_accents'],
+            token_pattern=params['token_pattern'], ngram_range=params['ngram_range'],
+            binary=params['binary'], norm=params['norm'], use_idf=params['use_idf'],
+            sublinear_tf=params['sublinear_tf'], analyzer=params['analyzer'],
+            encoding=params['encoding'], decode_error=params['decode_error'],
+        )
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer):
+        """From an already fitted TfidfVectorizer (e.g. the legacy pickle)."""
+        params = vectorizer.get_params()
+        vocab = [None] * len(vectorizer.vocabulary_)
+        for term, column in vectorizer.vocabulary_.items():
+            vocab[column] = term
+        idf = vectorizer.idf_ if vectorizer.use_idf else np.ones(len(vocab))
+        return cls.from_params(params, vocab, idf, vectorizer.get_stop_words())
+
+    # --- text -> terms ---
+
+    def analyze(self, doc):
+        if isinstance(doc, bytes):
+            doc = doc.decode(self.encoding, self.decode_error)
+        if self.lowercase:
+            doc = doc.lower()
+        if self.accent_function is not None:
+            doc = self.accent_function(doc)
+        tokens = self.token_regex.findall(doc)
+        if self.stop_words is not None:
+            tokens = [w for w in tokens if w not in self.stop_words]
+
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        original_tokens = tokens
+        if min_n == 1:
+            tokens = list(original_tokens)
+            min_n += 1
+        else:
+            tokens = []
+        for n in range(min_n, min(max_n + 1, len(original_tokens) + 1)):
+            for i in range(len(original_tokens) - n + 1):
+                tokens.append(' '.join(original_tokens[i:i + n]))
+        return tokens
+
+    # --- terms -> vector ---
+
+    def transform_one(self, doc):
+        """(sorted term ids, weights) for one document."""
+        counts = {}
+        for term in self.analyze(doc):
+            column = self.vocabulary_.get(term)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+
+        terms = np.array(sorted(counts), dtype=np.int32)
+        weights = np.array([counts[t] for t in terms], dtype=self.dtype)
+        if self.binary:
+            weights[:] = 1
+        if self.sublinear_tf:
+            np.log(weights, weights)
+            weights += 1.0
+        if self.use_idf:
+            weights *= self.idf_[terms]
+
+        if self.norm == 'l2':
+            # cumsum adds left to right like scikit-learn's normalize loop
+            # (np.sum would add pairwise and can differ in the last bit)
+            norm = np.sqrt(np.cumsum(weights * weights)[-1]) if len(weights) else 0.0
+        elif self.norm == 'l1':
+            norm = np.cumsum(np.abs(weights))[-1] if len(weights) else 0.0
+        else:
+            norm = 0.0
+        if norm > 0:
+            weights /= norm
+        return terms, weights
+
+    def transform(self, raw_documents):
+        """Drop-in for TfidfVectorizer.transform: an n x vocabulary CSR matrix."""
+        if isinstance(raw_documents, str):
+            raise ValueError("Iterable over raw text documents expected, string object received.")
+        indptr = [0]
+        all_terms, all_weights = [], []
+        for doc in raw_documents:
+            terms, weights = self.transform_one(doc)
+            all_terms.append(terms)
+            all_weights.append(weights)
+            indptr.append(indptr[-1] + len(terms))
+        indices = np.concatenate(all_terms) if all_terms else np.empty(0, dtype=np.int32)
+        data = np.concatenate(all_weights) if all_weights else np.empty(0, dtype=self.dtype)
+        return sp.csr_matrix((data, indices, np.array(indptr, dtype=np.int32)),
+                             shape=(len(indptr) - 1, len(self.idf_)))
@@ -0,0 +1,99 @@
+import time
+import threading
+from collections import OrderedDict
+
+# -----------------------------------------------------------------
+# SEARCH RESULT CACHE
+# -----------------------------------------------------------------
+# Popular searches ("live music", "trivia", ...) give the same answer
+# for everyone nearby, so we keep recent results in a bounded LRU cache
+# with a time-to-live. One cache object is shared by every session in
+# the server process (app.py gets it through st.cache_resource), so it
+# has to be thread safe.
+#
+# The key includes the loaded model's version, so results from an old
+# model are never served after a new version is swapped in (see
+# model_reload.py).
+
+# Locations are snapped to a 0.001 degree grid (~100 meters)
+LOCATION_DECIMALS = 3
+
+
+def normalize_query(query):
+    """'  Live   MUSIC ' -> 'live music'"""
+    return " ".join((query or "").lower().split())
+
+
+def location_bucket(user_lat_lon, decimals=LOCATION_DECIMALS):
+    """Snap a (lat, lon) to the cache grid, or None when there is no location.
+
+    The app searches from the snapped point, so everyone in the same
+    bucket gets exactly the same (cached) distances.
+    """
+    if not user_lat_lon:
+        return None
+    return (round(float(user_lat_lon[0]), decimals), round(float(user_lat_lon[1]), decimals))
+
+
+def make_key(query, user_lat_lon, distance_miles, result_limit, version, time_window=None, facet_filters=()):
+    # time_window: the resolved (start, end, include_undated) bounds, not the label,
+    # so "today" stops matching yesterday's cached answer.
+    # facet_filters: ((field, sorted selected labels), ...)
+    return (normalize_query(query), location_bucket(user_lat_lon), distance_miles, result_limit, version,
+            time_window, tuple(facet_filters))
+
+
+class ResultCache:
+    def __init__(self, max_entries=512, ttl_seconds=900, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+
+    def ensure_version(self, version):
+        """Drop everything if the model artifacts changed since the last call."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                # Expired
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "version": self.version,
+            }
@@ -0,0 +1,63 @@
+import argparse
+from eventbrite_scraper import crawl
+from fake_eventbrite_server import FakeEventbrite, start_fake_server
+
+# Offline check of the concurrent Eventbrite crawler against the fake API
+# (fake_eventbrite_server.py), with its rate limit and random 503s on:
+#   - every page of every place arrives, in order, nothing reported missing
+#   - the busiest one-second window never has more than rate + burst
+#     requests (the token bucket's promise)
+#   - the injected errors were actually retried
+#
+#   python scrapes/check_crawler.py --rate 5 --error-rate 0.1
+
+parser = argparse.ArgumentParser(description="Check crawler completeness and rate-limit compliance offline.")
+parser.add_argument('--places', type=int, default=3)
+parser.add_argument('--events', type=int, default=200, help="events per place")
+parser.add_argument('--rate', type=float, default=5.0, help="crawler requests per second")
+parser.add_argument('--burst', type=float, default=None, help="token bucket capacity (default: rate)")
+parser.add_argument('--error-rate', type=float, default=0.1)
+parser.add_argument('--concurrency', type=int, default=8)
+args = parser.parse_args()
+
+capacity = args.burst if args.burst is not None else max(1.0, args.rate)
+allowed_per_second = args.rate + capacity
+# The server only starts answering 429 past what a compliant crawler may send
+fake = FakeEventbrite(args.events, rate_limit=int(allowed_per_second), error_rate=args.error_rate, latency=0.01)
+server, base_url = start_fake_server(fake)
+print(f"Crawling {args.places} place(s) x {args.events} events from {base_url} "
+      f"at {args.rate} req/s, {args.error_rate:.0%} of responses failing...")
+
+places = [str(place) for place in range(1, args.places + 1)]
+try:
+    results, stats = crawl(places, base_url, args.concurrency, args.rate, burst=args.burst)
+finally:
+    server.shutdown()
+report = stats.report()
+busiest = fake.max_requests_per_second()
+
+print("----------------------------------------")
+print(f"Crawl stats: {report}")
+print(f"Server: {fake.served} pages served, {fake.rejected} rate-limited, busiest second {busiest} requests")
+
+problems = []
+for place in places:
+    titles = [event['title'] for event in results[place]]
+    expected = [f"Fake event {n} in place {place}" for n in range(args.events)]
+    if titles != expected:
+        problems.append(f"place {place}: got {len(titles)} of {args.events} events (or out of order)")
+if report['failed']:
+    problems.append(f"pages reported missing: {report['failed']}")
+if busiest > allowed_per_second:
+    problems.append(f"{busiest} requests in one second, more than rate + burst = {allowed_per_second:g}")
+if args.error_rate > 0 and report['retries'] == 0:
+    problems.append("no retries, although the server was failing requests")
+
+if problems:
+    print("❌ FAILED:")
+    for problem in problems:
+        print(f"   - {problem}")
+else:
+    print(f"✅ SUCCESS: all {len(places) * args.events} events, at most {busiest} req/s "
+          f"(limit {allowed_per_second:g}), {report['retries']} retries.")
+print("----------------------------------------")
@@ -0,0 +1,145 @@
+import json
+import os
+
+# -----------------------------------------------------------------
+# STREAMING EVENT OUTPUT + CHECKPOINTS
+# -----------------------------------------------------------------
+# Scrapers write events to append-only JSONL "part" files as soon as a
+# page is parsed, instead of keeping everything in memory until the end:
+#
+#   data/parts/<source>/<region>.jsonl      one event per line
+#   data/parts/checkpoint.json              progress per source and region
+#
+# The checkpoint stores the last page that is completely on disk (all
+# pages before it too) and the byte offset where that page ends. On a
+# rerun the part file is cut back to that offset, which drops anything
+# written after it (e.g. a half-written page from a crash), and the
+# scraper continues from the next page.
+
+PARTS_DIR = 'data/parts'
+CHECKPOINT_NAME = 'checkpoint.json'
+
+
+def _write_json_atomic(path, data):
+    # Write to a temp file and rename, so a crash never leaves half a checkpoint
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class EventSink:
+    def __init__(self, source, parts_dir=PARTS_DIR, fresh=False):
+        self.source = source
+        self.parts_dir = parts_dir
+        self.source_dir = os.path.join(parts_dir, source)
+        self.checkpoint_path = os.path.join(parts_dir, CHECKPOINT_NAME)
+        os.makedirs(self.source_dir, exist_ok=True)
+
+        self.checkpoint = {}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                self.checkpoint = json.load(f)
+        if fresh:
+            for name in os.listdir(self.source_dir):
+                if name.endswith('.jsonl'):
+                    os.remove(os.path.join(self.source_dir, name))
+            self.checkpoint[source] = {}
+        self.checkpoint.setdefault(source, {})
+
+        self.files = {}
+        self.pending = {}   # region -> {page: events} that arrived out of order
+        self.events_written = 0
+
+    def _state(self, region):
+        return self.checkpoint[self.source].setdefault(region, {'page': 0, 'offset': 0, 'complete': False})
+
+    def _file(self, region):
+        f = self.files.get(region)
+        if f is None:
+            path = os.path.join(self.source_dir, f"{region}.jsonl")
+            f = open(path, 'a+b')
+            # Drop anything after the last checkpointed page
+            f.truncate(self._state(region)['offset'])
+            f.seek(0, os.SEEK_END)
+            self.files[region] = f
+        return f
+
+    def resume_page(self, region):
+        """First page still to fetch for a region (1 on a fresh start)."""
+        self._file(region)  # cuts off anything written after the checkpoint
+        return self._state(region)['page'] + 1
+
+    def is_complete(self, region):
+        return self._state(region)['complete']
+
+    def _append(self, region, page, events):
+        f = self._file(region)
+        for event in events:
+            f.write((json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+        self.events_written += len(events)
+
+    def write_page(self, region, page, events):
+        """Stream one parsed page to disk.
+
+        Pages can arrive out of order from a concurrent crawl; they are held
+        back until every page before them is written, so the file and the
+        checkpoint always describe a complete run of pages 1..N.
+        """
+        state = self._state(region)
+        pending = self.pending.setdefault(region, {})
+        pending[page] = events
+        while state['page'] + 1 in pending:
+            next_page = state['page'] + 1
+            self._append(region, next_page, pending.pop(next_page))
+            state['page'] = next_page
+            state['offset'] = self.files[region].tell()
+            _write_json_atomic(self.checkpoint_path, self.checkpoint)
+
+    def mark_complete(self, region, last_page):
+        """Called when the crawl found the end of a region at last_page."""
+        state = self._state(region)
+        # Only finished if every page up to the end actually made it to disk
+        if state['page'] >= last_page:
+            state['complete'] = True
+            _write_json_atomic(self.checkpoint_path, self.checkpoint)
+
+    def close(self):
+        # Pages stuck behind a failed page are still written, but past the
+        # checkpoint offset: a resumed run cuts them off and fetches them again.
+        for region, pending in self.pending.items():
+            for page in sorted(pending):
+                self._append(region, page, pending[page])
+        self.pending = {}
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+
+def iter_part_events(source, parts_dir=PARTS_DIR):
+    """Yield every event of a source, one dict at a time, file by file."""
+    source_dir = os.path.join(parts_dir, source)
+    if not os.path.isdir(source_dir):
+        return
+    for name in sorted(os.listdir(source_dir)):
+        if not name.endswith('.jsonl'):
+            continue
+        with open(os.path.join(source_dir, name), encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash; the next run rewrites it
+                    continue
+
+
+def has_parts(source, parts_dir=PARTS_DIR):
+    source_dir = os.path.join(parts_dir, source)
+    return os.path.isdir(source_dir) and any(name.endswith('.jsonl') for name in os.listdir(source_dir))
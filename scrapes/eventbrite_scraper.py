@@ -1,6 +1,13 @@
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+import argparse
+import copy
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+import event_sink
 
 # -----------------------------------------------------------------
 # STEP 1: YOUR WORKING COOKIES, HEADERS, PARAMS, PAYLOAD
@@ -80,7 +87,7 @@ base_json_data = {
         'places': [
             '85688629', # This is the ID for "Connecticut"
         ],
-        'page': 1, # We will start at page 1
+        'page': 1, # Filled in per request by the crawler
         'page_size': 20,
         'aggs': [
             'places_borough',
@@ -103,123 +110,351 @@ base_json_data = {
     'browse_surface': 'search',
 }
 
-url = 'https://www.eventbrite.com/api/v3/destination/search/'
+BASE_URL = 'https://www.eventbrite.com'
+SEARCH_PATH = '/api/v3/destination/search/'
+
+# Default "places" ids to crawl (one region each)
+DEFAULT_PLACES = ['85688629']  # Connecticut
+
+# Status codes worth retrying: rate limited or a temporary server problem
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# -----------------------------------------------------------------
+# STEP 2: RATE LIMITING (TOKEN BUCKET PER HOST)
+# -----------------------------------------------------------------
+# Every request takes one token. Tokens refill at `rate` per second up
+# to `capacity`, so short bursts are allowed but the long-run request
+# rate to a host never goes above `rate`, however many threads we run.
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            self.sleep(wait_seconds)
+
+
+class HostRateLimiter:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.capacity)
+        bucket.acquire()
 
 
 # -----------------------------------------------------------------
-# STEP 2: PAGINATION LOGIC
+# STEP 3: FETCHING ONE PAGE (POOLED SESSION + RETRIES)
 # -----------------------------------------------------------------
 
-all_events_data = [] 
-page = 1
-print("--- Starting scraper ---")
+def make_session(pool_size):
+    # One session for the whole crawl: connections are kept alive and reused
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(headers)
+    session.cookies.update(cookies)
+    return session
+
+
+def backoff_seconds(attempt, retry_after=None, base=1.0, cap=30.0):
+    # Exponential backoff with jitter; a server Retry-After always wins if longer
+    delay = min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
+
 
-# We'll limit to 10 pages for now (200 events)
-while page <= 10:
-    print(f"Fetching page {page}...")
-    
-    payload = base_json_data.copy()
+def fetch_page(session, limiter, url, place_id, page, stats, max_retries=5):
+    """The JSON response for one page of one place, or None if it kept failing."""
+    payload = copy.deepcopy(base_json_data)
+    payload['event_search']['places'] = [place_id]
     payload['event_search']['page'] = page
-    
-    try:
-        response = requests.post(
-            url, 
-            params=params,
-            json=payload,
-            cookies=cookies, 
-            headers=headers,
-            timeout=10
-        )
-
-        if response.status_code != 200:
-            print(f"Error: Failed to fetch page {page}. Status code: {response.status_code}")
-            print("Response:", response.text)
-            break 
-
-        data = response.json()
-        
-        event_list = []
-        if 'events' in data and 'results' in data.get('events', {}):
-            event_list = data['events']['results']
-        
-        if not event_list:
-            print(f"No events found on page {page}.")
-            break
-
-        # (The rest of your parsing logic)
-        for event in event_list:
-            try:
-                title = event['name']
-                summary = event.get('summary', 'No summary provided.')
-                event_url = event['url']
-                start_date = event['start_date']
-                start_time = event['start_time']
-                full_datetime = f"{start_date}T{start_time}"
-
-                venue = event.get('primary_venue')
-                if venue:
-                    location_name = venue.get('name', 'N/A')
-                    if 'address' in venue and venue['address']:
-                        address = venue['address'].get('localized_address_display', 'Address not specified')
-                    else:
-                        address = "Address not specified"
-                else:
-                    location_name = "Online Event"
-                    address = "Online"
-
-                # --- NEW: Extract Category ---
-                category = "Uncategorized" # Default value
-                tags = event.get('tags', [])
-                for tag in tags:
-                    if tag.get('prefix') == 'EventbriteCategory':
-                        category = tag.get('display_name', 'Uncategorized')
-                        break # Stop after finding the first main category
-                # --- END NEW ---
-
-                event_data = {
-                    "title": title,
-                    "datetime": full_datetime,
-                    "location_name": location_name,
-                    "address": address,
-                    "description": summary,
-                    "category": category, # --- NEW ---
-                    "source_url": event_url,
-                    "source_site": "Eventbrite"
-                }
-                
-                all_events_data.append(event_data)
-
-            except Exception as e:
-                print(f"\nWarning: Could not parse an event. Error: {e}\n")
-
-        # --- Check for the next page ---
-        pagination = data.get('events', {}).get('pagination')
-        
-        if pagination and pagination.get('continuation'):
-            page += 1
-            time.sleep(1) 
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire(url)
+        try:
+            response = session.post(url, params=params, json=payload, timeout=10)
+        except requests.exceptions.RequestException as e:
+            print(f"Connection error on place {place_id} page {page}: {e}")
+            stats.count('retries')
+            time.sleep(backoff_seconds(attempt))
+            continue
+
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code in RETRY_STATUSES:
+            stats.count('retries')
+            time.sleep(backoff_seconds(attempt, response.headers.get('Retry-After')))
+            continue
+
+        print(f"Error: Failed to fetch place {place_id} page {page}. Status code: {response.status_code}")
+        return None
+
+    print(f"Giving up on place {place_id} page {page} after {max_retries + 1} attempts.")
+    return None
+
+
+# -----------------------------------------------------------------
+# STEP 4: PARSING
+# -----------------------------------------------------------------
+
+def parse_event(event):
+    title = event['name']
+    summary = event.get('summary', 'No summary provided.')
+    event_url = event['url']
+    start_date = event['start_date']
+    start_time = event['start_time']
+    full_datetime = f"{start_date}T{start_time}"
+
+    venue = event.get('primary_venue')
+    if venue:
+        location_name = venue.get('name', 'N/A')
+        if 'address' in venue and venue['address']:
+            address = venue['address'].get('localized_address_display', 'Address not specified')
         else:
-            print("No more pages found. Stopping.")
-            break 
-    
-    except requests.exceptions.RequestException as e:
-        print(f"A connection error occurred: {e}")
-        break
+            address = "Address not specified"
+    else:
+        location_name = "Online Event"
+        address = "Online"
+
+    # --- Extract Category ---
+    category = "Uncategorized" # Default value
+    tags = event.get('tags', [])
+    for tag in tags:
+        if tag.get('prefix') == 'EventbriteCategory':
+            category = tag.get('display_name', 'Uncategorized')
+            break # Stop after finding the first main category
+
+    return {
+        "title": title,
+        "datetime": full_datetime,
+        "location_name": location_name,
+        "address": address,
+        "description": summary,
+        "category": category,
+        "source_url": event_url,
+        "source_site": "Eventbrite"
+    }
+
+
+def parse_page(data):
+    """(events, has_more) for one page of search results."""
+    event_list = []
+    if 'events' in data and 'results' in data.get('events', {}):
+        event_list = data['events']['results']
+
+    parsed = []
+    for event in event_list:
+        try:
+            parsed.append(parse_event(event))
+        except Exception as e:
+            print(f"\nWarning: Could not parse an event. Error: {e}\n")
+
+    pagination = data.get('events', {}).get('pagination') or {}
+    has_more = bool(event_list) and bool(pagination.get('continuation'))
+    return parsed, has_more
+
 
 # -----------------------------------------------------------------
-# STEP 3: SAVE ALL DATA TO CSV
+# STEP 5: THE CONCURRENT CRAWL
 # -----------------------------------------------------------------
-if all_events_data:
-    print(f"\nSuccessfully processed {len(all_events_data)} events in total.")
-    
-    df = pd.DataFrame(all_events_data)
-    save_path = 'data/eventbrite_events.csv'
-    
+# We don't know how many pages a place has until we reach the end, so
+# each place keeps a small window of pages "in flight" ahead of the last
+# page we know exists. When a page says there's nothing more, that place
+# stops there and any pages fetched past the end are thrown away.
+
+class CrawlStats:
+    def __init__(self):
+        self.counts = {'pages': 0, 'events': 0, 'retries': 0, 'failed_pages': 0}
+        self.failed = []                  # (place, page) still missing when the crawl ended
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] += amount
+
+    def fail(self, place, page):
+        with self.lock:
+            self.counts['failed_pages'] += 1
+            self.failed.append((place, page))
+
+    def report(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            **self.counts,
+            'seconds': round(elapsed, 2),
+            'pages_per_sec': round(self.counts['pages'] / elapsed, 2),
+            'events_per_sec': round(self.counts['events'] / elapsed, 2),
+            'failed': [f"{place} p{page}" for place, page in sorted(self.failed)],
+        }
+
+
+def crawl(places, base_url=BASE_URL, concurrency=8, rate=2.0, burst=None, window=None,
+          on_page=None, on_place_done=None, start_pages=None):
+    """Fetch every page of every place concurrently.
+
+    on_page(place_id, page, events) is called as each page lands (in any
+    order); without it, events are collected and returned as
+    {place_id: [events in page order]}. start_pages={place_id: page}
+    resumes places part way through. Also returns the CrawlStats.
+
+    A page that still fails after fetch_page's retries is queued once more
+    when everything else is done; if that fails too it is listed in
+    stats.failed, and its place is not reported done (so a resumed crawl
+    fetches it again).
+    """
+    url = base_url.rstrip('/') + SEARCH_PATH
+    window = window or concurrency
+    session = make_session(concurrency)
+    limiter = HostRateLimiter(rate, burst)
+    stats = CrawlStats()
+
+    start_pages = start_pages or {}
+    next_page = {place: start_pages.get(place, 1) for place in places}
+    known_pages = {place: next_page[place] - 1 for place in places}  # highest page we know exists
+    last_page = {place: float('inf') for place in places}
+    pages = {place: {} for place in places}            # page -> events
+    in_flight = {}
+    failed = []                                        # (place, page) that came back empty-handed
+    requeued = set()
+
+    def schedule(executor):
+        # Keep every worker busy, round-robin over places
+        progress = True
+        while len(in_flight) < concurrency * 2 and progress:
+            progress = False
+            for place in places:
+                page = next_page[place]
+                if page > last_page[place] or page > known_pages[place] + window:
+                    continue
+                future = executor.submit(fetch_page, session, limiter, url, place, page, stats)
+                in_flight[future] = (place, page)
+                next_page[place] = page + 1
+                progress = True
+                if len(in_flight) >= concurrency * 2:
+                    break
+
+    print(f"--- Starting crawl: {len(places)} place(s), {concurrency} workers, {rate} req/s per host ---")
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        schedule(executor)
+        while True:
+            if not in_flight:
+                # Everything else is done: give each failed page one more try
+                again = [(place, page) for place, page in failed
+                         if page <= last_page[place] and (place, page) not in requeued]
+                if not again:
+                    break
+                failed = [item for item in failed if item not in again]
+                for place, page in again:
+                    requeued.add((place, page))
+                    in_flight[executor.submit(fetch_page, session, limiter, url, place, page, stats)] = (place, page)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                place, page = in_flight.pop(future)
+                data = future.result()
+                if page > last_page[place]:
+                    continue
+                if data is None:
+                    failed.append((place, page))
+                    continue
+
+                events, has_more = parse_page(data)
+                if not events:
+                    last_page[place] = min(last_page[place], page - 1)
+                    continue
+                if not has_more:
+                    last_page[place] = min(last_page[place], page)
+                known_pages[place] = max(known_pages[place], page)
+
+                stats.count('pages')
+                stats.count('events', len(events))
+                if on_page:
+                    on_page(place, page, events)
+                else:
+                    pages[place][page] = events
+            schedule(executor)
+
+    session.close()
+    for place, page in failed:
+        if page <= last_page[place]:
+            print(f"Missing place {place} page {page}: it failed again after being requeued.")
+            stats.fail(place, page)
+    incomplete = {place for place, _ in stats.failed}
+    if on_place_done:
+        for place in places:
+            if last_page[place] != float('inf') and place not in incomplete:
+                on_place_done(place, last_page[place])
+    results = {}
+    for place in places:
+        # Drop anything fetched past the real last page
+        results[place] = [event for page in sorted(pages[place]) if page <= last_page[place]
+                          for event in pages[place][page]]
+    return results, stats
+
+
+# -----------------------------------------------------------------
+# STEP 6: RUN, STREAMING EVERY PAGE TO data/parts/eventbrite/
+# -----------------------------------------------------------------
+# Nothing is kept in memory: each page goes straight to a JSONL part file
+# and the checkpoint. Run it again after a crash and it picks up where it
+# stopped; use --fresh to start over.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Crawl Eventbrite search results.")
+    parser.add_argument('--places', nargs='+', default=DEFAULT_PLACES, help="Eventbrite place ids")
+    parser.add_argument('--base-url', default=BASE_URL, help="e.g. http://127.0.0.1:8765 for the fake server")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=2.0, help="max requests per second per host")
+    parser.add_argument('--parts-dir', default=event_sink.PARTS_DIR)
+    parser.add_argument('--fresh', action='store_true', help="ignore the checkpoint and crawl from page 1")
+    args = parser.parse_args()
+
+    sink = event_sink.EventSink('eventbrite', args.parts_dir, fresh=args.fresh)
+    places = [place for place in args.places if not sink.is_complete(place)]
+    for place in args.places:
+        if place not in places:
+            print(f"Place {place} already finished (use --fresh to crawl it again).")
+    start_pages = {place: sink.resume_page(place) for place in places}
+    for place, page in start_pages.items():
+        if page > 1:
+            print(f"Resuming place {place} from page {page}.")
+
     try:
-        df.to_csv(save_path, index=False, encoding='utf-8')
-        print(f"--- Data saved successfully to {save_path} ---")
-    except PermissionError:
-        print(f"\n[ERROR] Permission denied. Is '{save_path}' open in Excel?")
-    
-else:
-    print("No events were processed.")
\ No newline at end of file
+        _, stats = crawl(places, args.base_url, args.concurrency, args.rate,
+                         on_page=sink.write_page, on_place_done=sink.mark_complete, start_pages=start_pages)
+    finally:
+        sink.close()
+
+    print(f"Crawl stats: {stats.report()}")
+    if sink.events_written:
+        print(f"--- Streamed {sink.events_written} events to {sink.source_dir} ---")
+    else:
+        print("No events were processed.")
@@ -0,0 +1,149 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -----------------------------------------------------------------
+# FAKE EVENTBRITE SEARCH API (for offline crawler runs)
+# -----------------------------------------------------------------
+# Answers POST /api/v3/destination/search/ with synthetic events in the
+# same shape the real API returns, so eventbrite_scraper.py can be run
+# and timed without touching eventbrite.com:
+#
+#   python scrapes/fake_eventbrite_server.py --port 8765 --events 2000
+#   python scrapes/eventbrite_scraper.py --base-url http://127.0.0.1:8765 --parts-dir /tmp/parts --fresh
+#
+# It enforces its own rate limit (429 + Retry-After when a client sends
+# more than `rate_limit` requests in any one-second window), can inject
+# random 5xx errors, and logs the time of every request so rate-limit
+# compliance can be checked afterwards.
+
+CATEGORIES = ['Music', 'Food & Drink', 'Performing & Visual Arts', 'Community & Culture', 'Sports & Fitness']
+
+
+def make_event(place_id, number):
+    return {
+        'name': f"Fake event {number} in place {place_id}",
+        'summary': f"Synthetic event number {number} for crawler testing.",
+        'url': f"https://example.com/e/{place_id}-{number}",
+        'start_date': '2030-01-01',
+        'start_time': f"{number % 24:02d}:00",
+        'primary_venue': {
+            'name': f"Venue {number % 50}",
+            'address': {'localized_address_display': f"{number % 50} Main Street, New Haven, CT 06510"},
+        },
+        'tags': [{'prefix': 'EventbriteCategory', 'display_name': CATEGORIES[number % len(CATEGORIES)]}],
+    }
+
+
+class FakeEventbrite:
+    def __init__(self, events_per_place=200, page_size=20, rate_limit=None, error_rate=0.0, latency=0.0):
+        self.events_per_place = events_per_place
+        self.page_size = page_size
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.latency = latency
+        self.request_times = []   # every request, including rejected ones
+        self.served = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def check_rate(self):
+        """Record this request; False if it breaks the one-second window limit."""
+        now = time.monotonic()
+        with self.lock:
+            self.request_times.append(now)
+            if self.rate_limit is None:
+                return True
+            recent = sum(1 for t in self.request_times if now - t < 1.0)
+            if recent > self.rate_limit:
+                self.rejected += 1
+                return False
+            return True
+
+    def search(self, payload):
+        search = payload.get('event_search', {})
+        place_id = (search.get('places') or ['0'])[0]
+        page = int(search.get('page', 1))
+        start = (page - 1) * self.page_size
+        end = min(start + self.page_size, self.events_per_place)
+        results = [make_event(place_id, n) for n in range(start, end)]
+        with self.lock:
+            self.served += 1
+        return {
+            'events': {
+                'results': results,
+                'pagination': {'continuation': 'more' if end < self.events_per_place else None},
+            }
+        }
+
+    def max_requests_per_second(self):
+        """Most requests seen in any one-second window (rate-limit compliance)."""
+        with self.lock:
+            times = sorted(self.request_times)
+        best, first = 0, 0
+        for last, t in enumerate(times):
+            while t - times[first] >= 1.0:
+                first += 1
+            best = max(best, last - first + 1)
+        return best
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)) or 0)
+            if not fake.check_rate():
+                self.reply(429, {'error': 'rate limited'}, {'Retry-After': '1'})
+                return
+            if fake.error_rate and random.random() < fake.error_rate:
+                self.reply(503, {'error': 'try again'})
+                return
+            if fake.latency:
+                time.sleep(fake.latency)
+            self.reply(200, fake.search(json.loads(body or b'{}')))
+
+        def reply(self, status, data, extra_headers=None):
+            raw = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(raw)))
+            for name, value in (extra_headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, format, *args):
+            pass  # keep the console quiet
+
+    return Handler
+
+
+def start_fake_server(fake, host='127.0.0.1', port=0):
+    """Serve `fake` on a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a fake Eventbrite search API.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--events', type=int, default=2000, help="events per place id")
+    parser.add_argument('--rate-limit', type=int, default=None, help="max requests per second before 429s")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to each response")
+    args = parser.parse_args()
+
+    fake = FakeEventbrite(args.events, rate_limit=args.rate_limit, error_rate=args.error_rate, latency=args.latency)
+    server, url = start_fake_server(fake, port=args.port)
+    print(f"Fake Eventbrite listening on {url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Served {fake.served} pages, rejected {fake.rejected} requests, "
+              f"peak {fake.max_requests_per_second()} requests/sec.")
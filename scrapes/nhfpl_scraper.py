@@ -2,9 +2,9 @@
 # Step 1: Import all the libraries
 # ----------------------------------------------------
 import requests
+import sys
 from bs4 import BeautifulSoup
-import pandas as pd
-import time # Good practice to add a small delay
+import event_sink
 
 # ----------------------------------------------------
 # Step 2: Define the target URL and headers
@@ -19,6 +19,15 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
+# Events are streamed to data/parts/nhfpl/ (see event_sink.py). The
+# calendar is a single page, so the checkpoint just records whether it
+# has been saved already; pass --fresh to scrape it again.
+REGION = 'new-haven'
+sink = event_sink.EventSink('nhfpl', fresh='--fresh' in sys.argv)
+if sink.resume_page(REGION) > 1:
+    print("NHFPL calendar already saved (use --fresh to scrape it again).")
+    sys.exit()
+
 # ----------------------------------------------------
 # Step 3: Fetch the webpage
 # ----------------------------------------------------
@@ -65,7 +74,7 @@ for card in event_cards:
         date = card.find('span', class_='s-lc-fs-i-date-value').text.strip()
 
         # 4. Find the time
-        time = card.find('span', class_='s-lc-fs-i-time-value').text.strip()
+        event_time = card.find('span', class_='s-lc-fs-i-time-value').text.strip()
         
         # --- End of re-mapped section ---
 
@@ -75,7 +84,7 @@ for card in event_cards:
         event_data = {
             "title": title,
             "date": date,
-            "time": time,
+            "time": event_time,
             "location": "New Haven Free Public Library", # Add this, as it's not on the card
             "details_url": full_link
         }
@@ -86,24 +95,21 @@ for card in event_cards:
         # This will catch any cards that are formatted differently
         # (e.g., "past event" dividers) and skip them.
         print(f"Skipping a non-event card. Error: {e}")
-    
-    # Be a good web citizen: pause for a tiny moment
-    time.sleep(0.1) 
 
 # ----------------------------------------------------
-# Step 7: Save the data to a *new* CSV file
+# Step 7: Stream the data to data/parts/nhfpl/
 # ----------------------------------------------------
 if not all_events_data:
     print("No event data was successfully scraped.")
+    sink.close()
 else:
     print(f"\nSuccessfully scraped {len(all_events_data)} events.")
     print("Example event:")
     print(all_events_data[0])
     
-    # We save to a new file to keep our data sources separate
-    save_path = 'data/nhfpl_events.csv'
-    
-    df = pd.DataFrame(all_events_data)
-    df.to_csv(save_path, index=False)
+    # We keep this source separate from Eventbrite (different columns)
+    sink.write_page(REGION, 1, all_events_data)
+    sink.mark_complete(REGION, 1)
+    sink.close()
     
-    print(f"\nData saved successfully to {save_path}")
\ No newline at end of file
+    print(f"\nData saved successfully to {sink.source_dir}")
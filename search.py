@@ -0,0 +1,91 @@
+import numpy as np
+
+# -----------------------------------------------------------------
+# TOP-K TEXT RETRIEVAL
+# -----------------------------------------------------------------
+# TfidfVectorizer L2-normalizes every row (and the query), so cosine
+# similarity is just a dot product. Instead of scoring every event and
+# sorting all of them, we:
+#   1. only look at events that share at least one term with the query
+#      (the columns of the matrix in CSC form are exactly those lists),
+#   2. drop anything outside the optional candidate mask (geo, date, ...)
+#      term by term, before summing, so a narrow window means less work,
+#   3. pick the top k with argpartition and only sort those k.
+
+
+def query_terms(query_vector):
+    """(term ids, weights) of a 1 x vocabulary sparse query vector."""
+    query_vector = query_vector.tocsr()
+    return query_vector.indices, query_vector.data
+
+
+def score_matching_events(terms, weights, tfidf_csc, candidate_mask=None):
+    """Dot-product scores for every event that contains at least one query term.
+
+    Returns (ids, scores) with ids sorted ascending and unique.
+    """
+    if len(terms) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    ids = []
+    contributions = []
+    for term, weight in zip(terms, weights):
+        start, end = tfidf_csc.indptr[term], tfidf_csc.indptr[term + 1]
+        term_ids, term_data = tfidf_csc.indices[start:end], tfidf_csc.data[start:end]
+        if candidate_mask is not None:
+            allowed = candidate_mask[term_ids]
+            term_ids, term_data = term_ids[allowed], term_data[allowed]
+        ids.append(term_ids)
+        contributions.append(term_data * weight)
+
+    ids = np.concatenate(ids).astype(np.int64)
+    contributions = np.concatenate(contributions).astype(np.float64)
+
+    # Sum the contributions of every term for the same event
+    unique_ids, inverse = np.unique(ids, return_inverse=True)
+    scores = np.bincount(inverse, weights=contributions, minlength=len(unique_ids))
+    return unique_ids, scores
+
+
+def matching_events(terms, tfidf_csc, candidate_mask=None):
+    """Ids (ascending, unique) of every allowed event containing a query term, unscored."""
+    if len(terms) == 0:
+        return np.empty(0, dtype=np.int64)
+    # A flag per event instead of sorting the concatenated posting lists
+    hit = np.zeros(tfidf_csc.shape[0], dtype=bool)
+    for term in terms:
+        hit[tfidf_csc.indices[tfidf_csc.indptr[term]:tfidf_csc.indptr[term + 1]]] = True
+    if candidate_mask is not None:
+        hit &= candidate_mask
+    return np.flatnonzero(hit)
+
+
+def select_top_k(ids, scores, k):
+    """Best k (ids, scores), highest score first; ties go to the lower id."""
+    if k <= 0 or len(ids) == 0:
+        return ids[:0], scores[:0]
+    if len(ids) > k:
+        # argpartition is O(n): only the k winners get sorted below. It picks
+        # arbitrarily among scores tied with the k-th, so every one of those
+        # is kept and the sort decides
+        kth_score = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        keep = np.flatnonzero(scores >= kth_score)
+        ids, scores = ids[keep], scores[keep]
+    order = np.lexsort((ids, -scores))[:k]
+    return ids[order], scores[order]
+
+
+def top_k(query_vector, tfidf_csc, k, candidate_mask=None):
+    """Top k events for a query vector.
+
+    tfidf_csc is the TF-IDF matrix in CSC form (one column per term).
+    candidate_mask, if given, is a boolean array over all events; events
+    where it is False are never scored. If the query shares no term with
+    any (allowed) event, the result is empty rather than an arbitrary order.
+    """
+    terms, weights = query_terms(query_vector)
+    ids, scores = score_matching_events(terms, weights, tfidf_csc, candidate_mask)
+
+    # Zero scores can only come from explicit zeros in the matrix; they are not matches
+    matched = scores > 0
+    return select_top_k(ids[matched], scores[matched], k)
@@ -0,0 +1,250 @@
+import os
+import numpy as np
+import bookmarks
+import dedup
+import dense
+import facets
+import metrics
+import timeindex
+
+# -----------------------------------------------------------------
+# SEARCH CORE (SHARED BY THE STREAMLIT APP AND THE HTTP API)
+# -----------------------------------------------------------------
+# Retrieval, geo / date / facet filtering and ranking over one loaded
+# model (artifacts.ModelArtifacts or a segments.SegmentSet), with no
+# Streamlit in it:
+#
+#   core = SearchCore(artifacts.load_latest('model'))
+#   result = core.search("live music", (41.31, -72.92), 10, 20,
+#                        timeindex.window_bounds('weekend'))
+#
+# app.py keeps one per server process (st.cache_resource); api.py one per
+# worker process. Either way the arrays underneath are memory-mapped, so
+# every process shares the same pages.
+
+# Which text engine ranks results: "sparse" (search.py) or "inverted" (inverted_index.py).
+# Both return the same ranking; set GOUT_SEARCH_ENGINE to A/B their latency.
+SEARCH_ENGINE = os.environ.get("GOUT_SEARCH_ENGINE", "sparse")
+
+# How text is matched: "sparse" (TF-IDF words), "dense" (LSA embeddings) or
+# "hybrid" (both, see dense.py). dense / hybrid need a model built with
+# `model.py --dense`; without one, search stays sparse.
+SEARCH_MODE = os.environ.get("GOUT_SEARCH_MODE", "sparse")
+
+# Columns an event is described by outside the app (API responses)
+EVENT_FIELDS = ['event_id', 'title', 'datetime', 'location_name', 'address', 'description',
+                'category', 'source_url', 'source_site', 'source_urls', 'source_sites', 'latitude', 'longitude']
+
+
+class SearchResult:
+    """What one search found: the rows to show, best first, plus facet counts."""
+
+    def __init__(self, ids, scores, distances, facet_counts):
+        self.ids = ids
+        self.scores = scores
+        self.distances = distances          # None without a user location
+        self.facet_counts = facet_counts    # {field: {label: count}}
+
+
+class SearchCore:
+    def __init__(self, models, engine=SEARCH_ENGINE, mode=SEARCH_MODE):
+        self.models = models
+        self.vectorizer = models.vectorizer
+        self.events_df = models.events_df
+        self.engine = engine
+        self.mode = mode if models.has_dense else 'sparse'
+        self._event_ids = None
+
+    @property
+    def version(self):
+        return self.models.version
+
+    # --- stages ---
+
+    def recommend(self, query, top_n=50, candidate_mask=None, dense_matches=None):
+        """Best matches as (row ids, scores); candidate_mask limits ranking to e.g. events near the user.
+
+        dense_matches is dense_matches() over these candidates (or more),
+        when the caller already has it.
+        """
+        with metrics.span('vectorize'):
+            query_vector = self.vectorizer.transform([query])
+        # Sparse top-k (see search.py) is empty if no event shares a word with the query;
+        # dense and hybrid (dense.py) also find events that only share the topic
+        with metrics.span('rank'):
+            if self.mode == 'dense':
+                if dense_matches is not None:
+                    return dense.top_k_of_matches(dense_matches, top_n, candidate_mask)
+                return self.models.dense_top_k(query_vector, top_n, candidate_mask)
+            if self.mode == 'hybrid':
+                return dense.hybrid_top_k(self.models, query_vector, top_n, candidate_mask, engine=self.engine,
+                                          dense_matches=dense_matches)
+            return self.models.top_k(query_vector, top_n, candidate_mask, self.engine)
+
+    def dense_matches(self, query, candidate_mask):
+        """(row ids, cosines) the dense side of a search picks from, or None in sparse mode / without keywords."""
+        if self.mode == 'sparse' or not query.strip():
+            return None
+        with metrics.span('dense_match'):
+            return self.models.dense_matches(self.vectorizer.transform([query]), candidate_mask)
+
+    def nearby(self, user_lat_lon, radius_miles):
+        """Every event within the radius, as (row ids ascending, distances)."""
+        # (spatial index, or one vectorized pass over the table for old model folders)
+        with metrics.span('geo_filter'):
+            return self.models.query_radius(user_lat_lon, radius_miles)
+
+    def in_window(self, time_window):
+        """Row ids of every event starting inside (start, end, include_undated), earliest first."""
+        # Expired events never are (see timeindex.window_bounds)
+        with metrics.span('time_filter'):
+            return self.models.query_window(*time_window)
+
+    def facet_counts(self, query, candidates, facet_masks, dense_matches=None):
+        """{field: {label: count}} over everything the search matches, not just the rows shown.
+
+        Each facet ignores its own filter, so ticking "Music" still shows
+        how many "Arts" events there are. "Matches" are what the mode ranks
+        from: events sharing a word with the query (sparse), the dense
+        matches the IVF probes scored (dense, see dense_matches), or
+        either (hybrid). The dense ones are counted from the same scores
+        the ranking uses, so this costs no second pass.
+        """
+        with metrics.span('facets'):
+            if query.strip():
+                if self.mode == 'dense':
+                    matched = dense_matches[0]
+                elif self.mode == 'hybrid':
+                    # A flag per event, not a sort of the (often huge) word matches
+                    hit = np.zeros(self.models.n_events, dtype=bool)
+                    hit[self.models.matching_ids(self.vectorizer.transform([query]), candidates)] = True
+                    hit[dense_matches[0]] = True
+                    matched = np.flatnonzero(hit)
+                else:
+                    matched = self.models.matching_ids(self.vectorizer.transform([query]), candidates)
+            else:
+                matched = np.flatnonzero(candidates)
+            counts = {}
+            for field in facets.FACET_FIELDS:
+                keep = np.ones(len(matched), dtype=bool)
+                for other, mask in facet_masks.items():
+                    if other != field:
+                        keep &= mask[matched]
+                counts[field] = self.models.facet_counts(field, matched[keep])
+            return counts
+
+    def filter_mask(self, time_window, user_lat_lon=None, distance_miles=None):
+        """Bool mask over every row: starts inside time_window and, with a location, is within range."""
+        mask = np.zeros(self.models.n_events, dtype=bool)
+        mask[self.in_window(time_window)] = True
+        if user_lat_lon:
+            in_range = np.zeros(self.models.n_events, dtype=bool)
+            in_range[self.nearby(user_lat_lon, distance_miles)[0]] = True
+            mask &= in_range
+        return mask
+
+    # --- the whole pipeline ---
+
+    def search(self, query, user_lat_lon, distance_miles, result_limit, time_window, facet_filters=()):
+        """One search, as a SearchResult.
+
+        time_window is timeindex.window_bounds(...); facet_filters is
+        ((field, selected labels), ...), an empty selection meaning "all".
+        Date window, distance and facet filters come first, as one mask:
+        events outside it are never scored (see search.py).
+        """
+        window_ids = self.in_window(time_window)
+        candidates = np.zeros(self.models.n_events, dtype=bool)
+        candidates[window_ids] = True
+        if user_lat_lon:
+            nearby_ids, nearby_distances = self.nearby(user_lat_lon, distance_miles)
+            in_range = np.zeros(self.models.n_events, dtype=bool)
+            in_range[nearby_ids] = True
+            candidates &= in_range
+        facet_masks = {field: self.models.facet_mask(field, list(selected))
+                       for field, selected in facet_filters if selected}
+        # Dense / hybrid: score the probed events once, for both the counts and the ranking
+        dense_matches = self.dense_matches(query, candidates)
+        facet_counts = self.facet_counts(query, candidates, facet_masks, dense_matches)
+        for mask in facet_masks.values():
+            candidates &= mask
+        metrics.observe('candidates', int(candidates.sum()))
+
+        top_ids, scores = self.recommend(query, candidate_mask=candidates, dense_matches=dense_matches)
+        if user_lat_lon:
+            # Only events in range (and in the window) got ranked; sort those by distance
+            keep = candidates[nearby_ids]
+            nearby_ids, nearby_distances = nearby_ids[keep], nearby_distances[keep]
+            if len(top_ids) == 0 and not query.strip():
+                # No keywords typed: just show what's nearby, closest first
+                top_ids, scores = nearby_ids, np.zeros(len(nearby_ids))
+            distances = nearby_distances[np.searchsorted(nearby_ids, top_ids)]
+            order = np.argsort(distances, kind='stable')[:result_limit]
+            return SearchResult(top_ids[order], scores[order], distances[order], facet_counts)
+        if len(top_ids) == 0 and not query.strip():
+            # No keywords and no location: what's on soonest in the window
+            top_ids = window_ids[candidates[window_ids]][:result_limit]
+            scores = np.zeros(len(top_ids))
+        return SearchResult(top_ids[:result_limit], scores[:result_limit], None, facet_counts)
+
+    # --- single events ---
+
+    def row_for_event_id(self, event_id):
+        """Row of a (live) event by its stable id (bookmarks.event_id), or None."""
+        if self._event_ids is None:
+            # Built on first use; later rows win, so this is the newest copy
+            if 'event_id' in self.events_df.columns:
+                self._event_ids = {event_id: row for row, event_id in enumerate(self.events_df['event_id'])}
+            else:
+                self._event_ids = bookmarks.event_id_index(self.events_df)
+        row = self._event_ids.get(event_id)
+        live_mask = getattr(self.models, 'live_mask', None)
+        if row is None or (live_mask is not None and not live_mask[row]):
+            return None
+        return row
+
+    def similar(self, row, k=10, candidate_mask=None):
+        """(row ids, scores) of the k upcoming events closest in wording to row, itself left out.
+
+        candidate_mask narrows them further (e.g. the search's date window
+        and distance). Comes from the model's precomputed neighbor table
+        (neighbors.py) when enough of row's neighbors pass the filters;
+        otherwise (expired neighbors, a narrow window or radius, a delta
+        row with no table) the description is searched like a query.
+        """
+        candidates = np.zeros(self.models.n_events, dtype=bool)
+        candidates[self.in_window(timeindex.window_bounds('any'))] = True
+        candidates[row] = False
+        if candidate_mask is not None:
+            candidates &= candidate_mask
+        found = self.models.neighbors(row) if hasattr(self.models, 'neighbors') else None
+        if found is not None:
+            ids, scores = found
+            keep = candidates[ids]
+            if keep.sum() >= k:
+                return ids[keep][:k], scores[keep][:k]
+        description = self.events_df['description'].iloc[row]
+        return self.recommend(description if isinstance(description, str) else '', k, candidates)
+
+    def event_records(self, rows, scores=None, distances=None):
+        """Events as plain JSON-ready dicts, in the order of rows."""
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = [field for field in EVENT_FIELDS if field in self.events_df.columns]
+        # One iloc + to_dict for the whole page, not one pandas row per event
+        records = self.events_df.iloc[rows][columns].to_dict('records')
+        for i, (row, record) in enumerate(zip(rows, records)):
+            for field, value in record.items():
+                if isinstance(value, (float, np.floating)):
+                    record[field] = None if np.isnan(value) else float(value)
+                elif value is not None and not isinstance(value, str):
+                    record[field] = str(value)
+            if not record.get('event_id'):
+                record['event_id'] = bookmarks.event_id(record)
+            # Every site listing the event (see dedup.py), as JSON lists
+            record['source_urls'], record['source_sites'] = dedup.split_sources(record)
+            record['start'] = timeindex.format_start(self.models.start_times[row])
+            if scores is not None:
+                record['score'] = round(float(scores[i]), 6)
+            if distances is not None:
+                record['distance_miles'] = round(float(distances[i]), 3)
+        return records
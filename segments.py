@@ -0,0 +1,334 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+import artifacts
+import bookmarks
+import dense
+import facets
+import geo
+import inverted_index
+import neighbors
+import search
+
+# -----------------------------------------------------------------
+# INCREMENTAL INDEX: BASE SEGMENT + DELTAS
+# -----------------------------------------------------------------
+# A full build refits TF-IDF over every event. When a scrape only adds
+# or changes a few events, `model.py --incremental` instead writes a
+# small delta segment (see artifacts.py for the folder layout):
+#
+#   - new and changed events, vectorized with the base segment's frozen
+#     vocabulary and IDF, so their rows score exactly like base rows
+#     (words the base has never seen are ignored until compaction),
+#   - tombstones for the rows they replace, and for events that are
+#     gone from the scrape.
+#
+# Search runs over every segment and merges the results; row ids are
+# global (segment offset + row), so events_df.iloc works as before.
+# `model.py --compact` merges all segments into a fresh base with a
+# refitted vocabulary and IDF. compact_needed() says when that is due.
+#
+# Events are matched across scrapes by event_id (hash of the ticket
+# link), and changes are spotted by content_hash over the event fields.
+
+CONTENT_FIELDS = ('title', 'datetime', 'location_name', 'address', 'description', 'category', 'source_url',
+                  'source_urls')
+
+# Compact once there are this many deltas, or deltas/tombstones reach this share of the rows
+MAX_DELTAS = 8
+MAX_DELTA_FRACTION = 0.2
+
+
+def content_hash(row):
+    digest = hashlib.sha1()
+    for field in CONTENT_FIELDS:
+        value = row.get(field)
+        text = '' if value is None or (not isinstance(value, str) and pd.isna(value)) else str(value)
+        digest.update(b'\x1f' + text.encode('utf-8'))
+    return digest.hexdigest()[:20]
+
+
+def add_event_keys(events_df):
+    """events_df with event_id and content_hash columns (computed if missing)."""
+    if 'event_id' in events_df.columns and 'content_hash' in events_df.columns:
+        return events_df
+    records = events_df.to_dict('records')
+    return events_df.assign(
+        event_id=[bookmarks.event_id(row) for row in records],
+        content_hash=[content_hash(row) for row in records],
+    )
+
+
+class SegmentSet:
+    """Several version folders searched as one index (same API as ModelArtifacts)."""
+
+    def __init__(self, segments, live_masks, version):
+        self.segments = segments
+        self.live_masks = live_masks        # per segment: bool array, False = tombstoned
+        self.version = version
+        self.vectorizer = segments[0].vectorizer
+        self.offsets = np.cumsum([0] + [segment.n_events for segment in segments])
+        self.events_df = pd.concat([segment.events_df for segment in segments], ignore_index=True)
+        self.event_lats = np.concatenate([segment.event_lats for segment in segments])
+        self.event_lons = np.concatenate([segment.event_lons for segment in segments])
+        self.live_mask = np.concatenate(live_masks)
+        self.start_times = np.concatenate([segment.start_times for segment in segments])
+        # Whole-index structures only exist per segment
+        self.tfidf_matrix = self.tfidf_csc = self.geo_index = self.text_index = None
+
+    @property
+    def n_events(self):
+        return int(self.offsets[-1])
+
+    def _segment_masks(self, candidate_mask):
+        for i, segment in enumerate(self.segments):
+            mask = self.live_masks[i]
+            if candidate_mask is not None:
+                mask = mask & candidate_mask[self.offsets[i]:self.offsets[i + 1]]
+            yield i, segment, mask
+
+    def top_k(self, query_vector, k, candidate_mask=None, engine='sparse'):
+        all_ids, all_scores = [], []
+        for i, segment, mask in self._segment_masks(candidate_mask):
+            if not mask.any():
+                continue
+            ids, scores = segment.top_k(query_vector, k, mask, engine)
+            all_ids.append(ids.astype(np.int64) + self.offsets[i])
+            all_scores.append(scores)
+        if not all_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        # The global top k is among the per-segment top k's
+        return search.select_top_k(np.concatenate(all_ids), np.concatenate(all_scores), k)
+
+    def query_radius(self, user_lat_lon, radius_miles):
+        all_ids, all_distances = [], []
+        for i, segment in enumerate(self.segments):
+            ids, distances = segment.query_radius(user_lat_lon, radius_miles)
+            live = self.live_masks[i][ids]
+            all_ids.append(ids[live].astype(np.int64) + self.offsets[i])
+            all_distances.append(distances[live])
+        return np.concatenate(all_ids), np.concatenate(all_distances)
+
+    def query_window(self, start=None, end=None, include_undated=False):
+        all_ids = []
+        for i, segment in enumerate(self.segments):
+            ids = segment.query_window(start, end, include_undated)
+            all_ids.append(ids[self.live_masks[i][ids]].astype(np.int64) + self.offsets[i])
+        ids = np.concatenate(all_ids)
+        # Earliest first across segments, as for one segment (NaT sorts last)
+        return ids[np.argsort(self.start_times[ids], kind='stable')]
+
+    # --- dense (LSA) retrieval: every segment shares the base's components ---
+
+    @property
+    def has_dense(self):
+        return all(segment.has_dense for segment in self.segments)
+
+    def dense_top_k(self, query_vector, k, candidate_mask=None, exact=False):
+        all_ids, all_scores = [], []
+        for i, segment, mask in self._segment_masks(candidate_mask):
+            if not mask.any():
+                continue
+            ids, scores = segment.dense_top_k(query_vector, k, mask, exact)
+            all_ids.append(ids.astype(np.int64) + self.offsets[i])
+            all_scores.append(scores)
+        if not all_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return search.select_top_k(np.concatenate(all_ids), np.concatenate(all_scores), k)
+
+    def dense_scores(self, query_vector, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        scores = np.zeros(len(ids), dtype=np.float32)
+        for i, segment in enumerate(self.segments):
+            local = (ids >= self.offsets[i]) & (ids < self.offsets[i + 1])
+            if local.any():
+                scores[local] = segment.dense_scores(query_vector, ids[local] - self.offsets[i])
+        return scores
+
+    def matching_ids(self, query_vector, candidate_mask=None):
+        all_ids = []
+        for i, segment, mask in self._segment_masks(candidate_mask):
+            all_ids.append(segment.matching_ids(query_vector, mask) + self.offsets[i])
+        return np.concatenate(all_ids)
+
+    def dense_matches(self, query_vector, candidate_mask=None):
+        all_ids, all_scores = [], []
+        for i, segment, mask in self._segment_masks(candidate_mask):
+            if not mask.any():
+                continue
+            ids, scores = segment.dense_matches(query_vector, mask)
+            all_ids.append(ids.astype(np.int64) + self.offsets[i])
+            all_scores.append(scores)
+        if not all_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(all_ids), np.concatenate(all_scores)
+
+    # --- "more like this": each segment's table only knows its own events ---
+
+    def neighbors(self, row):
+        """Precomputed neighbors of row within its segment, tombstoned ones left out; None for a delta."""
+        i = int(np.searchsorted(self.offsets, row, side='right')) - 1
+        found = self.segments[i].neighbors(row - self.offsets[i])
+        if found is None:
+            return None
+        ids, scores = found
+        ids = ids + self.offsets[i]
+        live = self.live_mask[ids]
+        return ids[live], scores[live]
+
+    # --- facets (labels can differ per segment, so everything goes by label) ---
+
+    def facet_labels(self, field):
+        return sorted({label for segment in self.segments for label in segment.facet_labels(field)})
+
+    def facet_mask(self, field, selected):
+        return np.concatenate([segment.facet_mask(field, selected) if field in segment.facets
+                               else np.zeros(segment.n_events, dtype=bool) for segment in self.segments])
+
+    def facet_counts(self, field, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        counts = []
+        for i, segment in enumerate(self.segments):
+            local = ids[(ids >= self.offsets[i]) & (ids < self.offsets[i + 1])] - self.offsets[i]
+            counts.append(segment.facet_counts(field, local))
+        return facets.merge_counts(*counts)
+
+
+def load_segment_set(artifacts_dir, meta):
+    """Every segment listed in a delta's meta.json, with tombstones applied."""
+    base_dir = os.path.join(artifacts_dir, meta['vocabulary_version'])
+    vectorizer = artifacts.load_vectorizer(base_dir)
+    dense_components = artifacts.load_dense_components(base_dir)
+    segments, metas = [], []
+    for version in meta['segments']:
+        version_dir = os.path.join(artifacts_dir, version)
+        segment_meta = artifacts.read_meta(version_dir)
+        segments.append(artifacts.load_segment(version_dir, segment_meta, vectorizer, dense_components))
+        metas.append((version_dir, segment_meta))
+
+    position = {version: i for i, version in enumerate(meta['segments'])}
+    live_masks = [np.ones(segment.n_events, dtype=bool) for segment in segments]
+    for version_dir, segment_meta in metas:
+        for target in segment_meta.get('tombstones', []):
+            dead = np.load(os.path.join(version_dir, f"tombstones_{target}.npy"))
+            live_masks[position[target]][dead] = False
+    return SegmentSet(segments, live_masks, meta['version'])
+
+
+def segment_versions(models):
+    if isinstance(models, SegmentSet):
+        return [segment.version for segment in models.segments]
+    return [models.version]
+
+
+# -----------------------------------------------------------------
+# INGEST
+# -----------------------------------------------------------------
+
+def diff_events(models, new_df, full_snapshot=True):
+    """Compare a scrape with the live index.
+
+    Returns (rows of new_df to add, {segment version: row positions to
+    tombstone}). With full_snapshot=False the scrape only adds/updates
+    events and nothing is removed for being absent.
+    """
+    new_df = add_event_keys(new_df.reset_index(drop=True))
+    new_df = new_df.drop_duplicates('event_id', keep='last')
+    new_hashes = dict(zip(new_df['event_id'], new_df['content_hash']))
+
+    if isinstance(models, SegmentSet):
+        parts = list(zip(models.segments, models.live_masks))
+    else:
+        parts = [(models, np.ones(models.n_events, dtype=bool))]
+
+    live_ids = set()
+    tombstones = {}
+    for segment, live in parts:
+        keyed = add_event_keys(segment.events_df)
+        ids = np.asarray(keyed['event_id'], dtype=object)
+        hashes = np.asarray(keyed['content_hash'], dtype=object)
+        dead = []
+        for row in np.flatnonzero(live):
+            event_id = ids[row]
+            live_ids.add(event_id)
+            new_hash = new_hashes.get(event_id)
+            if new_hash is None:
+                if full_snapshot:
+                    dead.append(row)        # gone from the scrape
+            elif new_hash != hashes[row]:
+                dead.append(row)            # changed: replaced by the new row
+                live_ids.discard(event_id)
+        if dead:
+            tombstones[segment.version] = np.array(dead, dtype=np.int64)
+
+    to_add = new_df[~new_df['event_id'].isin(live_ids)]
+    return to_add.reset_index(drop=True), tombstones
+
+
+def write_delta(models, new_events, tombstones, artifacts_dir=artifacts.ARTIFACTS_DIR):
+    """Vectorize and index new_events (already geocoded) and publish them as a delta."""
+    vectorizer = models.vectorizer
+    new_events = add_event_keys(new_events.reset_index(drop=True))
+    tfidf_matrix = vectorizer.transform(new_events['description'].fillna('').astype(str))
+    geo_index = geo.GeoGridIndex(new_events['latitude'], new_events['longitude'])
+    text_index = inverted_index.InvertedIndex(tfidf_matrix, vectorizer.vocabulary_)
+    base_segments = segment_versions(models)
+    # Embedded with the base's LSA components, so dense scores compare across segments
+    dense_index = None
+    if models.has_dense:
+        base = models.segments[0] if isinstance(models, SegmentSet) else models
+        dense_index = dense.DenseIndex.build(tfidf_matrix, base.dense.components)
+    return artifacts.write_artifacts(
+        None, tfidf_matrix, new_events, geo_index, text_index, artifacts_dir,
+        base_segments=base_segments, vocabulary_version=base_segments[0], tombstones=tombstones,
+        dense_index=dense_index,
+    )
+
+
+def compact_needed(models):
+    if not isinstance(models, SegmentSet):
+        return False
+    base_rows = models.segments[0].n_events
+    delta_rows = models.n_events - base_rows
+    dead_rows = int((~models.live_mask).sum())
+    return (len(models.segments) - 1 >= MAX_DELTAS
+            or delta_rows + dead_rows >= MAX_DELTA_FRACTION * max(base_rows, 1))
+
+
+def live_events(models):
+    """Every event that is not tombstoned, as one DataFrame."""
+    if isinstance(models, SegmentSet):
+        return models.events_df[models.live_mask].reset_index(drop=True)
+    return models.events_df.reset_index(drop=True)
+
+
+def compact(model_dir='model'):
+    """Merge every segment into a new base with a refitted vocabulary and IDF."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    version = artifacts.latest_version(model_dir)
+    artifacts_dir = os.path.join(model_dir, 'artifacts')
+    models = artifacts.load_artifacts(os.path.join(artifacts_dir, version))
+    base_meta = artifacts.read_meta(os.path.join(artifacts_dir, segment_versions(models)[0]))
+
+    events_df = live_events(models)
+    # Arrow-backed columns -> plain numpy/object columns for fitting
+    events_df = pd.DataFrame({column: events_df[column].to_numpy() for column in events_df.columns})
+    params = dict(base_meta['vectorizer'])
+    params['ngram_range'] = tuple(params['ngram_range'])
+    vectorizer = TfidfVectorizer(**params)
+    tfidf_matrix = vectorizer.fit_transform(events_df['description'].fillna('').astype(str))
+    geo_index = geo.GeoGridIndex(events_df['latitude'], events_df['longitude'])
+    text_index = inverted_index.InvertedIndex(tfidf_matrix, vectorizer.vocabulary_)
+    dense_index = None
+    if 'dense' in base_meta:
+        # Refit LSA on the new vocabulary too
+        dense_index = dense.DenseIndex.build(tfidf_matrix, dense.fit_components(tfidf_matrix, base_meta['dense']['dims']))
+    neighbor_table = None
+    if 'neighbors' in base_meta:
+        # Deltas never had tables; the merged base gets one over every live event
+        neighbor_table = neighbors.build_neighbors(tfidf_matrix, base_meta['neighbors']['k'])
+    version_dir = artifacts.write_artifacts(vectorizer, tfidf_matrix, events_df, geo_index, text_index, artifacts_dir,
+                                            dense_index=dense_index, neighbor_table=neighbor_table)
+    print(f"Compacted {len(segment_versions(models))} segments ({len(events_df)} live events) into {version_dir}")
+    return version_dir
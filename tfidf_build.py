@@ -0,0 +1,205 @@
+import os
+import shutil
+import tempfile
+from collections import Counter, deque
+import multiprocessing
+import numpy as np
+import scipy.sparse as sp
+import artifacts
+import query_vectorizer
+
+# -----------------------------------------------------------------
+# OUT-OF-CORE, MULTI-PROCESS TF-IDF BUILD
+# -----------------------------------------------------------------
+# Same vocabulary and IDF as TfidfVectorizer(...).fit(descriptions), and
+# the same rows, bit for bit, as its .transform(descriptions) (fit_transform
+# sums each row's norm in another order, so can differ in the last bit),
+# but built from chunks of descriptions in a process pool:
+#
+#   pass 1: workers tokenize a chunk and count in how many documents
+#           each word appears; the main process adds those counts up
+#           -> vocabulary (sorted, like scikit-learn) and IDF
+#   pass 2: workers turn a chunk into normalized TF-IDF rows with that
+#           vocabulary (query_vectorizer.QueryVectorizer does exactly
+#           what TfidfVectorizer.transform does); the main process
+#           appends them to data/indices files on disk
+#
+# Only `workers * 2` chunks are in flight at once, and a chunk's text is
+# dropped as soon as its rows are on disk, so memory is bounded by the
+# chunk size and the vocabulary, not the corpus. The finished matrix is
+# memory-mapped from those files.
+#
+# `chunks` must be re-iterable (it is read twice): e.g.
+# DescriptionChunks over the scraped part files or over a DataFrame.
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Tokenizer settings for the build (same as model.py's TfidfVectorizer)
+DEFAULT_PARAMS = {'stop_words': 'english'}
+
+
+class DescriptionChunks:
+    """Lists of at most chunk_size descriptions, read fresh on every iteration."""
+
+    def __init__(self, make_records, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.make_records = make_records
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        chunk = []
+        for record in self.make_records():
+            description = record.get('description')
+            chunk.append(description if isinstance(description, str) else '')
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def part_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Chunks straight from data/parts/<source>/*.jsonl (see scrapes/event_sink.py)."""
+    from scrapes import event_sink
+    return DescriptionChunks(lambda: event_sink.iter_part_events(source), chunk_size)
+
+
+def frame_chunks(events_df, chunk_size=DEFAULT_CHUNK_SIZE):
+    def records():
+        for start in range(0, len(events_df), chunk_size):
+            for description in events_df['description'].iloc[start:start + chunk_size]:
+                yield {'description': description}
+    return DescriptionChunks(records, chunk_size)
+
+
+def full_params(params):
+    """Every TfidfVectorizer setting artifacts.py saves, with our overrides."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    defaults = TfidfVectorizer(**params).get_params()
+    settings = {name: defaults[name] for name in artifacts.VECTORIZER_PARAMS}
+    if settings['max_features'] is not None:
+        raise ValueError("max_features is not supported by the chunked build")
+    if settings['stop_words'] == 'english':
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+        stop_words = sorted(ENGLISH_STOP_WORDS)
+    else:
+        stop_words = settings['stop_words']
+    return settings, stop_words
+
+
+# --- worker side ---
+
+_worker_vectorizer = None
+
+
+def _init_worker(settings, stop_words, vocab, idf):
+    global _worker_vectorizer
+    _worker_vectorizer = query_vectorizer.QueryVectorizer.from_params(settings, vocab, idf, stop_words)
+
+
+def _count_document_frequency(texts):
+    counts = Counter()
+    for text in texts:
+        counts.update(set(_worker_vectorizer.analyze(text)))
+    return len(texts), counts
+
+
+def _vectorize_chunk(texts):
+    matrix = _worker_vectorizer.transform(texts)
+    return np.diff(matrix.indptr), matrix.indices, matrix.data
+
+
+def _ordered_map(pool, fn, chunks, max_pending):
+    """pool.imap, but never reads more than max_pending chunks ahead."""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(fn, (chunk,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _pool(workers, settings, stop_words, vocab, idf):
+    return multiprocessing.Pool(workers, initializer=_init_worker,
+                                initargs=(settings, stop_words, vocab, idf))
+
+
+# --- main side ---
+
+def idf_from_document_frequency(df, n_documents, smooth_idf=True):
+    # Same formula as sklearn's TfidfTransformer.fit
+    df = df.astype(np.float64)
+    n_documents += int(smooth_idf)
+    df += int(smooth_idf)
+    return np.log(n_documents / df) + 1
+
+
+def prune_vocabulary(doc_freq, n_documents, min_df, max_df):
+    # min_df / max_df are counts (int) or shares of the documents (float), as in scikit-learn
+    high = max_df if isinstance(max_df, int) else max_df * n_documents
+    low = min_df if isinstance(min_df, int) else min_df * n_documents
+    return sorted(term for term, count in doc_freq.items() if low <= count <= high)
+
+
+def build_tfidf(chunks, workers=None, params=None, work_dir=None):
+    """(fitted TfidfVectorizer, CSR matrix) for every description in chunks.
+
+    The matrix lives in memory-mapped files under work_dir (a temp folder
+    by default); call cleanup(matrix) once it has been saved elsewhere.
+    """
+    workers = workers or os.cpu_count() or 1
+    settings, stop_words = full_params(params or DEFAULT_PARAMS)
+    max_pending = workers * 2
+
+    # Pass 1: document frequencies -> vocabulary and IDF
+    n_documents = 0
+    doc_freq = Counter()
+    with _pool(workers, settings, stop_words, [], []) as pool:
+        for n, counts in _ordered_map(pool, _count_document_frequency, chunks, max_pending):
+            n_documents += n
+            doc_freq.update(counts)
+    vocab = prune_vocabulary(doc_freq, n_documents, settings['min_df'], settings['max_df'])
+    if not vocab:
+        raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+    term_df = np.array([doc_freq[term] for term in vocab], dtype=np.int64)
+    del doc_freq
+    if settings['use_idf']:
+        idf = idf_from_document_frequency(term_df, n_documents, settings['smooth_idf'])
+    else:
+        idf = np.ones(len(vocab))
+
+    # Pass 2: rows, appended to files as each chunk comes back
+    work_dir = work_dir or tempfile.mkdtemp(prefix='gout-tfidf-')
+    os.makedirs(work_dir, exist_ok=True)
+    data_path = os.path.join(work_dir, 'data.bin')
+    indices_path = os.path.join(work_dir, 'indices.bin')
+    row_lengths = []
+    nnz = 0
+    with open(data_path, 'wb') as data_file, open(indices_path, 'wb') as indices_file, \
+            _pool(workers, settings, stop_words, vocab, idf) as pool:
+        for lengths, indices, data in _ordered_map(pool, _vectorize_chunk, chunks, max_pending):
+            data_file.write(np.ascontiguousarray(data, dtype=np.float64).tobytes())
+            indices_file.write(np.ascontiguousarray(indices, dtype=np.int32).tobytes())
+            row_lengths.append(lengths)
+            nnz += len(data)
+
+    indptr = np.zeros(n_documents + 1, dtype=np.int64)
+    if row_lengths:
+        np.cumsum(np.concatenate(row_lengths), out=indptr[1:])
+    if nnz:
+        data = np.memmap(data_path, dtype=np.float64, mode='r+', shape=(nnz,))
+        indices = np.memmap(indices_path, dtype=np.int32, mode='r+', shape=(nnz,))
+    else:
+        data, indices = np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int32)
+    matrix = sp.csr_matrix((data, indices, indptr), shape=(n_documents, len(vocab)), copy=False)
+    matrix.work_dir = work_dir
+
+    vectorizer = artifacts.rebuild_vectorizer(settings, vocab, idf)
+    return vectorizer, matrix
+
+
+def cleanup(matrix):
+    """Remove the files behind a matrix from build_tfidf."""
+    work_dir = getattr(matrix, 'work_dir', None)
+    if work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
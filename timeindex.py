@@ -0,0 +1,146 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------
+# START-TIME INDEX
+# -----------------------------------------------------------------
+# Every event's start time parsed once at build time, instead of the app
+# calling datetime.fromisoformat on every card it draws:
+#
+#   start_times    datetime64[m] per row (NaT when the date is unreadable)
+#   order          row ids of the dated events, earliest first
+#   sorted_times   start_times[order]
+#
+# A time window ("today", "this weekend", a picked range) is two binary
+# searches in sorted_times, giving the row ids to rank. app.py turns
+# those into the candidate mask *before* text scoring, so a narrow
+# window means fewer events scored, not a filter over the top 50.
+#
+# Events that started more than EXPIRED_AFTER ago are dropped from every
+# window. Undated events only show up under "Any time".
+# Times are the venue's wall-clock time (all current sources are in TIMEZONE).
+
+TIMEZONE = 'America/New_York'
+
+# Events have no end time; keep ones that started a little while ago
+EXPIRED_AFTER = np.timedelta64(2, 'h')
+
+# "now" is rounded down to this, so cached results stay valid for a while
+NOW_STEP_MINUTES = 15
+
+OFFSET_RE = re.compile(r'(Z|[+-]\d{2}:?\d{2})$')
+
+WINDOWS = {
+    'any': "Any time",
+    'today': "Today",
+    'tomorrow': "Tomorrow",
+    'weekend': "This weekend",
+    'week': "Next 7 days",
+    'month': "Next 30 days",
+    'custom': "Pick dates",
+}
+
+
+def parse_start_times(values):
+    """ISO strings (or anything pandas reads) -> datetime64[m] array, NaT if unreadable.
+
+    A trailing UTC offset is dropped: the wall-clock time is what we keep.
+    """
+    texts = pd.Series(values, dtype=object).where(lambda v: v.map(lambda x: isinstance(x, str)), None)
+    texts = texts.str.replace(OFFSET_RE, '', regex=True)
+    times = pd.to_datetime(texts, errors='coerce', format='mixed')
+    return times.to_numpy(dtype='datetime64[m]')
+
+
+class TimeIndex:
+    def __init__(self, start_times):
+        self.start_times = np.asarray(start_times, dtype='datetime64[m]')
+        dated = np.flatnonzero(~np.isnat(self.start_times))
+        self.order = dated[np.argsort(self.start_times[dated], kind='stable')].astype(np.int64)
+        self.sorted_times = self.start_times[self.order]
+
+    @classmethod
+    def from_events(cls, events_df):
+        return cls(parse_start_times(events_df['datetime']))
+
+    # Plain arrays in / out, so the index can be saved as .npy files and memory-mapped
+    ARRAY_NAMES = ('start_times', 'order', 'sorted_times')
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        index = cls.__new__(cls)
+        for name in cls.ARRAY_NAMES:
+            setattr(index, name, arrays[name])
+        return index
+
+    def query(self, start=None, end=None, include_undated=False):
+        """Row ids starting in [start, end), earliest first (open ends allowed)."""
+        lo = 0 if start is None else np.searchsorted(self.sorted_times, np.datetime64(start, 'm'), side='left')
+        hi = len(self.sorted_times) if end is None else \
+            np.searchsorted(self.sorted_times, np.datetime64(end, 'm'), side='left')
+        ids = self.order[lo:max(lo, hi)]
+        if include_undated:
+            ids = np.concatenate([ids, np.flatnonzero(np.isnat(self.start_times))])
+        return ids
+
+
+# -----------------------------------------------------------------
+# WINDOWS
+# -----------------------------------------------------------------
+
+def local_now(step_minutes=NOW_STEP_MINUTES):
+    """Current local time as datetime64[m], rounded down to step_minutes.
+
+    GOUT_NOW (e.g. 2025-11-20T18:00) pins it, to browse an old scrape.
+    """
+    pinned = os.environ.get('GOUT_NOW')
+    if pinned:
+        return np.datetime64(pd.Timestamp(pinned), 'm')
+    now = pd.Timestamp.now(tz=TIMEZONE).tz_localize(None).floor(f'{step_minutes}min')
+    return np.datetime64(now, 'm')
+
+
+def window_bounds(window, now=None, custom_range=None):
+    """(start, end, include_undated) for a WINDOWS key.
+
+    start never goes back further than now - EXPIRED_AFTER, so expired
+    events are always left out. custom_range is (first day, last day).
+    """
+    now = local_now() if now is None else np.datetime64(now, 'm')
+    today = now.astype('datetime64[D]')
+    floor = now - EXPIRED_AFTER
+    day = np.timedelta64(1, 'D')
+    include_undated = False
+    if window == 'today':
+        start, end = today, today + day
+    elif window == 'tomorrow':
+        start, end = today + day, today + 2 * day
+    elif window == 'weekend':
+        # Friday evening through Sunday; on the weekend itself, this one
+        weekday = (today.astype(np.int64) + 3) % 7            # Monday = 0 (1970-01-01 was a Thursday)
+        friday = today + (4 - weekday) * day
+        start, end = friday + np.timedelta64(17, 'h'), friday + 3 * day
+    elif window == 'week':
+        start, end = floor, today + 8 * day
+    elif window == 'month':
+        start, end = floor, today + 31 * day
+    elif window == 'custom' and custom_range:
+        first, last = custom_range
+        start, end = np.datetime64(first, 'D'), np.datetime64(last, 'D') + day
+    else:
+        start, end, include_undated = floor, None, True
+    start = max(np.datetime64(start, 'm'), floor)
+    end = None if end is None else np.datetime64(end, 'm')
+    return start, end, include_undated
+
+
+def format_start(start_time):
+    """'Saturday, November 15, 2025 at 07:30 PM', or None for NaT."""
+    if np.isnat(start_time):
+        return None
+    return pd.Timestamp(start_time).strftime("%A, %B %d, %Y at %I:%M %p")